@@ -31,10 +31,27 @@ class Config:
     # Safety limits to prevent excessive parsing / memory usage
     # Максимальный размер ответа, который мы готовы читать/парсить (в байтах)
     MAX_RESPONSE_BYTES = int(os.getenv('API_WATCHER_MAX_RESPONSE_BYTES', str(2 * 1024 * 1024)))  # 2MB
-    # Максимальный объём, который читаем для эвристик/поиска OpenAPI (в байтах)
-    MAX_PROBE_BYTES = int(os.getenv('API_WATCHER_MAX_PROBE_BYTES', str(256 * 1024)))  # 256KB
+    # Максимальный объём, который читаем для эвристик/поиска OpenAPI (в байтах).
+    # Запрашивается через Range, поэтому сервер не отдаёт больше этого объёма
+    MAX_PROBE_BYTES = int(os.getenv('API_WATCHER_MAX_PROBE_BYTES', str(16 * 1024)))  # 16KB
+    # Размер пула соединений ContentFetcher (одна долгоживущая aiohttp сессия на процесс)
+    FETCH_MAX_CONNECTIONS = int(os.getenv('API_WATCHER_FETCH_MAX_CONNECTIONS', '10'))
+    FETCH_MAX_CONNECTIONS_PER_HOST = int(os.getenv('API_WATCHER_FETCH_MAX_CONNECTIONS_PER_HOST', '4'))
+    # Сколько страниц скачивается одновременно во всём процессе (общий лимит для всех циклов)
+    MAX_CONCURRENT = int(os.getenv('API_WATCHER_MAX_CONCURRENT', '10'))
+    # Частота запросов за контентом (token bucket): запросов в секунду и размер пачки
+    FETCH_RATE_PER_SEC = float(os.getenv('API_WATCHER_FETCH_RATE_PER_SEC', '5'))
+    FETCH_BURST = int(os.getenv('API_WATCHER_FETCH_BURST', '10'))
+    # Сколько снэпшотов цикла копится перед записью одной транзакцией
+    SNAPSHOT_FLUSH_SIZE = int(os.getenv('API_WATCHER_SNAPSHOT_FLUSH_SIZE', '50'))
+    # Сколько секунд тело страницы считается свежим и не запрашивается повторно (0 - всегда
+    # запрашивать; повторные запросы всё равно условные, с If-None-Match/If-Modified-Since)
+    CACHE_TTL_SECONDS = int(os.getenv('API_WATCHER_CACHE_TTL', '0'))
     # Ограничение параллельности внутренних проверок документации (чтобы не пробивать лимиты)
     DOCS_FINDER_MAX_CONCURRENT = int(os.getenv('API_WATCHER_DOCS_FINDER_MAX_CONCURRENT', '4'))
+    # Время жизни кэша поиска OpenAPI по хосту (сек): найденные и ненайденные спецификации
+    DOCS_FINDER_CACHE_TTL = int(os.getenv('API_WATCHER_DOCS_FINDER_CACHE_TTL', str(6 * 3600)))
+    DOCS_FINDER_NEGATIVE_CACHE_TTL = int(os.getenv('API_WATCHER_DOCS_FINDER_NEGATIVE_CACHE_TTL', '3600'))
     # Ограничение на парсинг JSON (в символах) при валидации/детекте типа
     MAX_JSON_PARSE_CHARS = int(os.getenv('API_WATCHER_MAX_JSON_PARSE_CHARS', str(2 * 1024 * 1024)))  # 2M chars
     # Ограничение на конвертацию HTML->text (в символах) для защиты от тяжёлых страниц
@@ -51,6 +68,9 @@ class Config:
     # Предохранитель от выжигания баланса: дневной лимит запросов к ZenRows
     # -1 = безлимит, 0 = запретить ZenRows, >0 = максимум запросов/день
     ZENROWS_DAILY_REQUEST_LIMIT = int(os.getenv('API_WATCHER_ZENROWS_DAILY_REQUEST_LIMIT', '2000'))
+    # Собственный пул соединений ZenRows: все запросы идут на api.zenrows.com, поэтому
+    # лимит на хост - по параллельности тарифа ZenRows, а не FETCH_MAX_CONNECTIONS_PER_HOST
+    ZENROWS_MAX_CONNECTIONS = int(os.getenv('API_WATCHER_ZENROWS_MAX_CONNECTIONS', '10'))
     ZENROWS_STRATEGY: str = os.getenv('API_WATCHER_ZENROWS_STRATEGY', 'direct_first')  # direct_first | zenrows_only
     ZENROWS_SKIP_STATIC: bool = os.getenv('API_WATCHER_ZENROWS_SKIP_STATIC', 'true').lower() == 'true'
     ZENROWS_ANTIBOT: bool = os.getenv('API_WATCHER_ZENROWS_ANTIBOT', 'false').lower() == 'true'
@@ -71,6 +91,10 @@ class Config:
     OPENROUTER_MODEL: str = os.getenv('OPENROUTER_MODEL', 'anthropic/claude-3.5-sonnet')
     OPENROUTER_SITE_URL: Optional[str] = os.getenv('OPENROUTER_SITE_URL')
     OPENROUTER_APP_NAME: str = os.getenv('OPENROUTER_APP_NAME', 'API Watcher')
+    # Пакетный AI анализ за цикл: до AI_BATCH_SIZE изменений в одном запросе,
+    # неполная пачка отправляется, если новых изменений нет AI_BATCH_WAIT_MS мс
+    AI_BATCH_SIZE = int(os.getenv('API_WATCHER_AI_BATCH_SIZE', '10'))
+    AI_BATCH_WAIT_MS = int(os.getenv('API_WATCHER_AI_BATCH_WAIT_MS', '2000'))
     
     # Настройки Slack
     SLACK_BOT_TOKEN: Optional[str] = os.getenv('SLACK_BOT_TOKEN')
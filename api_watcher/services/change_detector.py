@@ -1,6 +1,6 @@
 import json
 import yaml
-from typing import Dict, Optional, Any, List
+from typing import Callable, Dict, Optional, Any, List
 
 from api_watcher.storage.repository import SnapshotRepository
 from api_watcher.notifier.base import NotifierManager, ChangeNotification
@@ -19,12 +19,92 @@ class ChangeDetector:
         self, 
         repository: SnapshotRepository,
         notifiers: NotifierManager,
-        ai_analyzer: Any = None
+        ai_analyzer: Any = None,
+        save_snapshot: Optional[Callable[..., Any]] = None,
+        ai_batch_size: int = 10,
+        note_pending_snapshot: Optional[Callable[..., Any]] = None
     ):
+        """
+        Args:
+            save_snapshot: Куда писать снэпшоты вместо repository.save
+                           (например, в пачку, сохраняемую в конце цикла)
+            ai_batch_size: Сколько HTML изменений отправлять в AI одним запросом
+                           в пакетном режиме (см. begin_ai_batch)
+            note_pending_snapshot: Вызывается с полями снэпшота, когда изменение
+                           встало в очередь AI: он будет сохранён только при
+                           flush_ai_batch, а повторный URL в том же цикле должен
+                           сравниваться уже с ним, а не со старым снэпшотом из БД
+        """
         self.repository = repository
         self.notifiers = notifiers
         self.ai_analyzer = ai_analyzer
+        self._save = save_snapshot or repository.save
+        self._note_pending = note_pending_snapshot
         self.comparator = SmartComparator()
+        self.ai_batch_size = max(1, ai_batch_size)
+        # HTML изменения, ожидающие AI анализа. None - пакетный режим выключен
+        self._ai_batch: Optional[List[Dict]] = None
+
+    def begin_ai_batch(self) -> None:
+        """
+        Включает пакетный AI анализ: HTML изменения копятся и анализируются
+        одним запросом на ai_batch_size штук. Результат detect_changes для
+        таких URL дополняется на месте при flush_ai_batch.
+        """
+        self._ai_batch = []
+
+    @property
+    def has_pending_ai(self) -> bool:
+        return bool(self._ai_batch)
+
+    def flush_ai_batch(self) -> None:
+        """Анализирует накопленные изменения, сохраняет снэпшоты и шлёт уведомления"""
+        if not self._ai_batch:
+            return
+        pending, self._ai_batch = self._ai_batch, []
+        
+        logger.info("ai_analysis_html_batch", size=len(pending))
+        try:
+            if hasattr(self.ai_analyzer, 'analyze_changes_batch'):
+                ai_results = self.ai_analyzer.analyze_changes_batch(
+                    [entry['ai_item'] for entry in pending]
+                )
+            else:
+                ai_results = [
+                    self.ai_analyzer.analyze_changes(
+                        entry['ai_item']['old_text'], entry['ai_item']['new_text'],
+                        entry['ai_item']['api_name'], entry['ai_item']['method_name']
+                    )
+                    for entry in pending
+                ]
+        except Exception as e:
+            logger.error("ai_batch_analysis_error", size=len(pending), error=str(e), exc_info=True)
+            ai_results = [None] * len(pending)
+        
+        for entry, ai_result in zip(pending, ai_results):
+            result = entry['result']
+            try:
+                final = self._finish_html(ai_result=ai_result or self._default_ai_result(), **entry['finish'])
+            except Exception as e:
+                logger.error("html_finish_error", url=result['url'], error=str(e), exc_info=True)
+                final = {'url': result['url'], 'has_changes': False, 'error': str(e)}
+            result.clear()
+            result.update(final)
+
+    def end_ai_batch(self) -> None:
+        """Досылает остаток пачки и возвращает немедленный AI анализ"""
+        try:
+            self.flush_ai_batch()
+        finally:
+            self._ai_batch = None
+
+    @staticmethod
+    def _default_ai_result() -> Dict:
+        return {
+            'has_significant_changes': True,
+            'summary': 'Changes detected',
+            'severity': 'moderate'
+        }
 
     def _save_snapshot(
         self,
@@ -40,7 +120,7 @@ class ChangeDetector:
         structured_data: Optional[dict] = None
     ) -> None:
         """Сохраняет snapshot в репозиторий (DRY helper)"""
-        self.repository.save(
+        self._save(
             url=url,
             raw_html=raw_html,
             text_content=text_content,
@@ -80,17 +160,21 @@ class ChangeDetector:
         content_type: str,
         url: str,
         api_name: Optional[str],
-        method_name: Optional[str]
+        method_name: Optional[str],
+        content_hash: Optional[str] = None
     ) -> Dict:
         """
         Orchestrates the comparison process based on content type.
+        
+        content_hash: calculate_hash(new_html), if the caller already has it.
         """
         if content_type == 'openapi':
-            return self._compare_openapi(old_snapshot, new_html, url, api_name, method_name)
+            compare = self._compare_openapi
         elif content_type == 'json':
-            return self._compare_json(old_snapshot, new_html, url, api_name, method_name)
+            compare = self._compare_json
         else:
-            return self._compare_html(old_snapshot, new_html, url, api_name, method_name)
+            compare = self._compare_html
+        return compare(old_snapshot, new_html, url, api_name, method_name, content_hash)
 
     def _compare_openapi(
         self,
@@ -98,10 +182,17 @@ class ChangeDetector:
         new_html: str,
         url: str,
         api_name: Optional[str],
-        method_name: Optional[str]
+        method_name: Optional[str],
+        content_hash: Optional[str] = None
     ) -> Dict:
         logger.info("comparing_openapi", url=url)
         
+        # Неизменный контент не нужно ни парсить, ни прогонять через DeepDiff
+        content_hash = content_hash or self.comparator.calculate_hash(new_html)
+        if not self.comparator.compare_hashed(old_snapshot.content_hash, new_html, content_hash):
+            logger.info("content_unchanged_hash_match", url=url)
+            return {'url': url, 'has_changes': False}
+        
         try:
             # Helper function to check if content is HTML
             def is_html_content(content: str) -> bool:
@@ -198,7 +289,6 @@ class ChangeDetector:
                 ai_summary = f"Minor changes ({change_count} items)"
             
             # Save snapshot
-            content_hash = self.comparator.calculate_hash(new_html)
             self._save_snapshot(
                 url=url,
                 raw_html=new_html,
@@ -239,10 +329,16 @@ class ChangeDetector:
         new_html: str,
         url: str,
         api_name: Optional[str],
-        method_name: Optional[str]
+        method_name: Optional[str],
+        content_hash: Optional[str] = None
     ) -> Dict:
         logger.info("comparing_json", url=url)
         
+        content_hash = content_hash or self.comparator.calculate_hash(new_html)
+        if not self.comparator.compare_hashed(old_snapshot.content_hash, new_html, content_hash):
+            logger.info("content_unchanged_hash_match", url=url)
+            return {'url': url, 'has_changes': False}
+        
         try:
             old_data = json.loads(old_snapshot.structured_data) if old_snapshot.structured_data else json.loads(old_snapshot.raw_html)
             new_data = json.loads(new_html)
@@ -255,7 +351,6 @@ class ChangeDetector:
             
             logger.info("json_changes_detected", url=url)
             
-            content_hash = self.comparator.calculate_hash(new_html)
             summary = f"JSON changes: {len(changes_dict)} items"
             
             self._save_snapshot(
@@ -288,13 +383,14 @@ class ChangeDetector:
         new_html: str,
         url: str,
         api_name: Optional[str],
-        method_name: Optional[str]
+        method_name: Optional[str],
+        content_hash: Optional[str] = None
     ) -> Dict:
         logger.info("comparing_html", url=url)
         
         # Fast hash check
-        new_hash = self.comparator.calculate_hash(new_html)
-        if old_snapshot.content_hash == new_hash:
+        new_hash = content_hash or self.comparator.calculate_hash(new_html)
+        if not self.comparator.compare_hashed(old_snapshot.content_hash, new_html, new_hash):
             logger.info("content_unchanged_hash_match", url=url)
             return {'url': url, 'has_changes': False}
         
@@ -308,19 +404,64 @@ class ChangeDetector:
         
         logger.info("html_changes_detected", url=url)
         
-        # AI analysis
-        ai_result = {
-            'has_significant_changes': True,
-            'summary': 'Changes detected',
-            'severity': 'moderate'
-        }
+        finish = dict(
+            url=url,
+            new_html=new_html,
+            new_text=new_text,
+            new_hash=new_hash,
+            api_name=api_name,
+            method_name=method_name
+        )
         
-        if self.ai_analyzer:
-            logger.info("ai_analysis_html", url=url)
-            ai_result = self.ai_analyzer.analyze_changes(
-                old_text, new_text, api_name, method_name
-            )
+        if not self.ai_analyzer:
+            return self._finish_html(ai_result=self._default_ai_result(), **finish)
+        
+        if self._ai_batch is not None:
+            # Итог появится при flush_ai_batch: словарь результата обновится на месте
+            result = {'url': url, 'has_changes': True, 'summary': 'AI analysis pending'}
+            self._ai_batch.append({
+                'result': result,
+                'finish': finish,
+                'ai_item': {
+                    'old_text': old_text,
+                    'new_text': new_text,
+                    'api_name': api_name,
+                    'method_name': method_name
+                }
+            })
+            if self._note_pending is not None:
+                self._note_pending(
+                    url=url,
+                    raw_html=new_html,
+                    text_content=new_text,
+                    api_name=api_name,
+                    method_name=method_name,
+                    content_type='html',
+                    content_hash=new_hash,
+                    has_changes=True
+                )
+            if len(self._ai_batch) >= self.ai_batch_size:
+                self.flush_ai_batch()
+            return result
         
+        # AI analysis
+        logger.info("ai_analysis_html", url=url)
+        ai_result = self.ai_analyzer.analyze_changes(
+            old_text, new_text, api_name, method_name
+        )
+        return self._finish_html(ai_result=ai_result, **finish)
+
+    def _finish_html(
+        self,
+        url: str,
+        new_html: str,
+        new_text: str,
+        new_hash: str,
+        api_name: Optional[str],
+        method_name: Optional[str],
+        ai_result: Dict
+    ) -> Dict:
+        """Сохраняет снэпшот и уведомляет по итогам AI анализа HTML изменений"""
         if not ai_result.get('has_significant_changes'):
             logger.info("insignificant_changes", url=url)
             self._save_snapshot(
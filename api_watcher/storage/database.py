@@ -3,10 +3,11 @@ Database models and manager for API Watcher
 Хранит HTML-снэпшоты с историей изменений
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import case, create_engine, event, func, Column, Integer, String, Text, DateTime, Boolean, Index
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker, declarative_base, load_only
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 import json
 
 Base = declarative_base()
@@ -38,6 +39,62 @@ class Snapshot(Base):
     
     # Хеш для быстрого сравнения
     content_hash = Column(String(64))
+    
+    __table_args__ = (
+        # Последние изменения и дайджест: WHERE has_changes = 1 ORDER BY created_at DESC
+        Index('ix_snap_changes_created', 'has_changes', 'created_at'),
+    )
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    WAL: веб-интерфейс читает БД, пока watcher пишет, и не ждёт блокировок.
+    synchronous=NORMAL в WAL безопасен для целостности и не делает fsync на каждый commit
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+# Полнотекстовый индекс для поиска в просмотрщиках: trigram-токенизатор ищет
+# подстроки, как LIKE '%q%', но без полного прохода по таблице. Триггеры держат
+# его в синхронизации со snapshots (external content таблица не хранит копию данных)
+SNAPSHOTS_FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE snapshots_fts USING fts5(
+        url, api_name, method_name,
+        content=snapshots, content_rowid=id, tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS snapshots_fts_ai AFTER INSERT ON snapshots BEGIN
+        INSERT INTO snapshots_fts(rowid, url, api_name, method_name)
+        VALUES (new.id, new.url, new.api_name, new.method_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS snapshots_fts_ad AFTER DELETE ON snapshots BEGIN
+        INSERT INTO snapshots_fts(snapshots_fts, rowid, url, api_name, method_name)
+        VALUES ('delete', old.id, old.url, old.api_name, old.method_name);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS snapshots_fts_au AFTER UPDATE ON snapshots BEGIN
+        INSERT INTO snapshots_fts(snapshots_fts, rowid, url, api_name, method_name)
+        VALUES ('delete', old.id, old.url, old.api_name, old.method_name);
+        INSERT INTO snapshots_fts(rowid, url, api_name, method_name)
+        VALUES (new.id, new.url, new.api_name, new.method_name);
+    END""",
+    # Индексирует уже существующие снэпшоты
+    "INSERT INTO snapshots_fts(snapshots_fts) VALUES ('rebuild')",
+]
+
+
+def _sqlite_supports_fts_trigram(connection) -> bool:
+    """Есть ли в SQLite этого процесса fts5 с trigram-токенизатором (SQLite 3.34+)"""
+    try:
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, tokenize='trigram')"
+        )
+        connection.exec_driver_sql("DROP TABLE temp.fts_probe")
+        return True
+    except OperationalError:
+        return False
 
 
 class DatabaseManager:
@@ -45,10 +102,39 @@ class DatabaseManager:
     
     def __init__(self, database_url: str):
         self.engine = create_engine(database_url)
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', _set_sqlite_pragmas)
         Base.metadata.create_all(self.engine)
+        # create_all не добавляет индексы в уже существующие таблицы
+        for index in Snapshot.__table__.indexes:
+            index.create(self.engine, checkfirst=True)
         Session = sessionmaker(bind=self.engine)
         self.session = Session()
     
+    def create_fts_index(self) -> bool:
+        """
+        Миграция: полнотекстовый индекс snapshots_fts и триггеры на snapshots.
+        Запускается явно (python db_viewer.py index), а не при подключении:
+        после неё каждая запись в snapshots пишет и в snapshots_fts, поэтому
+        SQLite всех процессов watcher'а должен поддерживать fts5 с trigram
+        
+        Returns:
+            True если индекс есть или создан, False если SQLite его не поддерживает
+        """
+        if self.engine.dialect.name != 'sqlite':
+            return False
+        with self.engine.connect() as connection:
+            if not _sqlite_supports_fts_trigram(connection):
+                return False
+        with self.engine.begin() as connection:
+            exists = connection.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snapshots_fts'"
+            ).first()
+            if exists is None:
+                for statement in SNAPSHOTS_FTS_SCHEMA:
+                    connection.exec_driver_sql(statement)
+        return True
+    
     def save_snapshot(
         self,
         url: str,
@@ -76,10 +162,38 @@ class DatabaseManager:
             ai_summary=ai_summary
         )
         
-        self.session.add(snapshot)
-        self.session.commit()
+        try:
+            self.session.add(snapshot)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
         return snapshot
     
+    def bulk_save_snapshots(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Сохраняет пачку снэпшотов одним INSERT и одним commit
+        
+        Args:
+            rows: Словари с полями save_snapshot (structured_data - dict)
+        """
+        if not rows:
+            return
+        mappings = []
+        for row in rows:
+            mapping = dict(row)
+            structured_data = mapping.get('structured_data')
+            mapping['structured_data'] = json.dumps(structured_data) if structured_data else None
+            mapping.setdefault('created_at', datetime.utcnow())
+            mappings.append(mapping)
+        
+        try:
+            self.session.bulk_insert_mappings(Snapshot, mappings)
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+    
     def get_latest_snapshot(self, url: str) -> Optional[Snapshot]:
         """Получает последний снэпшот для URL"""
         return self.session.query(Snapshot)\
@@ -100,6 +214,76 @@ class DatabaseManager:
         result = self.session.query(Snapshot.url).distinct().all()
         return [row[0] for row in result]
     
+    def _ranked_by_url(self):
+        """Подзапрос (id, rank): rank - номер снэпшота в истории своего URL, 1 - последний"""
+        rank = func.row_number().over(
+            partition_by=Snapshot.url,
+            order_by=Snapshot.created_at.desc()
+        ).label('rank')
+        return self.session.query(Snapshot.id.label('id'), rank).subquery()
+    
+    def get_latest_snapshots_per_url(self, limit: Optional[int] = None) -> List[Snapshot]:
+        """
+        Последний снэпшот каждого URL одним запросом, от новых к старым
+        (без raw_html, text_content и structured_data)
+        """
+        ranked = self._ranked_by_url()
+        query = self.session.query(Snapshot)\
+            .options(load_only(
+                Snapshot.url, Snapshot.api_name, Snapshot.method_name, Snapshot.content_type,
+                Snapshot.created_at, Snapshot.has_changes, Snapshot.ai_summary, Snapshot.content_hash
+            ))\
+            .join(ranked, Snapshot.id == ranked.c.id)\
+            .filter(ranked.c.rank == 1)\
+            .order_by(Snapshot.created_at.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    
+    def get_latest_snapshots_stats(self) -> Tuple[int, int]:
+        """
+        Returns:
+            (число URL, число URL, у которых в последнем снэпшоте есть изменения)
+        """
+        ranked = self._ranked_by_url()
+        total_urls, with_changes = self.session.query(
+            func.count(),
+            func.coalesce(func.sum(case((Snapshot.has_changes == True, 1), else_=0)), 0)
+        )\
+            .select_from(Snapshot)\
+            .join(ranked, Snapshot.id == ranked.c.id)\
+            .filter(ranked.c.rank == 1)\
+            .one()
+        return total_urls, with_changes
+    
+    def get_urls_with_history(self, limit: int = 5) -> List[Tuple[str, List[Snapshot]]]:
+        """
+        Последние limit снэпшотов для каждого URL одним запросом
+        (ROW_NUMBER() OVER (PARTITION BY url)) вместо запросов на каждый URL.
+        Тяжёлые поля (raw_html, text_content, structured_data) не загружаются
+        
+        Returns:
+            [(url, [снэпшоты от новых к старым])], URL по алфавиту
+        """
+        ranked = self._ranked_by_url()
+        
+        snapshots = self.session.query(Snapshot)\
+            .options(load_only(
+                Snapshot.url, Snapshot.api_name, Snapshot.method_name, Snapshot.content_type,
+                Snapshot.created_at, Snapshot.has_changes, Snapshot.ai_summary
+            ))\
+            .join(ranked, Snapshot.id == ranked.c.id)\
+            .filter(ranked.c.rank <= limit)\
+            .order_by(Snapshot.url, ranked.c.rank)\
+            .all()
+        
+        result: List[Tuple[str, List[Snapshot]]] = []
+        for snapshot in snapshots:
+            if not result or result[-1][0] != snapshot.url:
+                result.append((snapshot.url, []))
+            result[-1][1].append(snapshot)
+        return result
+    
     def get_snapshots_with_changes(self, days: int = 7) -> List[Snapshot]:
         """Получает снэпшоты с изменениями за последние N дней"""
         from datetime import timedelta
@@ -111,6 +295,38 @@ class DatabaseManager:
             .order_by(Snapshot.created_at.desc())\
             .all()
     
+    def get_snapshot_summaries(
+        self,
+        url: Optional[str] = None,
+        limit: int = 20,
+        days: int = 30
+    ) -> List[Any]:
+        """
+        Метаданные снэпшотов с длинами text_content/raw_html (text_len, html_len),
+        посчитанными в БД: сами тела не читаются
+        
+        Args:
+            url: История этого URL (limit последних); без него - изменения за days дней
+        """
+        query = self.session.query(
+            Snapshot.id, Snapshot.url, Snapshot.api_name, Snapshot.method_name,
+            Snapshot.content_type, Snapshot.created_at, Snapshot.has_changes,
+            Snapshot.content_hash, Snapshot.ai_summary,
+            func.length(Snapshot.text_content).label('text_len'),
+            func.length(Snapshot.raw_html).label('html_len')
+        )
+        if url:
+            query = query.filter(Snapshot.url == url)
+        else:
+            from datetime import timedelta
+            cutoff_date = datetime.utcnow() - timedelta(days=days)
+            query = query.filter(Snapshot.has_changes == True)\
+                .filter(Snapshot.created_at >= cutoff_date)
+        query = query.order_by(Snapshot.created_at.desc())
+        if url:
+            query = query.limit(limit)
+        return query.all()
+    
     def close(self):
         """Закрывает соединение с БД"""
         self.session.close()
@@ -4,7 +4,7 @@ Repository pattern for API Watcher
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, List, Protocol
+from typing import Any, Dict, Optional, List, Protocol, Tuple
 from datetime import datetime, timedelta
 
 from api_watcher.storage.database import Snapshot, DatabaseManager
@@ -30,6 +30,14 @@ class SnapshotRepository(ABC):
         """Сохраняет снэпшот"""
         pass
     
+    def bulk_save(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Сохраняет пачку снэпшотов (аргументы save в виде словарей).
+        По умолчанию - по одному; реализации могут писать одной транзакцией.
+        """
+        for row in rows:
+            self.save(**row)
+    
     @abstractmethod
     def get_latest(self, url: str) -> Optional[Snapshot]:
         """Получает последний снэпшот для URL"""
@@ -45,6 +53,13 @@ class SnapshotRepository(ABC):
         """Получает все отслеживаемые URL"""
         pass
     
+    def get_urls_with_history(self, limit: int = 5) -> List[Tuple[str, List[Snapshot]]]:
+        """
+        Все URL с их последними limit снэпшотами (от новых к старым).
+        По умолчанию - запросами на каждый URL; реализации могут делать один запрос.
+        """
+        return [(url, self.get_history(url, limit)) for url in sorted(self.get_all_urls())]
+    
     @abstractmethod
     def get_with_changes(self, days: int = 7) -> List[Snapshot]:
         """Получает снэпшоты с изменениями за период"""
@@ -88,6 +103,9 @@ class SQLAlchemySnapshotRepository(SnapshotRepository):
             ai_summary=ai_summary
         )
     
+    def bulk_save(self, rows: List[Dict[str, Any]]) -> None:
+        self._db.bulk_save_snapshots(rows)
+    
     def get_latest(self, url: str) -> Optional[Snapshot]:
         return self._db.get_latest_snapshot(url)
     
@@ -97,6 +115,9 @@ class SQLAlchemySnapshotRepository(SnapshotRepository):
     def get_all_urls(self) -> List[str]:
         return self._db.get_all_urls()
     
+    def get_urls_with_history(self, limit: int = 5) -> List[Tuple[str, List[Snapshot]]]:
+        return self._db.get_urls_with_history(limit)
+    
     def get_with_changes(self, days: int = 7) -> List[Snapshot]:
         return self._db.get_snapshots_with_changes(days)
     
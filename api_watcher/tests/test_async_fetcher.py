@@ -0,0 +1,64 @@
+"""
+Тесты для AsyncFetcher
+"""
+
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from api_watcher.utils.async_fetcher import AsyncFetcher
+
+
+def _response(status, body=b'', headers=None):
+    """Мок ответа aiohttp с потоковым телом"""
+    async def iter_chunked(size):
+        yield body
+
+    response = Mock()
+    response.status = status
+    response.headers = headers or {}
+    response.charset = 'utf-8'
+    response.content.iter_chunked = iter_chunked
+    return response
+
+
+class TestConditionalRequests:
+    """Тесты условных запросов (ETag / Last-Modified)"""
+
+    @pytest.mark.asyncio
+    async def test_not_modified_returns_cached_body(self):
+        """Тест: повторный запрос несёт валидаторы, на 304 возвращается прошлое тело"""
+        fetcher = AsyncFetcher()
+        session = Mock()
+        session.get.return_value.__aenter__ = AsyncMock(side_effect=[
+            _response(200, b'<p>v1</p>', {'ETag': '"abc"', 'Last-Modified': 'Mon, 01 Jan 2024 00:00:00 GMT'}),
+            _response(304),
+        ])
+        session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        with patch.object(fetcher, '_get_session', AsyncMock(return_value=session)):
+            first = await fetcher.fetch('https://api.example.com/docs')
+            second = await fetcher.fetch('https://api.example.com/docs')
+
+        assert first.content == second.content == '<p>v1</p>'
+        assert not first.not_modified and second.not_modified
+        assert second.success
+        assert session.get.call_args_list[0].kwargs['headers'] is None
+        assert session.get.call_args_list[1].kwargs['headers'] == {
+            'If-None-Match': '"abc"',
+            'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT',
+        }
+
+    @pytest.mark.asyncio
+    async def test_no_validators_no_conditional_headers(self):
+        """Тест: без ETag/Last-Modified запросы остаются безусловными"""
+        fetcher = AsyncFetcher()
+        session = Mock()
+        session.get.return_value.__aenter__ = AsyncMock(return_value=_response(200, b'body'))
+        session.get.return_value.__aexit__ = AsyncMock(return_value=False)
+
+        with patch.object(fetcher, '_get_session', AsyncMock(return_value=session)):
+            await fetcher.fetch('https://api.example.com/docs')
+            await fetcher.fetch('https://api.example.com/docs')
+
+        assert all(call.kwargs['headers'] is None for call in session.get.call_args_list)
@@ -0,0 +1,95 @@
+"""
+Тесты для ChangeDetector
+"""
+
+from unittest.mock import Mock
+
+import pytest
+
+from api_watcher.notifier.base import NotifierManager
+from api_watcher.services.change_detector import ChangeDetector
+from api_watcher.storage.repository import SnapshotRepository
+
+
+def _snapshot(html: str) -> Mock:
+    snapshot = Mock()
+    snapshot.raw_html = html
+    snapshot.content_hash = "0" * 16
+    return snapshot
+
+
+@pytest.fixture
+def analyzer():
+    analyzer = Mock(spec=['analyze_changes', 'analyze_changes_batch'])
+    analyzer.analyze_changes_batch.side_effect = lambda items: [
+        {'has_significant_changes': True, 'summary': f"AI: {item['api_name']}", 'severity': 'major'}
+        for item in items
+    ]
+    return analyzer
+
+
+@pytest.fixture
+def detector(analyzer):
+    return ChangeDetector(
+        repository=Mock(spec=SnapshotRepository),
+        notifiers=Mock(spec=NotifierManager),
+        ai_analyzer=analyzer,
+        ai_batch_size=2
+    )
+
+
+class TestAIBatch:
+    """Тесты пакетного AI анализа HTML изменений"""
+
+    def _detect(self, detector, index):
+        return detector.detect_changes(
+            _snapshot("<p>old</p>"), f"<p>new {index}</p>", 'html',
+            f"https://example.com/{index}", f"API {index}", None
+        )
+
+    def test_batch_flushed_by_size(self, detector, analyzer):
+        """Тест: пачка уходит одним запросом, результаты дополняются на месте"""
+        detector.begin_ai_batch()
+        first = self._detect(detector, 0)
+        assert first['summary'] == 'AI analysis pending'
+        assert detector.has_pending_ai
+
+        second = self._detect(detector, 1)
+
+        analyzer.analyze_changes_batch.assert_called_once()
+        analyzer.analyze_changes.assert_not_called()
+        assert first['summary'] == "AI: API 0"
+        assert second['severity'] == 'major'
+        assert detector.repository.save.call_count == 2
+        assert detector.notifiers.send_change.call_count == 2
+
+    def test_end_flushes_partial_batch(self, detector, analyzer):
+        """Тест: неполная пачка досылается при завершении пакетного режима"""
+        detector.begin_ai_batch()
+        result = self._detect(detector, 0)
+        detector.end_ai_batch()
+
+        assert result['summary'] == "AI: API 0"
+        assert not detector.has_pending_ai
+
+        # Вне пакетного режима анализ снова немедленный
+        analyzer.analyze_changes.return_value = {'has_significant_changes': False}
+        assert self._detect(detector, 1)['reason'] == 'insignificant'
+
+    def test_queued_change_reported_as_pending_snapshot(self, analyzer):
+        """Тест: изменение в очереди AI сразу сообщается как новый последний снэпшот"""
+        pending = []
+        detector = ChangeDetector(
+            repository=Mock(spec=SnapshotRepository),
+            notifiers=Mock(spec=NotifierManager),
+            ai_analyzer=analyzer,
+            ai_batch_size=2,
+            note_pending_snapshot=lambda **row: pending.append(row)
+        )
+        detector.begin_ai_batch()
+        self._detect(detector, 0)
+
+        assert [row['url'] for row in pending] == ["https://example.com/0"]
+        assert pending[0]['raw_html'] == "<p>new 0</p>"
+        assert pending[0]['has_changes']
+        detector.repository.save.assert_not_called()
@@ -64,3 +64,75 @@ async def test_fetch_deduplication_different_urls():
         assert mock_fetcher.fetch.call_count == 2
         mock_fetcher.fetch.assert_any_call(url1)
         mock_fetcher.fetch.assert_any_call(url2)
+
+@pytest.mark.asyncio
+async def test_failed_fetch_not_cached_for_cycle():
+    # A failed fetch must not poison the cache: the next caller retries
+    mock_fetcher = Mock(spec=ContentFetcher)
+    mock_fetcher.fetch = AsyncMock(side_effect=[RuntimeError("boom"), "content"])
+    
+    with patch('api_watcher.watcher.Config') as mock_config:
+        mock_config.DATABASE_URL = 'sqlite:///:memory:'
+        mock_config.CACHE_TTL_SECONDS = 0
+        mock_config.is_openrouter_configured.return_value = False
+        mock_config.is_gemini_configured.return_value = False
+        watcher = APIWatcher(fetcher=mock_fetcher)
+        
+        first = await watcher.fetch_content("http://example.com/page#a")
+        second = await watcher.fetch_content("http://example.com/page#b")
+        third = await watcher.fetch_content("http://example.com/page")
+        
+        assert first is None
+        assert second == "content"
+        assert third == "content"
+        # Success stays cached for the rest of the cycle
+        assert mock_fetcher.fetch.call_count == 2
+
+@pytest.mark.asyncio
+async def test_concurrency_capped_across_callers():
+    # Independent callers share one process-wide fetch semaphore
+    mock_fetcher = Mock(spec=ContentFetcher)
+    active = 0
+    peak = 0
+    
+    async def tracked_fetch(url):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return f"content for {url}"
+    
+    mock_fetcher.fetch = AsyncMock(side_effect=tracked_fetch)
+    
+    with patch('api_watcher.watcher.Config') as mock_config:
+        mock_config.DATABASE_URL = 'sqlite:///:memory:'
+        mock_config.CACHE_TTL_SECONDS = 0
+        mock_config.MAX_CONCURRENT = 2
+        mock_config.FETCH_RATE_PER_SEC = 0
+        mock_config.is_openrouter_configured.return_value = False
+        mock_config.is_gemini_configured.return_value = False
+        watcher = APIWatcher(fetcher=mock_fetcher)
+        
+        await asyncio.gather(*(
+            watcher.fetch_content(f"http://example.com/page{i}") for i in range(6)
+        ))
+        
+        assert mock_fetcher.fetch.call_count == 6
+        assert peak == 2
+
+@pytest.mark.asyncio
+async def test_bodies_not_kept_without_ttl():
+    # With CACHE_TTL_SECONDS=0 page bodies are not kept across cycles
+    mock_fetcher = Mock(spec=ContentFetcher)
+    mock_fetcher.fetch = AsyncMock(return_value="content")
+    
+    with patch('api_watcher.watcher.Config') as mock_config:
+        mock_config.DATABASE_URL = 'sqlite:///:memory:'
+        mock_config.CACHE_TTL_SECONDS = 0
+        mock_config.is_openrouter_configured.return_value = False
+        mock_config.is_gemini_configured.return_value = False
+        watcher = APIWatcher(fetcher=mock_fetcher)
+        
+        assert await watcher.fetch_content("http://example.com/page") == "content"
+        assert watcher._content_cache == {}
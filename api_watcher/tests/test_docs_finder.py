@@ -5,7 +5,16 @@
 import pytest
 import asyncio
 from unittest.mock import Mock, patch, AsyncMock
-from api_watcher.utils.docs_finder import APIDocsFinder, find_api_documentation
+from api_watcher.utils import docs_finder
+from api_watcher.utils.docs_finder import APIDocsFinder, find_api_documentation, close_shared_session
+
+
+@pytest.fixture(autouse=True)
+def clear_probe_cache():
+    """Очищает кэш проб OpenAPI между тестами"""
+    docs_finder._probe_cache.clear()
+    yield
+    docs_finder._probe_cache.clear()
 
 
 class TestAPIDocsFinder:
@@ -26,37 +35,161 @@ class TestAPIDocsFinder:
     async def test_find_openapi_direct_success(self):
         """Тест успешного прямого поиска OpenAPI"""
         async with APIDocsFinder() as finder:
-            # Мокаем HTTP запрос
-            with patch.object(finder.session, 'get') as mock_get:
+            # Мокаем HTTP запрос (HEAD достаточно, если Content-Type - JSON)
+            with patch.object(finder.session, 'head') as mock_head, \
+                    patch.object(finder.session, 'get') as mock_get:
                 # Создаем мок ответа
                 mock_response = AsyncMock()
                 mock_response.status = 200
                 mock_response.headers = {'Content-Type': 'application/json'}
-                mock_response.text = AsyncMock(return_value='{"openapi": "3.0.0"}')
                 
-                mock_get.return_value.__aenter__.return_value = mock_response
+                mock_head.return_value.__aenter__.return_value = mock_response
                 
                 result = await finder.find_openapi_direct('https://api.example.com/v1/users')
                 
                 # Проверяем, что был найден URL
                 assert result is not None
                 assert 'api.example.com' in result
+                mock_get.assert_not_called()
     
     @pytest.mark.asyncio
     async def test_find_openapi_direct_not_found(self):
         """Тест когда OpenAPI не найден"""
         async with APIDocsFinder() as finder:
-            with patch.object(finder.session, 'get') as mock_get:
+            with patch.object(finder.session, 'head') as mock_head, \
+                    patch.object(finder.session, 'get') as mock_get:
                 # Все запросы возвращают 404
                 mock_response = AsyncMock()
                 mock_response.status = 404
                 
-                mock_get.return_value.__aenter__.return_value = mock_response
+                mock_head.return_value.__aenter__.return_value = mock_response
                 
                 result = await finder.find_openapi_direct('https://api.example.com/v1/users')
                 
                 assert result is None
+                # На 404 от HEAD тело не запрашиваем
+                mock_get.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_probe_uses_range_get_for_html(self):
+        """Тест: при не-JSON Content-Type тело читается через Range GET"""
+        async with APIDocsFinder() as finder:
+            with patch.object(finder.session, 'head') as mock_head, \
+                    patch.object(finder.session, 'get') as mock_get, \
+                    patch.object(finder, '_read_body_probe', AsyncMock(return_value=b'{"Swagger": "2.0"}')):
+                head_response = AsyncMock()
+                head_response.status = 200
+                head_response.headers = {'Content-Type': 'text/plain'}
+                mock_head.return_value.__aenter__.return_value = head_response
+                
+                get_response = AsyncMock()
+                get_response.status = 206
+                get_response.headers = {'Content-Type': 'text/plain'}
+                mock_get.return_value.__aenter__.return_value = get_response
+                
+                assert await finder._probe_openapi_url('https://api.example.com/swagger')
+                assert mock_get.call_args.kwargs['headers']['Range'].startswith('bytes=0-')
     
+    @pytest.mark.asyncio
+    async def test_probe_rejects_html_body(self):
+        """Тест: HTML-страница (например Swagger UI) не считается спецификацией"""
+        body = b'  <!DOCTYPE html><html><title>Swagger UI</title></html>'
+        async with APIDocsFinder() as finder:
+            with patch.object(finder.session, 'head') as mock_head, \
+                    patch.object(finder.session, 'get') as mock_get, \
+                    patch.object(finder, '_read_body_probe', AsyncMock(return_value=body)):
+                head_response = AsyncMock()
+                head_response.status = 200
+                head_response.headers = {'Content-Type': 'text/html'}
+                mock_head.return_value.__aenter__.return_value = head_response
+                
+                get_response = AsyncMock()
+                get_response.status = 200
+                get_response.headers = {'Content-Type': 'text/html'}
+                mock_get.return_value.__aenter__.return_value = get_response
+                
+                assert not await finder._probe_openapi_url('https://api.example.com/docs')
+    
+    @pytest.mark.asyncio
+    async def test_find_openapi_direct_cancels_stragglers(self):
+        """Тест: первый успешный путь возвращается сразу, остальные пробы отменяются"""
+        cancelled = []
+
+        async def fake_check(base_url, path):
+            if path == '/openapi.json':
+                return f"{base_url}{path}"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(path)
+                raise
+            return None
+
+        async with APIDocsFinder() as finder:
+            with patch.object(finder, '_check_openapi_path', side_effect=fake_check):
+                result = await asyncio.wait_for(
+                    finder.find_openapi_direct('https://api.example.com/v1/users'),
+                    timeout=1
+                )
+
+        assert result == 'https://api.example.com/openapi.json'
+        assert cancelled
+
+    @pytest.mark.asyncio
+    async def test_find_openapi_direct_probes_in_tiers(self):
+        """Тест: при попадании в первой волне остальные пути не проверяются"""
+        checked = []
+
+        async def fake_check(base_url, path):
+            checked.append(path)
+            return f"{base_url}{path}" if path == '/swagger.json' else None
+
+        async with APIDocsFinder() as finder:
+            with patch.object(finder, '_check_openapi_path', side_effect=fake_check):
+                result = await finder.find_openapi_direct('https://api.example.com/v1/users')
+
+        assert result == 'https://api.example.com/swagger.json'
+        assert set(checked) <= set(docs_finder._OPENAPI_PATH_TIERS[0])
+
+    @pytest.mark.asyncio
+    async def test_find_openapi_direct_cached_per_host(self):
+        """Тест: повторные и конкурентные вызовы для одного хоста делают одну пробу"""
+        async with APIDocsFinder() as finder:
+            probe = AsyncMock(return_value='https://api.example.com/openapi.json')
+            with patch.object(finder, '_probe_standard_paths', probe):
+                results = await asyncio.gather(
+                    finder.find_openapi_direct('https://api.example.com/v1/users'),
+                    finder.find_openapi_direct('https://api.example.com/v1/orders'),
+                )
+                again = await finder.find_openapi_direct('https://api.example.com/v2/items')
+
+        assert results == ['https://api.example.com/openapi.json'] * 2
+        assert again == 'https://api.example.com/openapi.json'
+        probe.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_find_openapi_direct_prunes_expired_hosts(self):
+        """Тест: новая проба вытесняет из кэша истёкшие записи других хостов"""
+        async with APIDocsFinder() as finder:
+            stale = asyncio.get_running_loop().create_future()
+            stale.set_result(None)
+            docs_finder._probe_cache['https://old.example.com'] = (0.0, stale)
+            with patch.object(finder, '_probe_standard_paths', AsyncMock(return_value=None)):
+                await finder.find_openapi_direct('https://api.example.com/v1/users')
+
+        assert list(docs_finder._probe_cache) == ['https://api.example.com']
+
+    @pytest.mark.asyncio
+    async def test_session_shared_between_finders(self):
+        """Тест: finder'ы используют общую сессию и не закрывают её на выходе"""
+        async with APIDocsFinder() as first:
+            session = first.session
+        async with APIDocsFinder() as second:
+            assert second.session is session
+        assert not session.closed
+        await close_shared_session()
+        assert session.closed
+
     @pytest.mark.asyncio
     async def test_search_via_serpapi_success(self):
         """Тест успешного поиска через SerpAPI"""
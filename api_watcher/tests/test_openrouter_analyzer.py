@@ -2,6 +2,8 @@
 Тесты для OpenRouter AI Analyzer
 """
 
+import json
+
 import pytest
 from unittest.mock import Mock, patch
 from api_watcher.utils.openrouter_analyzer import OpenRouterAnalyzer
@@ -129,6 +131,68 @@ class TestOpenRouterAnalyzer:
         assert "Добавлено: 2 элементов" in result
         assert "Удалено: 1 элементов" in result
     
+    @patch.object(OpenRouterAnalyzer, '_make_request')
+    def test_analyze_changes_batch_single_request(self, mock_request):
+        """Тест пакетного анализа: один запрос, результаты в исходном порядке"""
+        mock_request.return_value = '''```json
+[
+    {"id": 1, "has_significant_changes": false, "summary": "Опечатка", "severity": "minor"},
+    {"id": 0, "has_significant_changes": true, "summary": "Новый метод", "severity": "moderate", "key_changes": ["POST /users"]}
+]
+```'''
+        
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        results = analyzer.analyze_changes_batch([
+            {'old_text': 'a', 'new_text': 'b', 'api_name': 'Users API', 'method_name': None},
+            {'old_text': 'c', 'new_text': 'd', 'api_name': 'Orders API', 'method_name': 'list'},
+        ])
+        
+        mock_request.assert_called_once()
+        prompt = mock_request.call_args[0][0][0]['content']
+        assert '=== ИЗМЕНЕНИЕ 1 ===' in prompt
+        assert results[0]['summary'] == "Новый метод"
+        assert results[1]['has_significant_changes'] is False
+        assert results[1]['key_changes'] == []
+    
+    @patch.object(OpenRouterAnalyzer, '_make_request')
+    def test_analyze_changes_batch_missing_item_retried(self, mock_request):
+        """Тест: изменение, пропущенное моделью, анализируется отдельным запросом"""
+        mock_request.side_effect = [
+            '[{"id": 0, "summary": "Первое"}]',
+            '{"has_significant_changes": true, "summary": "Второе", "severity": "major"}'
+        ]
+        
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        results = analyzer.analyze_changes_batch([
+            {'old_text': 'a', 'new_text': 'b'},
+            {'old_text': 'c', 'new_text': 'd'},
+        ])
+        
+        assert mock_request.call_count == 2
+        assert [r['summary'] for r in results] == ["Первое", "Второе"]
+    
+    @patch.object(OpenRouterAnalyzer, '_make_request')
+    def test_analyze_changes_batch_keeps_full_text_window(self, mock_request):
+        """Тест: тексты в пачке не урезаются сильнее одиночного запроса, пачка делится по бюджету"""
+        mock_request.side_effect = lambda messages: json.dumps([
+            {"id": i, "has_significant_changes": True, "summary": str(i)} for i in range(10)
+        ])
+        
+        analyzer = OpenRouterAnalyzer(api_key="test-key")
+        items = [
+            {'old_text': 'a' * 2999 + 'X', 'new_text': 'b' * 2999 + 'Y'}
+            for _ in range(10)
+        ]
+        results = analyzer.analyze_changes_batch(items)
+        
+        per_request = analyzer.BATCH_TEXT_BUDGET // (2 * analyzer.TEXT_LIMIT)
+        assert mock_request.call_count == -(-10 // per_request)
+        for call in mock_request.call_args_list:
+            prompt = call[0][0][0]['content']
+            assert prompt.count('X\n') == prompt.count('Y\n') == prompt.count('СТАРАЯ ВЕРСИЯ:')
+            assert len(prompt) < analyzer.BATCH_TEXT_BUDGET + 2000
+        assert len(results) == 10
+    
     def test_get_model_info(self):
         """Тест получения информации о модели"""
         analyzer = OpenRouterAnalyzer(
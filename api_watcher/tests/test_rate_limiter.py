@@ -0,0 +1,47 @@
+"""
+Тесты для AsyncTokenBucket
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from api_watcher.utils.rate_limiter import AsyncTokenBucket
+
+
+class TestAsyncTokenBucket:
+    """Тесты token bucket ограничителя"""
+
+    @pytest.mark.asyncio
+    async def test_burst_is_immediate(self):
+        """Тест: первые burst запросов проходят без ожидания"""
+        bucket = AsyncTokenBucket(rate_per_sec=1, burst=5)
+
+        start = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+
+        assert time.monotonic() - start < 0.1
+
+    @pytest.mark.asyncio
+    async def test_rate_limits_after_burst(self):
+        """Тест: после исчерпания burst запросы идут со скоростью rate"""
+        bucket = AsyncTokenBucket(rate_per_sec=20, burst=1)
+
+        start = time.monotonic()
+        await asyncio.gather(*(bucket.acquire() for _ in range(4)))
+
+        # 1 из burst + 3 по 1/20 с
+        assert time.monotonic() - start >= 0.14
+
+    @pytest.mark.asyncio
+    async def test_zero_rate_is_unlimited(self):
+        """Тест: rate <= 0 отключает ограничение"""
+        bucket = AsyncTokenBucket(rate_per_sec=0, burst=1)
+
+        start = time.monotonic()
+        for _ in range(100):
+            await bucket.acquire()
+
+        assert time.monotonic() - start < 0.1
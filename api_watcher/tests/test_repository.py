@@ -0,0 +1,213 @@
+"""
+Тесты для SQLAlchemySnapshotRepository
+"""
+
+import pytest
+
+from api_watcher.storage.repository import SQLAlchemySnapshotRepository
+
+
+@pytest.fixture
+def repository():
+    repo = SQLAlchemySnapshotRepository('sqlite:///:memory:')
+    yield repo
+    repo.close()
+
+
+class TestBulkSave:
+    """Тесты пакетного сохранения снэпшотов"""
+
+    def test_bulk_save_inserts_all_rows(self, repository):
+        """Тест: пачка снэпшотов сохраняется и читается как обычные save"""
+        repository.bulk_save([
+            {
+                'url': 'https://api.example.com/a',
+                'raw_html': '{"openapi": "3.0.0"}',
+                'text_content': '{"openapi": "3.0.0"}',
+                'content_type': 'openapi',
+                'structured_data': {'openapi': '3.0.0'},
+                'content_hash': 'h1',
+            },
+            {
+                'url': 'https://api.example.com/b',
+                'raw_html': '<p>b</p>',
+                'text_content': 'b',
+                'content_hash': 'h2',
+                'has_changes': True,
+                'ai_summary': 'Changed',
+            },
+        ])
+
+        first = repository.get_latest('https://api.example.com/a')
+        second = repository.get_latest('https://api.example.com/b')
+
+        assert first.structured_data == '{"openapi": "3.0.0"}'
+        assert first.created_at is not None
+        assert second.has_changes and second.ai_summary == 'Changed'
+        assert sorted(repository.get_all_urls()) == [
+            'https://api.example.com/a', 'https://api.example.com/b'
+        ]
+
+    def test_bulk_save_empty_is_noop(self, repository):
+        """Тест: пустая пачка не пишет ничего"""
+        repository.bulk_save([])
+
+        assert repository.get_all_urls() == []
+
+
+class TestIndexes:
+    """Тесты индексов таблицы снэпшотов"""
+
+    def test_changes_index_added_to_existing_table(self, temp_dir):
+        """Тест: индекс по (has_changes, created_at) появляется и в старой БД"""
+        import os
+        import sqlite3
+
+        db_path = os.path.join(temp_dir, 'old.db')
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE snapshots (id INTEGER PRIMARY KEY, url VARCHAR(500) NOT NULL, "
+            "api_name VARCHAR(200), method_name VARCHAR(200), content_type VARCHAR(50), "
+            "raw_html TEXT, text_content TEXT, structured_data TEXT, created_at DATETIME, "
+            "has_changes BOOLEAN, ai_summary TEXT, content_hash VARCHAR(64))"
+        )
+        conn.close()
+
+        SQLAlchemySnapshotRepository(f'sqlite:///{db_path}').close()
+
+        conn = sqlite3.connect(db_path)
+        indexes = {row[1] for row in conn.execute("PRAGMA index_list(snapshots)")}
+        conn.close()
+        assert 'ix_snap_changes_created' in indexes
+
+
+class TestSQLitePragmas:
+    """Тесты настроек соединения SQLite"""
+
+    def test_file_database_uses_wal(self, temp_dir):
+        """Тест: файловая БД переводится в WAL, чтобы читатели не ждали запись"""
+        import os
+        import sqlite3
+
+        db_path = os.path.join(temp_dir, 'wal.db')
+        SQLAlchemySnapshotRepository(f'sqlite:///{db_path}').close()
+
+        conn = sqlite3.connect(db_path)
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        conn.close()
+        assert journal_mode == 'wal'
+
+
+class TestFtsIndex:
+    """Тесты миграции полнотекстового индекса"""
+
+    def test_fts_index_created_only_on_request(self, temp_dir):
+        """Тест: подключение не меняет схему, явная миграция индексирует старые и новые снэпшоты"""
+        import os
+        import sqlite3
+
+        db_path = os.path.join(temp_dir, 'fts.db')
+        repository = SQLAlchemySnapshotRepository(f'sqlite:///{db_path}')
+        try:
+            repository.save('https://api.example.com/users', '<p>a</p>', 'a', api_name='Users API')
+
+            conn = sqlite3.connect(db_path)
+            has_fts = "SELECT 1 FROM sqlite_master WHERE name = 'snapshots_fts'"
+            assert conn.execute(has_fts).fetchone() is None
+
+            if not repository._db.create_fts_index():
+                pytest.skip("SQLite без fts5/trigram")
+            repository.save('https://api.example.com/orders', '<p>b</p>', 'b', api_name='Orders API')
+
+            match = "SELECT rowid FROM snapshots_fts WHERE snapshots_fts MATCH ?"
+            assert len(conn.execute(match, ('"example"',)).fetchall()) == 2
+            assert len(conn.execute(match, ('"Orders"',)).fetchall()) == 1
+            conn.close()
+        finally:
+            repository.close()
+
+
+class TestUrlsWithHistory:
+    """Тесты выборки последних снэпшотов по всем URL"""
+
+    def test_groups_latest_snapshots_per_url(self, repository):
+        """Тест: история сгруппирована по URL, от новых к старым, не длиннее limit"""
+        from datetime import datetime, timedelta
+
+        start = datetime(2024, 1, 1)
+        repository.bulk_save([
+            {
+                'url': url,
+                'raw_html': f'<p>{i}</p>',
+                'text_content': str(i),
+                'content_hash': f'{url}-{i}',
+                'created_at': start + timedelta(minutes=i),
+            }
+            for url, count in (('https://api.example.com/b', 4), ('https://api.example.com/a', 2))
+            for i in range(count)
+        ])
+
+        result = repository.get_urls_with_history(limit=3)
+
+        assert [url for url, _ in result] == [
+            'https://api.example.com/a', 'https://api.example.com/b'
+        ]
+        assert [s.text_content for s in result[0][1]] == ['1', '0']
+        assert [s.text_content for s in result[1][1]] == ['3', '2', '1']
+
+
+class TestSnapshotSummaries:
+    """Тесты выборки метаданных снэпшотов без тел"""
+
+    def test_lengths_computed_in_database(self, repository):
+        """Тест: длины текста и HTML приходят из БД вместе с метаданными"""
+        repository.bulk_save([
+            {
+                'url': 'https://api.example.com/a',
+                'raw_html': '<p>привет</p>',
+                'text_content': 'привет',
+                'content_hash': 'h1',
+                'has_changes': True,
+            },
+        ])
+
+        by_url = repository._db.get_snapshot_summaries('https://api.example.com/a')
+        changed = repository._db.get_snapshot_summaries()
+
+        assert len(by_url) == 1 and len(changed) == 1
+        assert by_url[0].content_hash == 'h1'
+        assert (by_url[0].text_len, by_url[0].html_len) == (6, 13)
+
+
+class TestLatestSnapshotsPerUrl:
+    """Тесты выборки последних снэпшотов всех URL"""
+
+    def test_latest_per_url_and_stats(self, repository):
+        """Тест: по одному последнему снэпшоту на URL, от новых к старым, и их статистика"""
+        from datetime import datetime, timedelta
+
+        start = datetime(2024, 1, 1)
+        repository.bulk_save([
+            {
+                'url': url,
+                'raw_html': '<p></p>',
+                'text_content': '',
+                'content_hash': f'{url}-{minute}',
+                'has_changes': has_changes,
+                'created_at': start + timedelta(minutes=minute),
+            }
+            for url, minute, has_changes in (
+                ('https://api.example.com/a', 5, True),
+                ('https://api.example.com/a', 1, False),
+                ('https://api.example.com/b', 3, False),
+                ('https://api.example.com/b', 2, True),
+                ('https://api.example.com/c', 4, True),
+            )
+        ])
+
+        latest = repository._db.get_latest_snapshots_per_url(limit=2)
+
+        assert [s.content_hash for s in latest] == [
+            'https://api.example.com/a-5', 'https://api.example.com/c-4'
+        ]
+        assert repository._db.get_latest_snapshots_stats() == (3, 2)
@@ -0,0 +1,174 @@
+"""
+Тесты для SmartComparator
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from api_watcher.utils.smart_comparator import SmartComparator, SELECTOLAX_AVAILABLE
+
+
+@pytest.fixture
+def comparator():
+    return SmartComparator()
+
+
+class TestHtmlToText:
+    """Тесты конвертации HTML в текст"""
+
+    @pytest.mark.skipif(not SELECTOLAX_AVAILABLE, reason="selectolax не установлен")
+    def test_extracts_blocks_and_links(self, comparator):
+        """Тест: блоки разделяются строками, ссылки сохраняют href, скрипты отбрасываются"""
+        html = (
+            '<html><head><style>p {color: red}</style></head><body>'
+            '<h1>Users API</h1>'
+            '<p>See   <a href="/docs/users">docs</a>\n for details</p>'
+            '<script>var x = 1;</script>'
+            '</body></html>'
+        )
+
+        text = comparator.html_to_text(html)
+
+        assert text.splitlines() == ['Users API', 'See docs (/docs/users) for details']
+
+    def test_oversized_html_keeps_head_and_tail(self, comparator):
+        """Тест: из огромного HTML (str и bytes) берутся начало и конец"""
+        html = '<p>HEAD</p>' + '<p>filler</p>' * 1000 + '<p>TAIL</p>'
+
+        with patch('api_watcher.utils.smart_comparator.Config') as mock_config:
+            mock_config.MAX_HTML_TO_TEXT_CHARS = 200
+            text = comparator.html_to_text(html)
+            text_from_bytes = comparator.html_to_text(html.encode('utf-8'))
+
+        assert 'HEAD' in text and 'TAIL' in text
+        assert text_from_bytes == text
+
+    def test_text_change_detected(self, comparator):
+        """Тест: изменение видимого текста обнаруживается"""
+        has_changes, old_text, new_text = comparator.compare_html_text(
+            '<p>limit: 100</p>', '<p>limit: 200</p>'
+        )
+
+        assert has_changes
+        assert '100' in old_text
+        assert '200' in new_text
+
+    def test_markup_only_change_ignored(self, comparator):
+        """Тест: изменения только в разметке не считаются изменением текста"""
+        has_changes, _, _ = comparator.compare_html_text(
+            '<div class="a"><p>Same text</p></div>',
+            '<div class="b"><p>Same text</p></div>'
+        )
+
+        assert not has_changes
+
+
+class TestHashing:
+    """Тесты хеширования и сравнения с сохранённым хешем"""
+
+    def test_hash_accepts_str_and_bytes(self, comparator):
+        """Тест: str и его UTF-8 байты дают одинаковый хеш"""
+        assert comparator.calculate_hash('контент') == comparator.calculate_hash('контент'.encode('utf-8'))
+        assert comparator.calculate_hash('a') != comparator.calculate_hash('b')
+
+    def test_compare_hashed(self, comparator):
+        """Тест сравнения нового контента с сохранённым хешем"""
+        stored = comparator.calculate_hash('<p>v1</p>')
+
+        assert not comparator.compare_hashed(stored, '<p>v1</p>')
+        assert comparator.compare_hashed(stored, '<p>v2</p>')
+        assert comparator.compare_hashed(None, '<p>v1</p>')
+
+    def test_compare_hashed_legacy_sha256(self, comparator):
+        """Тест: снапшоты с SHA-256 хешем продолжают сравниваться корректно"""
+        import hashlib
+        legacy = hashlib.sha256('<p>v1</p>'.encode('utf-8')).hexdigest()
+
+        assert not comparator.compare_hashed(legacy, '<p>v1</p>')
+        assert comparator.compare_hashed(legacy, '<p>v2</p>')
+
+    def test_compare_hashed_legacy_blake2b(self, comparator):
+        """Тест: снапшоты с BLAKE2b-128 хешем сравниваются даже при переданном новом хеше"""
+        import hashlib
+        legacy = hashlib.blake2b('<p>v1</p>'.encode('utf-8'), digest_size=16).hexdigest()
+        new_hash = comparator.calculate_hash('<p>v1</p>')
+
+        assert not comparator.compare_hashed(legacy, '<p>v1</p>', new_hash)
+        assert comparator.compare_hashed(legacy, '<p>v2</p>')
+
+    def test_crypto_hash_is_sha256(self, comparator):
+        """Тест: crypto=True даёт SHA-256"""
+        import hashlib
+        assert comparator.calculate_hash('x', crypto=True) == hashlib.sha256(b'x').hexdigest()
+
+
+class TestStructuredCompare:
+    """Тесты структурного сравнения OpenAPI/JSON"""
+
+    @staticmethod
+    def _spec(paths_count=50):
+        return {
+            'openapi': '3.0.0',
+            'info': {'title': 'API', 'version': '1.0.0'},
+            'paths': {
+                f'/items{i}': {'get': {'responses': {'200': {'description': f'item {i}'}}}}
+                for i in range(paths_count)
+            },
+            'components': {'schemas': {'Item': {'type': 'object', 'required': ['id']}}},
+        }
+
+    def test_compare_openapi_matches_full_diff(self, comparator):
+        """Тест: отсечение совпадающих веток даёт тот же результат, что полный DeepDiff"""
+        from deepdiff import DeepDiff
+
+        old_spec = self._spec()
+        new_spec = self._spec()
+        new_spec['info']['version'] = '1.1.0'
+        new_spec['paths']['/items3']['get']['responses']['200']['description'] = 'changed'
+        new_spec['paths']['/new'] = {'post': {}}
+        del new_spec['paths']['/items7']
+
+        has_changes, changes = comparator.compare_openapi(old_spec, new_spec)
+        expected = DeepDiff(
+            old_spec, new_spec, ignore_order=True, verbose_level=2,
+            exclude_paths=["root['info']['version']", "root['servers']"]
+        )
+
+        assert has_changes
+        assert changes == dict(expected)
+        categories = comparator.categorize_openapi_changes(changes)
+        assert categories['new_endpoints'] and categories['removed_endpoints']
+
+    def test_compare_openapi_unchanged(self, comparator):
+        """Тест: одинаковые спецификации не дают изменений"""
+        has_changes, changes = comparator.compare_openapi(self._spec(), self._spec())
+
+        assert not has_changes
+        assert changes is None
+
+    def test_old_spec_hash_tree_reused(self, comparator):
+        """Тест: дерево хешей базовой спецификации считается один раз на содержимое"""
+        from api_watcher.utils import smart_comparator
+
+        old_spec = self._spec()
+        old_spec['info']['title'] = 'Cached API'
+        changed = self._spec()
+        changed['paths']['/items1']['get'] = {}
+
+        with patch.object(
+            smart_comparator, '_build_hash_tree', wraps=smart_comparator._build_hash_tree
+        ) as build:
+            first = comparator.compare_openapi(old_spec, changed)
+            builds = build.call_count
+            # Тот же базовый документ, но новый объект (как после загрузки из БД)
+            second = comparator.compare_openapi(self._spec() | {'info': dict(old_spec['info'])}, changed)
+
+        assert first == second
+        assert builds and build.call_count == builds
+
+    def test_compare_json_yaml_int_keys(self, comparator):
+        """Тест: нестроковые ключи (YAML) не ломают сравнение"""
+        has_changes, _ = comparator.compare_json({200: {'a': 1}}, {200: {'a': 2}})
+
+        assert has_changes
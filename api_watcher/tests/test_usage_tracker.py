@@ -0,0 +1,79 @@
+"""
+Тесты для UsageTracker
+"""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from api_watcher.utils.usage_tracker import UsageTracker
+
+
+def _make_tracker(temp_dir):
+    with patch('api_watcher.utils.usage_tracker.Config') as mock_config:
+        mock_config.SNAPSHOTS_DIR = os.path.join(temp_dir, 'snapshots')
+        return UsageTracker()
+
+
+@pytest.fixture
+def tracker(temp_dir):
+    """UsageTracker, пишущий статистику во временную директорию"""
+    tracker = _make_tracker(temp_dir)
+    yield tracker
+    tracker.close()
+
+
+class TestUsageTracker:
+    """Тесты для класса UsageTracker"""
+
+    def test_increment_and_get_usage(self, tracker):
+        """Тест подсчёта использования за день"""
+        tracker.increment('zenrows')
+        tracker.increment('zenrows', 2)
+
+        assert tracker.get_usage('zenrows') == 3
+        assert tracker.get_usage('serpapi') == 0
+
+    def test_can_use_respects_limit(self, tracker):
+        """Тест проверки лимитов"""
+        assert tracker.can_use('zenrows', -1)
+        assert not tracker.can_use('zenrows', 0)
+
+        tracker.increment('zenrows', 2)
+        assert tracker.can_use('zenrows', 3)
+        assert not tracker.can_use('zenrows', 2)
+
+    def test_try_increment_stops_at_limit(self, tracker):
+        """Тест: try_increment учитывает вызов только в пределах лимита"""
+        assert tracker.try_increment('zenrows', 2)
+        assert tracker.try_increment('zenrows', 2)
+        assert not tracker.try_increment('zenrows', 2)
+        assert not tracker.try_increment('zenrows', 0)
+
+        assert tracker.get_usage('zenrows') == 2
+
+    def test_counters_shared_between_instances(self, tracker, temp_dir):
+        """Тест: два трекера (как два процесса) видят общие счётчики"""
+        other = _make_tracker(temp_dir)
+        try:
+            tracker.increment('zenrows')
+            other.increment('zenrows')
+
+            assert tracker.get_usage('zenrows') == 2
+            assert other.get_usage('zenrows') == 2
+        finally:
+            other.close()
+
+    def test_imports_legacy_json_stats(self, temp_dir):
+        """Тест: статистика из старого usage_stats.json переносится в БД"""
+        legacy = {UsageTracker._get_today_key(None): {'zenrows': 7}}
+        with open(os.path.join(temp_dir, 'usage_stats.json'), 'w') as f:
+            json.dump(legacy, f)
+
+        tracker = _make_tracker(temp_dir)
+        try:
+            assert tracker.get_usage('zenrows') == 7
+        finally:
+            tracker.close()
@@ -2,10 +2,12 @@
 Unit tests for Refactored APIWatcher
 """
 
+import json
+import os
 import pytest
 import asyncio
 from unittest.mock import Mock, patch, MagicMock, AsyncMock
-from api_watcher.watcher import APIWatcher
+from api_watcher.watcher import APIWatcher, _load_urls_file
 from api_watcher.storage.repository import SnapshotRepository
 from api_watcher.utils.async_fetcher import ContentFetcher
 from api_watcher.notifier.base import NotifierManager
@@ -32,6 +34,10 @@ class TestAPIWatcherRefactored:
         # Patch Config to avoid side effects
         with patch('api_watcher.watcher.Config') as mock_config:
             mock_config.DATABASE_URL = 'sqlite:///:memory:'
+            # Defaults of the real Config: no body cache across cycles, no rate limit
+            mock_config.CACHE_TTL_SECONDS = 0
+            mock_config.FETCH_RATE_PER_SEC = 0
+            mock_config.SNAPSHOT_FLUSH_SIZE = 50
             mock_config.is_openrouter_configured.return_value = False
             mock_config.is_gemini_configured.return_value = False
             
@@ -106,4 +112,194 @@ class TestAPIWatcherRefactored:
         assert result['url'] == url
         assert result['has_changes'] is False
         mock_repository.save.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_body_skips_analysis(self, watcher, mock_repository, mock_fetcher):
+        """Test an unchanged body (e.g. 304) is hashed once per fetch and not parsed"""
+        url = "http://example.com/docs#auth"
+        content = "<html><body>Content</body></html>" + "<!-- padding -->" * 10
+        mock_fetcher.fetch.return_value = content
+        
+        old_snapshot = Mock()
+        old_snapshot.content_hash = watcher.comparator.calculate_hash(content)
+        mock_repository.get_latest.return_value = old_snapshot
+        
+        with patch.object(watcher.comparator, 'calculate_hash', wraps=watcher.comparator.calculate_hash) as hasher, \
+                patch.object(watcher.content_processor, 'detect_content_type') as detect, \
+                patch.object(watcher.change_detector, 'detect_changes') as detect_changes:
+            await watcher.process_url(url)
+            # Next cycle: the fetcher returns the same body object again
+            watcher._inflight.clear()
+            result = await watcher.process_url(url)
+        
+        assert result == {'url': url, 'has_changes': False}
+        assert mock_fetcher.fetch.call_count == 2
+        assert hasher.call_count == 2
+        detect.assert_not_called()
+        detect_changes.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_cached_body_hash_reused_with_ttl(self, watcher, mock_repository, mock_fetcher):
+        """Test with CACHE_TTL_SECONDS > 0 a fresh cached body is neither refetched nor rehashed"""
+        url = "http://example.com/docs"
+        content = "<html><body>Content</body></html>" + "<!-- padding -->" * 10
+        mock_fetcher.fetch.return_value = content
+        watcher.config.CACHE_TTL_SECONDS = 60
+        
+        old_snapshot = Mock()
+        old_snapshot.content_hash = watcher.comparator.calculate_hash(content)
+        mock_repository.get_latest.return_value = old_snapshot
+        
+        with patch.object(watcher.comparator, 'calculate_hash', wraps=watcher.comparator.calculate_hash) as hasher:
+            await watcher.process_url(url)
+            watcher._inflight.clear()
+            result = await watcher.process_url(url)
+        
+        assert result == {'url': url, 'has_changes': False}
+        assert mock_fetcher.fetch.call_count == 1
+        assert hasher.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_send_weekly_digest_off_loop(self, watcher, mock_repository, mock_notifier_manager):
+        """Test digest query and notifiers run in a worker thread"""
+        import threading
+        loop_thread = threading.get_ident()
+        threads = []
+        mock_repository.get_with_changes.side_effect = lambda days: threads.append(threading.get_ident()) or []
+        mock_notifier_manager.send_digest.side_effect = lambda changes: threads.append(threading.get_ident())
+        
+        await watcher.send_weekly_digest()
+        
+        mock_notifier_manager.send_digest.assert_called_once_with([])
+        assert len(threads) == 2 and loop_thread not in threads
+    
+    def test_snapshots_flushed_in_chunks(self, watcher, mock_repository):
+        """Test a cycle writes full chunks as it goes and the rest at the end"""
+        watcher._snapshot_flush_size = 2
+        watcher._pending_snapshots = []
+        for i in range(5):
+            watcher._save_snapshot(url=f"http://api/{i}", raw_html="", text_content="")
+        
+        assert mock_repository.bulk_save.call_count == 2
+        assert len(watcher._pending_snapshots) == 1
+        watcher._flush_snapshots()
+        
+        written = [row['url'] for call in mock_repository.bulk_save.call_args_list for row in call.args[0]]
+        assert written == [f"http://api/{i}" for i in range(5)]
+        assert watcher._pending_snapshots is None
+    
+    def test_failed_bulk_save_falls_back_to_single_rows(self, watcher, mock_repository):
+        """Test one bad snapshot does not drop the rest of the batch"""
+        mock_repository.bulk_save.side_effect = Exception("constraint failed")
+        mock_repository.save.side_effect = [None, Exception("bad row"), None]
+        watcher._pending_snapshots = []
+        for i in range(3):
+            watcher._save_snapshot(url=f"http://api/{i}", raw_html="", text_content="")
+        
+        watcher._flush_snapshots()
+        
+        assert [call.kwargs['url'] for call in mock_repository.save.call_args_list] == [
+            f"http://api/{i}" for i in range(3)
+        ]
+
 
+class TestLatestSnapshotCache:
+    """Tests for the per-cycle get_latest cache"""
+    
+    def test_repeated_url_queries_db_once(self):
+        """Test a URL seen twice in a cycle is compared with the queued snapshot"""
+        repository = Mock(spec=SnapshotRepository)
+        repository.get_latest.return_value = None
+        with patch('api_watcher.watcher.Config') as mock_config:
+            mock_config.SNAPSHOT_FLUSH_SIZE = 50
+            mock_config.is_openrouter_configured.return_value = False
+            mock_config.is_gemini_configured.return_value = False
+            watcher = APIWatcher(
+                repository=repository,
+                fetcher=Mock(spec=ContentFetcher),
+                notifier_manager=Mock(spec=NotifierManager)
+            )
+        
+        html = "<html><body>" + "docs " * 50 + "</body></html>"
+        watcher._pending_snapshots = []
+        watcher._latest_snapshot_cache = {}
+        first = watcher._analyze_stage("http://api/docs", html, "API", None)
+        second = watcher._analyze_stage("http://api/docs", html, "API", None)
+        
+        assert first['is_first_snapshot']
+        assert second == {'url': "http://api/docs", 'has_changes': False}
+        repository.get_latest.assert_called_once_with("http://api/docs")
+        assert len(watcher._pending_snapshots) == 1
+
+
+class TestLoadUrlsFile:
+    """Tests for URLs file loading"""
+    
+    def test_items_reported_in_order_and_cached(self, temp_dir):
+        """Test every entry reaches on_item, also when served from the cache"""
+        path = os.path.join(temp_dir, 'urls.json')
+        entries = [{'url': f'http://api/{i}'} for i in range(3)]
+        with open(path, 'w') as f:
+            json.dump(entries, f)
+        
+        seen = []
+        assert _load_urls_file(path, lambda index, item: seen.append((index, item['url']))) == entries
+        assert _load_urls_file(path, lambda index, item: seen.append((index, item['url']))) == entries
+        
+        assert seen == [(i, f'http://api/{i}') for i in range(3)] * 2
+
+
+class TestLockfile:
+    """Tests for the single-instance lockfile"""
+    
+    def test_second_acquire_fails_and_stale_file_is_ignored(self, temp_dir):
+        """Test lock held by a live fd blocks; a leftover file alone does not"""
+        import os
+        from api_watcher.watcher import _acquire_lockfile, _release_lockfile
+        
+        lock_path = os.path.join(temp_dir, '.api_watcher.lock')
+        # Leftover file from a crashed run
+        with open(lock_path, 'w') as f:
+            f.write('12345')
+        
+        fd = _acquire_lockfile(lock_path)
+        try:
+            with pytest.raises(FileExistsError):
+                _acquire_lockfile(lock_path)
+        finally:
+            _release_lockfile(fd, lock_path)
+        
+        fd = _acquire_lockfile(lock_path)
+        _release_lockfile(fd, lock_path)
+
+
+class TestContentTypeCache:
+    """Tests for per-URL content type memoization"""
+    
+    @pytest.fixture
+    def watcher(self):
+        with patch('api_watcher.watcher.Config') as mock_config:
+            mock_config.is_openrouter_configured.return_value = False
+            mock_config.is_gemini_configured.return_value = False
+            return APIWatcher(
+                repository=Mock(spec=SnapshotRepository),
+                fetcher=Mock(spec=ContentFetcher),
+                notifier_manager=Mock(spec=NotifierManager)
+            )
+    
+    def test_detected_once_per_url(self, watcher):
+        """Test similar bodies reuse the cached type"""
+        with patch.object(watcher.content_processor, 'detect_content_type', return_value='json') as detect:
+            assert watcher._detect_content_type_cached("http://api/data", '{"a": 1}') == 'json'
+            assert watcher._detect_content_type_cached("http://api/data", '{"a": 2}') == 'json'
+        
+        detect.assert_called_once()
+    
+    def test_redetected_when_body_changes_shape(self, watcher):
+        """Test a body of another kind or size triggers detection again"""
+        with patch.object(watcher.content_processor, 'detect_content_type', side_effect=['json', 'html', 'html']) as detect:
+            watcher._detect_content_type_cached("http://api/data", '{"a": 1}')
+            assert watcher._detect_content_type_cached("http://api/data", '<html>...</') == 'html'
+            watcher._detect_content_type_cached("http://api/data", '<html>' + 'x' * 100)
+        
+        assert detect.call_count == 3
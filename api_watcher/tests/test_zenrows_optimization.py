@@ -171,3 +171,20 @@ class TestZenRowsOptimization:
             assert result.success is False
             assert "consecutive errors" in result.error.lower()
             assert mock_session.get.call_count == call_count_before  # No new calls
+
+    async def test_content_fetcher_uses_separate_zenrows_pool(self):
+        """ZenRows gets its own pool, not capped by the per-host limit of direct fetches"""
+        from api_watcher.utils.async_fetcher import ContentFetcher
+
+        fetcher = ContentFetcher(zenrows_api_key="test_key")
+        try:
+            direct_session = await fetcher._direct._get_session()
+            zenrows_session = await fetcher._zenrows._get_session()
+
+            assert zenrows_session is not direct_session
+            assert zenrows_session.connector.limit_per_host == fetcher._zenrows.max_connections
+            assert zenrows_session.connector.limit_per_host > direct_session.connector.limit_per_host
+        finally:
+            await fetcher.close()
+        assert direct_session.closed
+        assert zenrows_session.closed
@@ -4,7 +4,7 @@ Async content fetcher using aiohttp
 """
 
 import asyncio
-from typing import Optional, List
+from typing import Dict, Optional, List
 from dataclasses import dataclass
 
 import aiohttp
@@ -51,6 +51,16 @@ class FetchResult:
     error: Optional[str] = None
     url: str = ""
     attempts: int = 1
+    # 304 Not Modified: content взят из кэша условных запросов
+    not_modified: bool = False
+
+
+@dataclass
+class _CachedResponse:
+    """Валидаторы и тело последнего ответа 200 для условных запросов"""
+    content: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
 
 
 # Retryable HTTP status codes
@@ -80,21 +90,39 @@ class AsyncFetcher:
         user_agent: str = Config.USER_AGENT,
         max_retries: int = DEFAULT_MAX_RETRIES,
         retry_delay: float = DEFAULT_RETRY_DELAY,
-        retry_multiplier: float = DEFAULT_RETRY_MULTIPLIER
+        retry_multiplier: float = DEFAULT_RETRY_MULTIPLIER,
+        max_connections: Optional[int] = None,
+        max_connections_per_host: Optional[int] = None
     ):
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.headers = {'User-Agent': user_agent}
         self.max_retries = max_retries
         self.retry_delay = retry_delay
         self.retry_multiplier = retry_multiplier
+        self.max_connections = max_connections or int(getattr(Config, "FETCH_MAX_CONNECTIONS", 10))
+        self.max_connections_per_host = (
+            max_connections_per_host or int(getattr(Config, "FETCH_MAX_CONNECTIONS_PER_HOST", 4))
+        )
         self._session: Optional[aiohttp.ClientSession] = None
+        # URL -> последний ответ с ETag/Last-Modified; на 304 тело не скачивается повторно
+        self._conditional_cache: Dict[str, _CachedResponse] = {}
     
     async def _get_session(self) -> aiohttp.ClientSession:
-        """Получает или создает сессию"""
+        """
+        Получает или лениво создает долгоживущую сессию.
+        Пул соединений ограничен и переиспользует keep-alive соединения между циклами,
+        так что TCP+TLS рукопожатие не повторяется на каждый URL.
+        """
         if self._session is None or self._session.closed:
             self._session = aiohttp.ClientSession(
                 timeout=self.timeout,
-                headers=self.headers
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections_per_host,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=30
+                )
             )
         return self._session
     
@@ -102,6 +130,27 @@ class AsyncFetcher:
         """Проверяет, можно ли повторить запрос для данного статуса"""
         return status_code in RETRYABLE_STATUS_CODES
     
+    @staticmethod
+    def _conditional_headers(cached: Optional[_CachedResponse]) -> Optional[Dict[str, str]]:
+        """Заголовки If-None-Match/If-Modified-Since по валидаторам прошлого ответа"""
+        if cached is None:
+            return None
+        headers = {}
+        if cached.etag:
+            headers['If-None-Match'] = cached.etag
+        if cached.last_modified:
+            headers['If-Modified-Since'] = cached.last_modified
+        return headers or None
+    
+    def _remember_validators(self, url: str, response: aiohttp.ClientResponse, content: str) -> None:
+        """Запоминает тело ответа, если сервер прислал ETag или Last-Modified"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if etag or last_modified:
+            self._conditional_cache[url] = _CachedResponse(content, etag, last_modified)
+        else:
+            self._conditional_cache.pop(url, None)
+    
     async def fetch(self, url: str, retry: bool = True) -> FetchResult:
         """
         Асинхронно получает контент URL с retry логикой
@@ -124,7 +173,19 @@ class AsyncFetcher:
             attempts = attempt + 1
             try:
                 session = await self._get_session()
-                async with session.get(url) as response:
+                cached = self._conditional_cache.get(url)
+                headers = self._conditional_headers(cached)
+                async with session.get(url, headers=headers) as response:
+                    if response.status == 304 and cached is not None:
+                        logger.debug("not_modified", url=url)
+                        return FetchResult(
+                            content=cached.content,
+                            status_code=response.status,
+                            success=True,
+                            url=url,
+                            attempts=attempts,
+                            not_modified=True
+                        )
                     try:
                         max_bytes = max(1, int(getattr(Config, "MAX_RESPONSE_BYTES", 2 * 1024 * 1024)))
                         content = await _read_text_limited(response, max_bytes=max_bytes)
@@ -155,6 +216,9 @@ class AsyncFetcher:
                         delay *= self.retry_multiplier
                         continue
                     
+                    if response.status == 200:
+                        self._remember_validators(url, response, content)
+                    
                     return FetchResult(
                         content=content,
                         status_code=response.status,
@@ -251,12 +315,20 @@ class AsyncZenRowsFetcher:
         timeout: int = 60,
         max_retries: int = DEFAULT_MAX_RETRIES,
         usage_tracker: Optional[UsageTracker] = None,
-        daily_request_limit: Optional[int] = None
+        daily_request_limit: Optional[int] = None,
+        max_connections: Optional[int] = None
     ):
+        """
+        Args:
+            max_connections: Размер собственного пула соединений. Все запросы идут
+                             на один хост (api.zenrows.com), поэтому лимит на хост
+                             равен общему и не зависит от пула прямых запросов
+        """
         self.api_key = api_key
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
         self._session: Optional[aiohttp.ClientSession] = None
+        self.max_connections = max_connections or int(getattr(Config, "ZENROWS_MAX_CONNECTIONS", 10))
         self.usage_tracker = usage_tracker or UsageTracker()
         self.daily_request_limit = (
             int(daily_request_limit)
@@ -266,7 +338,15 @@ class AsyncZenRowsFetcher:
     
     async def _get_session(self) -> aiohttp.ClientSession:
         if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession(timeout=self.timeout)
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    limit_per_host=self.max_connections,
+                    ttl_dns_cache=300,
+                    keepalive_timeout=30
+                )
+            )
         return self._session
     
     async def fetch(
@@ -295,8 +375,10 @@ class AsyncZenRowsFetcher:
         for attempt in range(self.max_retries):
             try:
                 session = await self._get_session()
-                # Предохранитель: ZenRows может сжигать бюджет при частом polling или ретраях
-                if not self.usage_tracker.can_use("zenrows", self.daily_request_limit):
+                # Предохранитель: ZenRows может сжигать бюджет при частом polling или ретраях.
+                # Проверка лимита и учёт вызова - одна транзакция, общая для всех процессов;
+                # считаем каждый реальный вызов ZenRows (платный), даже если вернётся ошибка
+                if not self.usage_tracker.try_increment("zenrows", self.daily_request_limit):
                     logger.error(
                         "zenrows_daily_limit_exceeded",
                         url=url,
@@ -312,9 +394,8 @@ class AsyncZenRowsFetcher:
                         attempts=attempt + 1
                     )
 
-                # Считаем каждый реальный вызов ZenRows (платный), даже если вернётся ошибка
-                self.usage_tracker.increment("zenrows", 1)
-                async with session.get(self.BASE_URL, params=params) as response:
+                # Таймаут ZenRows (рендеринг JS) длиннее таймаута общей сессии
+                async with session.get(self.BASE_URL, params=params, timeout=self.timeout) as response:
                     try:
                         max_bytes = max(1, int(getattr(Config, "MAX_RESPONSE_BYTES", 2 * 1024 * 1024)))
                         content = await _read_text_limited(response, max_bytes=max_bytes)
@@ -504,6 +585,7 @@ class ContentFetcher:
         await self._direct.close()
         if self._zenrows:
             await self._zenrows.close()
+        self._usage_tracker.close()
     
     async def __aenter__(self):
         return self
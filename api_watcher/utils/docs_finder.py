@@ -5,53 +5,133 @@ API Documentation Finder Integration
 
 import logging
 import asyncio
-from typing import Optional, Dict
+import contextlib
+import json
+import re
+import time
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import urlparse
 import aiohttp
+from aiohttp.resolver import AsyncResolver
+
+try:
+    import aiodns  # noqa: F401  (нужен AsyncResolver'у)
+    AIODNS_AVAILABLE = True
+except ImportError:
+    AIODNS_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from api_watcher.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Парсер JSON-ответов: orjson (C) если установлен
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Маркеры OpenAPI/Swagger: один проход C-движка regex по сырым байтам, без lower()-копии
+_OPENAPI_RE = re.compile(rb'openapi|swagger|"paths"\s*:|"info"\s*:', re.IGNORECASE)
+# Тело начинается с разметки (HTML Swagger UI, XML) - это не JSON/YAML спецификация
+_MARKUP_START_RE = re.compile(rb'(?:\xef\xbb\xbf)?\s*<')
+
+# Стандартные пути OpenAPI/Swagger документации, сгруппированные по вероятности попадания
+_OPENAPI_PATH_TIERS: List[List[str]] = [
+    ['/openapi.json', '/swagger.json', '/v3/openapi.json', '/openapi.yaml'],
+    ['/swagger.yaml', '/api-docs', '/api-docs.json', '/v1/openapi.json', '/v2/openapi.json', '/api/openapi.json'],
+    ['/docs/openapi.json', '/api/swagger.json', '/api/swagger.yaml', '/redoc', '/swagger', '/swagger-ui'],
+]
+
+# Общая сессия для всех поисков документации: пул соединений, keep-alive и DNS-кэш
+# переживают отдельные вызовы find_api_documentation
+_shared_session: Optional[aiohttp.ClientSession] = None
+_shared_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Кэш результатов find_openapi_direct: base_url -> (monotonic expiry, future с URL или None)
+_probe_cache: Dict[str, Tuple[float, asyncio.Future]] = {}
+
+
+def _prune_probe_cache(now: float) -> None:
+    """Удаляет из кэша проб истёкшие записи, чтобы он не рос с каждым новым хостом"""
+    expired = [base_url for base_url, (expires_at, _) in _probe_cache.items() if expires_at <= now]
+    for base_url in expired:
+        del _probe_cache[base_url]
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Возвращает общую сессию, создавая её при первом обращении (или для нового event loop)"""
+    global _shared_session, _shared_session_loop
+    loop = asyncio.get_running_loop()
+    if _shared_session is None or _shared_session.closed or _shared_session_loop is not loop:
+        # aiodns резолвит асинхронно по UDP, без пула потоков getaddrinfo
+        resolver = AsyncResolver() if AIODNS_AVAILABLE else None
+        _shared_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=30),
+            connector=aiohttp.TCPConnector(
+                limit=64,
+                limit_per_host=8,
+                ttl_dns_cache=300,
+                resolver=resolver
+            )
+        )
+        _shared_session_loop = loop
+    return _shared_session
+
+
+async def close_shared_session() -> None:
+    """Закрывает общую сессию (вызывается при остановке watcher'а)"""
+    global _shared_session, _shared_session_loop
+    if _shared_session and not _shared_session.closed:
+        await _shared_session.close()
+    _shared_session = None
+    _shared_session_loop = None
+
 
 class APIDocsFinder:
     """
     Адаптер для поиска документации API через различные источники
     """
     
-    def __init__(self, serpapi_key: Optional[str] = None):
+    def __init__(
+        self,
+        serpapi_key: Optional[str] = None,
+        session: Optional[aiohttp.ClientSession] = None
+    ):
         """
         Инициализация поисковика документации
         
         Args:
             serpapi_key: Ключ SerpAPI для поисковых запросов
+            session: Внешняя aiohttp сессия (по умолчанию - общая сессия модуля)
         """
         self.serpapi_key = serpapi_key
-        self.session: Optional[aiohttp.ClientSession] = None
+        self.session: Optional[aiohttp.ClientSession] = session
+        self._external_session = session
         self._semaphore: Optional[asyncio.Semaphore] = None
 
-    async def _read_text_probe(self, response: aiohttp.ClientResponse) -> str:
+    async def _read_body_probe(self, response: aiohttp.ClientResponse) -> bytes:
         """
-        Читает только ограниченный объём текста для эвристик (openapi/swagger),
+        Читает только ограниченный объём тела для эвристик (openapi/swagger),
         чтобы не триггерить излишний парсинг больших страниц.
+        Возвращает сырые байты: декодирование для regex-поиска не нужно.
         """
-        max_bytes = max(1, int(getattr(Config, "MAX_PROBE_BYTES", 256 * 1024)))
+        max_bytes = max(1, int(getattr(Config, "MAX_PROBE_BYTES", 16 * 1024)))
         collected = bytearray()
-        async for chunk in response.content.iter_chunked(32 * 1024):
+        async for chunk in response.content.iter_chunked(min(max_bytes, 32 * 1024)):
             if not chunk:
                 continue
             collected.extend(chunk)
             if len(collected) >= max_bytes:
                 break
 
-        charset = response.charset or "utf-8"
-        return collected.decode(charset, errors="replace")
+        return bytes(collected)
     
     async def __aenter__(self):
         """Async context manager entry"""
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=30)
-        )
+        self.session = self._external_session or await _get_session()
         self._semaphore = asyncio.Semaphore(
             max(1, int(getattr(Config, "DOCS_FINDER_MAX_CONCURRENT", 4)))
         )
@@ -59,8 +139,8 @@ class APIDocsFinder:
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """Async context manager exit"""
-        if self.session:
-            await self.session.close()
+        # Сессия не принадлежит finder'у (общая или внешняя) - не закрываем её
+        self.session = None
         self._semaphore = None
     
     @staticmethod
@@ -99,48 +179,62 @@ class APIDocsFinder:
         
         full_url = f"{base_url}{path}"
         
+        # Внутренние проверки лимитируем семафором, иначе это пробивает общий max_concurrent watcher'а.
+        # Вне контекстного менеджера семафора нет - используем пустой контекст
+        limiter = self._semaphore or contextlib.nullcontext()
         try:
-            # Внутренние проверки лимитируем семафором, иначе это пробивает общий max_concurrent watcher'а
-            if self._semaphore:
-                async with self._semaphore:
-                    async with self.session.get(full_url, allow_redirects=True) as response:
-                        if response.status == 200:
-                            content_type = response.headers.get('Content-Type', '')
-                            
-                            # Проверяем, что это JSON или YAML
-                            if 'json' in content_type or 'yaml' in content_type or 'yml' in content_type:
-                                logger.info(f"✅ Найдена OpenAPI документация: {full_url}")
-                                return full_url
-                            
-                            # Проверяем содержимое на наличие OpenAPI/Swagger (только preview)
-                            try:
-                                text = await self._read_text_probe(response)
-                                text_lower = text.lower()
-                                if any(keyword in text_lower for keyword in ['openapi', 'swagger', '"paths":', '"info":']):
-                                    logger.info(f"✅ Найдена OpenAPI документация: {full_url}")
-                                    return full_url
-                            except Exception:
-                                pass
-            else:
-                async with self.session.get(full_url, allow_redirects=True) as response:
-                    if response.status == 200:
-                        content_type = response.headers.get('Content-Type', '')
-                        if 'json' in content_type or 'yaml' in content_type or 'yml' in content_type:
-                            logger.info(f"✅ Найдена OpenAPI документация: {full_url}")
-                            return full_url
-                        try:
-                            text = await self._read_text_probe(response)
-                            text_lower = text.lower()
-                            if any(keyword in text_lower for keyword in ['openapi', 'swagger', '"paths":', '"info":']):
-                                logger.info(f"✅ Найдена OpenAPI документация: {full_url}")
-                                return full_url
-                        except Exception:
-                            pass
+            async with limiter:
+                if await self._probe_openapi_url(full_url):
+                    logger.info(f"✅ Найдена OpenAPI документация: {full_url}")
+                    return full_url
         
         except Exception as e:
             logger.debug(f"Не удалось проверить {full_url}: {e}")
         
         return None
+
+    @staticmethod
+    def _is_spec_content_type(content_type: str) -> bool:
+        """Проверяет, что Content-Type соответствует JSON или YAML"""
+        return 'json' in content_type or 'yaml' in content_type or 'yml' in content_type
+
+    async def _probe_openapi_url(self, full_url: str) -> bool:
+        """
+        Дешёвая проверка URL: сначала HEAD (только заголовки), и лишь если
+        ответ выглядит многообещающе - GET с Range на первые MAX_PROBE_BYTES байт
+        
+        Args:
+            full_url: Полный URL кандидата
+            
+        Returns:
+            True если по URL похоже находится OpenAPI/Swagger спецификация
+        """
+        async with self.session.head(full_url, allow_redirects=True) as response:
+            # Некоторые серверы не поддерживают HEAD - в этом случае сразу идём в GET
+            if response.status not in (405, 501):
+                if response.status != 200:
+                    return False
+                if self._is_spec_content_type(response.headers.get('Content-Type', '')):
+                    return True
+        
+        max_bytes = max(1, int(getattr(Config, "MAX_PROBE_BYTES", 16 * 1024)))
+        headers = {'Range': f'bytes=0-{max_bytes - 1}'}
+        async with self.session.get(full_url, headers=headers, allow_redirects=True) as response:
+            # 206 - сервер поддержал Range, 200 - отдал тело целиком (читаем только префикс)
+            if response.status not in (200, 206):
+                return False
+            if self._is_spec_content_type(response.headers.get('Content-Type', '')):
+                return True
+            
+            # Проверяем содержимое на наличие OpenAPI/Swagger (только preview)
+            try:
+                raw = await self._read_body_probe(response)
+            except Exception:
+                return False
+            # Очевидные отрицательные ответы отсекаем по первому байту, без скана всего preview
+            if _MARKUP_START_RE.match(raw):
+                return False
+            return _OPENAPI_RE.search(raw) is not None
     
     async def find_openapi_direct(self, url: str) -> Optional[str]:
         """
@@ -157,43 +251,93 @@ class APIDocsFinder:
             logger.warning(f"Не удалось извлечь базовый URL из {url}")
             return None
         
-        logger.info(f"🔍 Поиск OpenAPI документации для {base_url}")
+        # Один хост обычно обслуживает десятки отслеживаемых URL - переиспользуем
+        # результат пробы (в т.ч. отрицательный), а конкурентные вызовы ждут одну пробу
+        loop = asyncio.get_running_loop()
+        cached = _probe_cache.get(base_url)
+        if cached:
+            expires_at, future = cached
+            if time.monotonic() < expires_at and future.get_loop() is loop:
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise
+                    return None
         
-        # Стандартные пути для OpenAPI/Swagger документации
-        standard_paths = [
-            '/openapi.json',
-            '/openapi.yaml',
-            '/swagger.json',
-            '/swagger.yaml',
-            '/api-docs',
-            '/api-docs.json',
-            '/v1/openapi.json',
-            '/v2/openapi.json',
-            '/v3/openapi.json',
-            '/docs/openapi.json',
-            '/api/openapi.json',
-            '/redoc',
-            '/swagger',
-            '/swagger-ui',
-            '/api/swagger.json',
-            '/api/swagger.yaml'
-        ]
+        future = loop.create_future()
+        positive_ttl = max(0, int(getattr(Config, "DOCS_FINDER_CACHE_TTL", 6 * 3600)))
+        now = time.monotonic()
+        _prune_probe_cache(now)
+        _probe_cache[base_url] = (now + positive_ttl, future)
+        try:
+            result = await self._probe_standard_paths(base_url)
+        except BaseException:
+            _probe_cache.pop(base_url, None)
+            future.cancel()
+            raise
         
-        # Проверяем все пути параллельно
-        tasks = [
-            self._check_openapi_path(base_url, path)
-            for path in standard_paths
-        ]
+        if not result:
+            negative_ttl = max(0, int(getattr(Config, "DOCS_FINDER_NEGATIVE_CACHE_TTL", 3600)))
+            _probe_cache[base_url] = (time.monotonic() + negative_ttl, future)
+        future.set_result(result)
+        return result
+
+    async def _probe_standard_paths(self, base_url: str) -> Optional[str]:
+        """
+        Проверяет стандартные пути OpenAPI/Swagger для базового URL
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        Args:
+            base_url: Базовый URL API
+            
+        Returns:
+            URL найденной документации или None
+        """
+        logger.info(f"🔍 Поиск OpenAPI документации для {base_url}")
         
-        # Возвращаем первый найденный результат
-        for result in results:
-            if result and not isinstance(result, Exception):
+        # Волны по приоритету: следующая запускается, только если вся предыдущая промахнулась
+        for tier in _OPENAPI_PATH_TIERS:
+            result = await self._probe_paths(base_url, tier)
+            if result:
                 return result
-        
+
         logger.info(f"❌ OpenAPI документация не найдена для {base_url}")
         return None
+
+    async def _probe_paths(self, base_url: str, paths: List[str]) -> Optional[str]:
+        """
+        Параллельно проверяет пути и возвращается на первом успехе,
+        не дожидаясь самых медленных проб
+        
+        Args:
+            base_url: Базовый URL API
+            paths: Пути-кандидаты
+            
+        Returns:
+            URL найденной документации или None
+        """
+        pending = {
+            asyncio.create_task(self._check_openapi_path(base_url, path))
+            for path in paths
+        }
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.cancelled() or task.exception() is not None:
+                        continue
+                    result = task.result()
+                    if result:
+                        return result
+        finally:
+            # Отменяем оставшиеся пробы, чтобы освободить семафор и соединения
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        return None
     
     async def search_via_serpapi(
         self,
@@ -237,7 +381,7 @@ class APIDocsFinder:
                 params=params
             ) as response:
                 if response.status == 200:
-                    data = await response.json()
+                    data = await response.json(loads=_json_loads)
                     
                     # Извлекаем первый органический результат
                     organic_results = data.get('organic_results', [])
@@ -14,6 +14,12 @@ logger = logging.getLogger(__name__)
 class OpenRouterAnalyzer:
     """Анализ изменений API через OpenRouter"""
     
+    # Сколько символов каждой версии текста видит модель (и в одиночном, и в пакетном запросе)
+    TEXT_LIMIT = 3000
+    # Сколько символов текстов уходит в один пакетный запрос: пачка делится на
+    # запросы по этому бюджету, а тексты в ней не урезаются сильнее TEXT_LIMIT
+    BATCH_TEXT_BUDGET = 24000
+    
     def __init__(
         self,
         api_key: str,
@@ -81,6 +87,33 @@ class OpenRouterAnalyzer:
             logger.error(f"❌ Ошибка парсинга ответа OpenRouter: {e}")
             return None
     
+    @staticmethod
+    def _extract_json(response: str) -> str:
+        """Достаёт JSON из ответа (модель может обернуть его в markdown блок)"""
+        if '```json' in response:
+            return response.split('```json')[1].split('```')[0].strip()
+        if '```' in response:
+            return response.split('```')[1].split('```')[0].strip()
+        return response.strip()
+    
+    @staticmethod
+    def _normalize_result(result: Dict) -> Dict:
+        """Дополняет результат анализа значениями по умолчанию"""
+        result.setdefault('has_significant_changes', True)
+        result.setdefault('summary', 'Обнаружены изменения')
+        result.setdefault('severity', 'moderate')
+        result.setdefault('key_changes', [])
+        return result
+    
+    @staticmethod
+    def _unavailable_result() -> Dict:
+        return {
+            'has_significant_changes': True,
+            'summary': 'Обнаружены изменения (AI анализ недоступен)',
+            'severity': 'moderate',
+            'key_changes': []
+        }
+    
     def analyze_changes(
         self,
         old_text: str,
@@ -114,10 +147,10 @@ class OpenRouterAnalyzer:
 {context}
 
 СТАРАЯ ВЕРСИЯ:
-{old_text[:3000]}
+{old_text[:self.TEXT_LIMIT]}
 
 НОВАЯ ВЕРСИЯ:
-{new_text[:3000]}
+{new_text[:self.TEXT_LIMIT]}
 
 Ответь в формате JSON:
 {{
@@ -144,36 +177,10 @@ class OpenRouterAnalyzer:
         response = self._make_request(messages)
         
         if not response:
-            return {
-                'has_significant_changes': True,
-                'summary': 'Обнаружены изменения (AI анализ недоступен)',
-                'severity': 'moderate',
-                'key_changes': []
-            }
+            return self._unavailable_result()
         
         try:
-            # Пытаемся извлечь JSON из ответа
-            # Модель может обернуть JSON в markdown блок
-            if '```json' in response:
-                json_str = response.split('```json')[1].split('```')[0].strip()
-            elif '```' in response:
-                json_str = response.split('```')[1].split('```')[0].strip()
-            else:
-                json_str = response.strip()
-            
-            result = json.loads(json_str)
-            
-            # Валидация результата
-            if 'has_significant_changes' not in result:
-                result['has_significant_changes'] = True
-            if 'summary' not in result:
-                result['summary'] = 'Обнаружены изменения'
-            if 'severity' not in result:
-                result['severity'] = 'moderate'
-            if 'key_changes' not in result:
-                result['key_changes'] = []
-            
-            return result
+            return self._normalize_result(json.loads(self._extract_json(response)))
             
         except json.JSONDecodeError as e:
             logger.error(f"❌ Ошибка парсинга JSON ответа: {e}")
@@ -186,6 +193,114 @@ class OpenRouterAnalyzer:
                 'key_changes': []
             }
     
+    def analyze_changes_batch(self, items: List[Dict]) -> List[Dict]:
+        """
+        Анализирует несколько изменений одним запросом к модели
+        
+        Args:
+            items: Список словарей с ключами old_text, new_text,
+                   api_name и method_name (как у analyze_changes)
+            
+        Returns:
+            Результаты в том же порядке и формате, что и analyze_changes
+        """
+        # Каждое изменение видно модели так же, как в analyze_changes (TEXT_LIMIT
+        # символов на версию); в запрос идёт столько изменений, сколько влезает
+        # в BATCH_TEXT_BUDGET
+        results = []
+        group, group_chars = [], 0
+        for item in items:
+            item_chars = (
+                len(item['old_text'][:self.TEXT_LIMIT]) + len(item['new_text'][:self.TEXT_LIMIT])
+            )
+            if group and group_chars + item_chars > self.BATCH_TEXT_BUDGET:
+                results.extend(self._analyze_group(group))
+                group, group_chars = [], 0
+            group.append(item)
+            group_chars += item_chars
+        if group:
+            results.extend(self._analyze_group(group))
+        return results
+    
+    def _analyze_group(self, items: List[Dict]) -> List[Dict]:
+        """Анализ изменений, влезающих в BATCH_TEXT_BUDGET, одним запросом"""
+        if len(items) == 1:
+            item = items[0]
+            return [self.analyze_changes(
+                item['old_text'], item['new_text'],
+                item.get('api_name'), item.get('method_name')
+            )]
+        
+        sections = []
+        for index, item in enumerate(items):
+            context = f"API: {item.get('api_name')}" if item.get('api_name') else "API Documentation"
+            if item.get('method_name'):
+                context += f", Method: {item['method_name']}"
+            sections.append(f"""=== ИЗМЕНЕНИЕ {index} ===
+{context}
+
+СТАРАЯ ВЕРСИЯ:
+{item['old_text'][:self.TEXT_LIMIT]}
+
+НОВАЯ ВЕРСИЯ:
+{item['new_text'][:self.TEXT_LIMIT]}
+=== КОНЕЦ ИЗМЕНЕНИЯ {index} ===""")
+        
+        prompt = f"""Проанализируй изменения в документации нескольких API.
+Каждое изменение ограничено маркерами === ИЗМЕНЕНИЕ N === и === КОНЕЦ ИЗМЕНЕНИЯ N ===.
+
+{chr(10).join(sections)}
+
+Ответь JSON массивом, по одному объекту на каждое изменение:
+[
+    {{
+        "id": N,
+        "has_significant_changes": true/false,
+        "summary": "краткое описание изменений на русском",
+        "severity": "minor/moderate/major",
+        "key_changes": ["изменение 1", "изменение 2", ...]
+    }}
+]
+
+Критерии значимости:
+- major: breaking changes, удаление методов, изменение параметров
+- moderate: новые методы, изменение поведения
+- minor: исправления опечаток, форматирование
+
+Если изменения незначительные (даты, версии, мелкие правки) - has_significant_changes: false"""
+
+        response = self._make_request([{"role": "user", "content": prompt}])
+        
+        if not response:
+            return [self._unavailable_result() for _ in items]
+        
+        try:
+            parsed = json.loads(self._extract_json(response))
+            by_id = {
+                int(result['id']): result
+                for result in parsed
+                if isinstance(result, dict) and 'id' in result
+            }
+        except (json.JSONDecodeError, TypeError, ValueError) as e:
+            logger.error(f"❌ Ошибка парсинга пакетного JSON ответа: {e}")
+            logger.debug(f"Ответ модели: {response}")
+            by_id = {}
+        
+        results = []
+        for index, item in enumerate(items):
+            result = by_id.get(index)
+            if result is None:
+                # Модель пропустила изменение: анализируем его отдельно
+                result = self.analyze_changes(
+                    item['old_text'], item['new_text'],
+                    item.get('api_name'), item.get('method_name')
+                )
+            else:
+                result.pop('id', None)
+                result = self._normalize_result(result)
+            results.append(result)
+        return results
+    
     def analyze_openapi_changes(
         self,
         changes: Dict,
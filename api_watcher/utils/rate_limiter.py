@@ -0,0 +1,50 @@
+"""
+Async token bucket rate limiter
+Ограничение частоты запросов без искусственных задержек на старте
+"""
+
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """
+    Token bucket: до burst запросов сразу, дальше - rate_per_sec в секунду.
+    Ожидающие обслуживаются по очереди (FIFO через asyncio.Lock).
+    """
+    
+    def __init__(self, rate_per_sec: float, burst: int = 1):
+        """
+        Args:
+            rate_per_sec: Скорость пополнения (запросов в секунду); <= 0 - без ограничения
+            burst: Ёмкость ведра (сколько запросов можно сделать подряд)
+        """
+        self.rate = float(rate_per_sec)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    async def acquire(self) -> None:
+        """Ждёт, пока в ведре появится токен, и забирает его"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+    
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        return False
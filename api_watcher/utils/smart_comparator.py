@@ -3,47 +3,277 @@ Smart comparator with AI integration
 Умное сравнение с использованием структурного анализа и AI
 """
 
-from typing import Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Tuple, Union
 from deepdiff import DeepDiff
 import hashlib
 import html2text
+import json
 import logging
+import threading
+from collections import OrderedDict
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
 
 from api_watcher.config import Config
 
 logger = logging.getLogger(__name__)
 
+# Теги без видимого текста
+_NON_TEXT_TAGS = ['script', 'style', 'noscript', 'template', 'svg']
+# Блочные элементы, после которых нужен перенос строки
+_BLOCK_SELECTOR = (
+    'p,div,br,li,tr,h1,h2,h3,h4,h5,h6,pre,section,article,header,footer,'
+    'table,ul,ol,dl,dt,dd,blockquote'
+)
+# Длины hex-дайджестов старых снапшотов: SHA-256 (самый первый формат) и BLAKE2b-128
+_LEGACY_SHA256_HEX_LEN = 64
+_LEGACY_BLAKE2B_HEX_LEN = 32
+
+# Глубина, до которой совпадающие поддеревья (например paths/<path>) отбрасываются перед DeepDiff
+_PRUNE_DEPTH = 2
+
+# Сколько деревьев хешей базовых спецификаций держать в LRU-кэше
+_HASH_TREE_CACHE_SIZE = 256
+
+# Маркер границы блока: символ из Private Use Area, не считается пробельным
+_BLOCK_MARK = '\ue000'
+
+
+def _new_hasher():
+    """
+    Инкрементальный хешер для проверки равенства: xxh3_64 (SIMD, некриптографический),
+    если установлен xxhash, иначе BLAKE2b-128
+    """
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64()
+    return hashlib.blake2b(digest_size=16)
+
+
+def _subtree_hash(value: Any) -> Optional[bytes]:
+    """
+    Хеш канонического JSON поддерева (ключи отсортированы).
+    None - если поддерево не сериализуется (тогда оно считается изменённым).
+    """
+    try:
+        if ORJSON_AVAILABLE:
+            data = orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+        else:
+            data = json.dumps(value, sort_keys=True, default=str, separators=(',', ':')).encode('utf-8')
+    except (TypeError, ValueError):
+        return None
+    hasher = _new_hasher()
+    hasher.update(data)
+    return hasher.digest()
+
+
+# Дерево хешей = {ключ: (хеш поддерева, дерево хешей детей или None)}
+HashTree = Dict[Any, Tuple[Optional[bytes], Optional[Dict]]]
+
+_hash_tree_cache: "OrderedDict[bytes, Optional[HashTree]]" = OrderedDict()
+_hash_tree_lock = threading.Lock()
+
+
+def _build_hash_tree(value: Any, depth: int = _PRUNE_DEPTH) -> Optional[HashTree]:
+    """Считает хеши поддеревьев до глубины depth"""
+    if depth <= 0 or not isinstance(value, dict):
+        return None
+    return {
+        key: (_subtree_hash(child), _build_hash_tree(child, depth - 1))
+        for key, child in value.items()
+    }
+
+
+def _cached_hash_tree(spec: Any) -> Optional[HashTree]:
+    """
+    Дерево хешей базовой (старой) спецификации из LRU-кэша.
+    Старая спецификация не меняется между проверками, пока не найдено изменение,
+    поэтому повторные сравнения с ней не канонизируют её поддеревья заново.
+    Ключ - хеш содержимого: объект спецификации каждый раз загружается из БД заново.
+    """
+    spec_key = _subtree_hash(spec)
+    if spec_key is None:
+        return None
+    with _hash_tree_lock:
+        if spec_key in _hash_tree_cache:
+            _hash_tree_cache.move_to_end(spec_key)
+            return _hash_tree_cache[spec_key]
+    tree = _build_hash_tree(spec)
+    with _hash_tree_lock:
+        _hash_tree_cache[spec_key] = tree
+        if len(_hash_tree_cache) > _HASH_TREE_CACHE_SIZE:
+            _hash_tree_cache.popitem(last=False)
+    return tree
+
+
+def _prune_unchanged(
+    old: Any,
+    new: Any,
+    depth: int = _PRUNE_DEPTH,
+    old_hashes: Optional[HashTree] = None
+) -> Tuple[Any, Any]:
+    """
+    Убирает из обеих сторон ключи, поддеревья которых совпадают по хешу.
+    Форма документа сохраняется, поэтому пути в выводе DeepDiff
+    (root['paths']['/users']...) такие же, как при полном сравнении.
+    
+    Args:
+        old_hashes: Готовое дерево хешей old (см. _cached_hash_tree)
+    """
+    if depth <= 0 or not isinstance(old, dict) or not isinstance(new, dict):
+        return old, new
+
+    pruned_old: Dict = {}
+    pruned_new: Dict = {}
+    for key, old_value in old.items():
+        if key not in new:
+            pruned_old[key] = old_value
+            continue
+        new_value = new[key]
+        if old_hashes is not None and key in old_hashes:
+            old_hash, child_hashes = old_hashes[key]
+        else:
+            old_hash, child_hashes = _subtree_hash(old_value), None
+        if old_hash is not None and old_hash == _subtree_hash(new_value):
+            continue
+        pruned_old[key], pruned_new[key] = _prune_unchanged(
+            old_value, new_value, depth - 1, child_hashes
+        )
+    for key, new_value in new.items():
+        if key not in old:
+            pruned_new[key] = new_value
+    return pruned_old, pruned_new
+
 
 class SmartComparator:
     """Умный компаратор с поддержкой разных типов контента"""
     
     def __init__(self):
+        # html2text - fallback, если selectolax (C-парсер lexbor) не установлен
         self.html_converter = html2text.HTML2Text()
         self.html_converter.ignore_links = False
         self.html_converter.ignore_images = True
         self.html_converter.ignore_emphasis = False
     
-    def html_to_text(self, html: str) -> str:
-        """Конвертирует HTML в читаемый текст"""
+    def html_to_text(self, html: Union[str, bytes]) -> str:
+        """
+        Конвертирует HTML в читаемый текст
+        
+        Args:
+            html: HTML строкой или сырыми байтами ответа (декодирует парсер)
+        """
         try:
             max_chars = max(1, int(getattr(Config, "MAX_HTML_TO_TEXT_CHARS", 500_000)))
             if len(html) > max_chars:
                 # Защита: не конвертируем огромные HTML целиком (это может быть очень дорого).
-                # Берём начало и конец, чтобы сохранить контекст и хоть какую-то стабильность сравнения.
+                # Начало и конец разбираются по отдельности и склеиваются уже короткие тексты -
+                # без промежуточной склейки исходного HTML.
                 half = max_chars // 2
-                html = (
-                    html[:half]
-                    + "\n<!-- api_watcher: truncated_html_to_text -->\n"
-                    + html[-half:]
-                )
-            return self.html_converter.handle(html)
+                if isinstance(html, bytes):
+                    # lexbor не принимает memoryview, поэтому копируются только сами половины
+                    view = memoryview(html)
+                    head, tail = bytes(view[:half]), bytes(view[-half:])
+                else:
+                    head, tail = html[:half], html[-half:]
+                return "\n".join((self._convert(head), self._convert(tail)))
+            return self._convert(html)
         except Exception as e:
             logger.error(f"❌ Ошибка конвертации HTML: {e}")
-            return html
+            return html.decode('utf-8', errors='replace') if isinstance(html, bytes) else html
+
+    def _convert(self, html: Union[str, bytes]) -> str:
+        """Конвертирует фрагмент HTML доступным парсером"""
+        if SELECTOLAX_AVAILABLE:
+            return self._extract_text(html)
+        if isinstance(html, bytes):
+            html = html.decode('utf-8', errors='replace')
+        return self.html_converter.handle(html)
+
+    @staticmethod
+    def _extract_text(html: Union[str, bytes]) -> str:
+        """
+        Извлекает текст одним проходом C-парсера (lexbor).
+        Ссылки сохраняются как "текст (href)", блочные элементы - отдельными строками.
+        """
+        tree = LexborHTMLParser(html)
+        tree.strip_tags(_NON_TEXT_TAGS)
+        for link in tree.css('a[href]'):
+            href = link.attributes.get('href')
+            if href:
+                link.insert_after(f" ({href})")
+        for block in tree.css(_BLOCK_SELECTOR):
+            block.insert_after(_BLOCK_MARK)
+        
+        root = tree.body or tree.root
+        if root is None:
+            return ""
+        text = root.text(separator="", strip=False)
+        # Пробелы и переносы из исходной разметки схлопываем, строки - только по блокам
+        lines = (" ".join(part.split()) for part in text.split(_BLOCK_MARK))
+        return "\n".join(line for line in lines if line)
+    
+    def calculate_hash(self, content: Union[str, bytes], crypto: bool = False) -> str:
+        """
+        Вычисляет хеш контента для быстрого сравнения.
+        Для проверки равенства доверенного контента криптостойкость не нужна,
+        поэтому по умолчанию используется xxh3_64 (BLAKE2b-128 без xxhash).
+        
+        Args:
+            content: Контент
+            crypto: Посчитать SHA-256 (для путей, где нужен криптографический хеш)
+        """
+        data = content.encode('utf-8') if isinstance(content, str) else content
+        if crypto:
+            return hashlib.sha256(data).hexdigest()
+        hasher = _new_hasher()
+        hasher.update(data)
+        return hasher.hexdigest()
     
-    def calculate_hash(self, content: str) -> str:
-        """Вычисляет хеш контента для быстрого сравнения"""
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+    def compare_hashed(
+        self,
+        old_hash: Optional[str],
+        new_content: Union[str, bytes],
+        new_hash: Optional[str] = None
+    ) -> bool:
+        """
+        Сравнивает новый контент с сохранённым хешем снапшота без повторного
+        хеширования старого контента
+        
+        Args:
+            old_hash: Хеш, сохранённый вместе со снапшотом
+            new_content: Новый контент
+            new_hash: Уже посчитанный calculate_hash(new_content), если есть
+            
+        Returns:
+            True если контент изменился
+        """
+        if not old_hash:
+            return True
+        if new_hash is None or len(new_hash) != len(old_hash):
+            # Алгоритм хеша определяется по длине дайджеста старого снапшота
+            data = new_content.encode('utf-8') if isinstance(new_content, str) else new_content
+            if len(old_hash) == _LEGACY_SHA256_HEX_LEN:
+                new_hash = hashlib.sha256(data).hexdigest()
+            elif len(old_hash) == _LEGACY_BLAKE2B_HEX_LEN:
+                new_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+            else:
+                new_hash = self.calculate_hash(data)
+        return new_hash != old_hash
     
     def compare_openapi(
         self,
@@ -64,9 +294,13 @@ class SmartComparator:
             ]
         
         try:
+            # Дешёвый проход по хешам поддеревьев: DeepDiff получает только изменённые ветки
+            pruned_old, pruned_new = _prune_unchanged(
+                old_spec, new_spec, old_hashes=_cached_hash_tree(old_spec)
+            )
             diff = DeepDiff(
-                old_spec,
-                new_spec,
+                pruned_old,
+                pruned_new,
                 ignore_order=True,
                 exclude_paths=ignore_paths,
                 verbose_level=2
@@ -101,9 +335,13 @@ class SmartComparator:
             ignore_paths = []
         
         try:
+            # Дешёвый проход по хешам поддеревьев: DeepDiff получает только изменённые ветки
+            pruned_old, pruned_new = _prune_unchanged(
+                old_data, new_data, old_hashes=_cached_hash_tree(old_data)
+            )
             diff = DeepDiff(
-                old_data,
-                new_data,
+                pruned_old,
+                pruned_new,
                 ignore_order=True,
                 exclude_paths=ignore_paths,
                 verbose_level=2
@@ -124,20 +362,18 @@ class SmartComparator:
     
     def quick_compare(self, old_content: str, new_content: str) -> bool:
         """
-        Быстрое сравнение по хешу
+        Быстрое сравнение двух текстов. Оба текста уже в памяти, поэтому
+        прямое сравнение строк дешевле, чем хеширование обеих сторон.
         
         Returns:
             True если контент изменился
         """
-        old_hash = self.calculate_hash(old_content)
-        new_hash = self.calculate_hash(new_content)
-        
-        return old_hash != new_hash
+        return old_content != new_content
     
     def compare_html_text(
         self,
-        old_html: str,
-        new_html: str
+        old_html: Union[str, bytes],
+        new_html: Union[str, bytes]
     ) -> Tuple[bool, str, str]:
         """
         Сравнивает HTML, конвертируя в текст
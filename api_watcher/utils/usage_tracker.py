@@ -1,7 +1,8 @@
 import json
 import os
+import sqlite3
+import threading
 from datetime import datetime
-from typing import Dict, Any
 
 from api_watcher.config import Config
 from api_watcher.logging_config import get_logger
@@ -11,58 +12,136 @@ logger = get_logger(__name__)
 class UsageTracker:
     """
     Отслеживает использование API лимитов по дням.
-    Сохраняет состояние в JSON файл.
+    Счётчики хранятся в SQLite (journal_mode=WAL): инкремент - одна атомарная
+    строка UPDATE, состояние общее для всех процессов watcher'а.
     """
-    
-    def __init__(self, stats_file: str = "usage_stats.json"):
+
+    # Старый формат хранения: импортируется один раз при первом запуске
+    LEGACY_STATS_FILE = "usage_stats.json"
+
+    def __init__(self, stats_file: str = "usage_stats.db"):
         self.stats_file = os.path.join(os.path.dirname(Config.SNAPSHOTS_DIR), stats_file)
-        self._stats: Dict[str, Any] = self._load_stats()
-        
-    def _get_today_key(self) -> str:
-        return datetime.now().strftime("%Y-%m-%d")
-        
-    def _load_stats(self) -> Dict[str, Any]:
-        if not os.path.exists(self.stats_file):
-            return {}
-        try:
-            with open(self.stats_file, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"failed_load_usage_stats: {e}")
-            return {}
-            
-    def _save_stats(self):
+        # Соединение используется и из event loop, и из executor'ов
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.stats_file,
+            timeout=5.0,
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._init_db()
+
+    def _init_db(self) -> None:
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                " day TEXT NOT NULL,"
+                " service TEXT NOT NULL,"
+                " count INTEGER NOT NULL DEFAULT 0,"
+                " PRIMARY KEY (day, service))"
+            )
+            is_empty = self._conn.execute("SELECT 1 FROM usage LIMIT 1").fetchone() is None
+        if is_empty:
+            self._import_legacy_stats()
+
+    def _import_legacy_stats(self) -> None:
+        """Переносит статистику из usage_stats.json, если он остался от прошлых версий"""
+        legacy_file = os.path.join(os.path.dirname(self.stats_file), self.LEGACY_STATS_FILE)
+        if not os.path.exists(legacy_file):
+            return
         try:
-            with open(self.stats_file, 'w') as f:
-                json.dump(self._stats, f, indent=2)
+            with open(legacy_file, 'r') as f:
+                stats = json.load(f)
+            rows = [
+                (day, service, int(count))
+                for day, services in stats.items()
+                for service, count in services.items()
+            ]
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO usage (day, service, count) VALUES (?, ?, ?)",
+                        rows
+                    )
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
         except Exception as e:
-            logger.error(f"failed_save_usage_stats: {e}")
-            
+            logger.error(f"failed_import_legacy_usage_stats: {e}")
+
+    def _get_today_key(self) -> str:
+        return datetime.now().strftime("%Y-%m-%d")
+
     def get_usage(self, service_name: str) -> int:
         """Возвращает количество запросов за сегодня для сервиса"""
-        today = self._get_today_key()
-        if today not in self._stats:
-            self._stats = {today: {}} # Сброс старых дней или инициализация
-            
-        return self._stats.get(today, {}).get(service_name, 0)
-        
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT count FROM usage WHERE day = ? AND service = ?",
+                (self._get_today_key(), service_name)
+            ).fetchone()
+        return row[0] if row else 0
+
     def increment(self, service_name: str, count: int = 1):
         """Увеличивает счетчик использования"""
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO usage (day, service, count) VALUES (?, ?, ?) "
+                    "ON CONFLICT(day, service) DO UPDATE SET count = count + excluded.count",
+                    (self._get_today_key(), service_name, count)
+                )
+        except sqlite3.Error as e:
+            logger.error(f"failed_save_usage_stats: {e}")
+
+    def try_increment(self, service_name: str, limit: int, count: int = 1) -> bool:
+        """
+        Атомарно проверяет лимит и увеличивает счетчик (в т.ч. между процессами)
+
+        Returns:
+            True если использование разрешено и учтено
+        """
+        # -1 = безлимит, 0 = отключено, >0 = лимит
+        if limit == 0:
+            return False
+        if limit < 0:
+            self.increment(service_name, count)
+            return True
+
         today = self._get_today_key()
-        
-        # Если наступил новый день, очищаем старую статистику (опционально, сейчас просто добавляем новый ключ)
-        if today not in self._stats:
-            # Можно хранить историю, но чтобы файл не пух, можно удалять старое?
-            # Пока оставим простую логику - ключ по дате.
-            # Если файл станет большим, можно сделать cleanup.
-            pass
-            
-        day_stats = self._stats.setdefault(today, {})
-        current = day_stats.get(service_name, 0)
-        day_stats[service_name] = current + count
-        
-        self._save_stats()
-        
+        with self._lock:
+            # IMMEDIATE берёт блокировку записи сразу: между SELECT и UPDATE никто не вклинится
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT count FROM usage WHERE day = ? AND service = ?",
+                    (today, service_name)
+                ).fetchone()
+                usage = row[0] if row else 0
+                allowed = usage + count <= limit
+                if allowed:
+                    self._conn.execute(
+                        "INSERT INTO usage (day, service, count) VALUES (?, ?, ?) "
+                        "ON CONFLICT(day, service) DO UPDATE SET count = count + excluded.count",
+                        (today, service_name, count)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if not allowed:
+            logger.warning(
+                "api_limit_exceeded",
+                service=service_name,
+                current_usage=usage,
+                limit=limit
+            )
+        return allowed
+
     def can_use(self, service_name: str, limit: int) -> bool:
         """Проверяет, можно ли использовать сервис"""
         # -1 = безлимит, 0 = отключено, >0 = лимит
@@ -70,14 +149,19 @@ class UsageTracker:
             return True
         if limit == 0:
             return False
-        
+
         usage = self.get_usage(service_name)
         if usage >= limit:
             logger.warning(
-                "api_limit_exceeded", 
-                service=service_name, 
-                current_usage=usage, 
+                "api_limit_exceeded",
+                service=service_name,
+                current_usage=usage,
                 limit=limit
             )
             return False
         return True
+
+    def close(self) -> None:
+        """Закрывает соединение с БД"""
+        with self._lock:
+            self._conn.close()
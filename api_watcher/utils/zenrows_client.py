@@ -3,23 +3,39 @@ ZenRows client for fetching web content
 Обходит защиту и получает чистый HTML
 """
 
-import requests
+import asyncio
 from typing import Optional, Dict
 
+import aiohttp
+
 from api_watcher.logging_config import get_logger
 
 logger = get_logger(__name__)
 
 
 class ZenRowsClient:
-    """Клиент для работы с ZenRows API"""
+    """Асинхронный клиент для работы с ZenRows API"""
     
     BASE_URL = "https://api.zenrows.com/v1/"
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, session: Optional[aiohttp.ClientSession] = None):
+        """
+        Args:
+            api_key: Ключ ZenRows
+            session: Внешняя aiohttp сессия (не закрывается клиентом)
+        """
         self.api_key = api_key
+        self._session = session
+        self._owns_session = session is None
+        self.timeout = aiohttp.ClientTimeout(total=60)
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+            self._owns_session = True
+        return self._session
     
-    def fetch_html(
+    async def fetch_html(
         self,
         url: str,
         js_render: bool = True,
@@ -53,17 +69,19 @@ class ZenRowsClient:
             params['antibot'] = 'true'
         
         try:
-            response = requests.get(self.BASE_URL, params=params, timeout=60)
-            response.raise_for_status()
+            session = await self._get_session()
+            async with session.get(self.BASE_URL, params=params, timeout=self.timeout) as response:
+                response.raise_for_status()
+                html = await response.text()
             
             logger.info("zenrows_fetch_success", url=url)
-            return response.text
+            return html
             
-        except requests.exceptions.RequestException as e:
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.error("zenrows_request_error", url=url, error=str(e))
             return None
     
-    def fetch_with_fallback(self, url: str) -> Optional[str]:
+    async def fetch_with_fallback(self, url: str) -> Optional[str]:
         """
         Получает контент с fallback стратегией:
         1. Попытка с базовыми настройками
@@ -71,12 +89,22 @@ class ZenRowsClient:
         3. Попытка без JS рендеринга
         """
         # Попытка 1: базовые настройки
-        html = self.fetch_html(url, js_render=True, premium_proxy=False)
+        html = await self.fetch_html(url, js_render=True, premium_proxy=False)
         if html:
             return html
         
         logger.warning("zenrows_retry_no_js", url=url)
         
         # Попытка 2: без JS рендеринга
-        html = self.fetch_html(url, js_render=False, premium_proxy=False)
+        html = await self.fetch_html(url, js_render=False, premium_proxy=False)
         return html
+    
+    async def close(self) -> None:
+        if self._owns_session and self._session and not self._session.closed:
+            await self._session.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
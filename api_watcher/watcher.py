@@ -6,14 +6,42 @@ Refactoring: Repository pattern, Notifier adapters, Async fetch, SRP compliance
 import json
 import asyncio
 import os
-from typing import Dict, List, Optional
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from datetime import datetime
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import uvloop  # libuv event loop: less overhead per socket operation
+except ImportError:  # optional; not available on Windows
+    uvloop = None
+
 from api_watcher.config import Config
+from api_watcher.storage.database import Snapshot
 from api_watcher.storage.repository import SQLAlchemySnapshotRepository, SnapshotRepository
 from api_watcher.utils.async_fetcher import ContentFetcher
+from api_watcher.utils.docs_finder import close_shared_session
 from api_watcher.utils.gemini_analyzer import GeminiAnalyzer
 from api_watcher.utils.openrouter_analyzer import OpenRouterAnalyzer
+from api_watcher.utils.rate_limiter import AsyncTokenBucket
 from api_watcher.utils.smart_comparator import SmartComparator
 from api_watcher.notifier.base import NotifierManager
 from api_watcher.notifier.adapters import (
@@ -30,20 +58,76 @@ from api_watcher.logging_config import setup_from_config, get_logger
 setup_from_config(Config)
 logger = get_logger(__name__)
 
+# Parsed URLs file: (path, mtime_ns, data). The file rarely changes between cycles.
+_URLS_CACHE: Optional[Tuple[str, int, List[Dict]]] = None
+
+
+def _load_urls_file(
+    urls_file: str,
+    on_item: Optional[Callable[[int, Dict], None]] = None
+) -> List[Dict]:
+    """
+    Loads the URLs file, re-parsing it only when its mtime changes.
+    
+    on_item(index, item) is called for every entry as soon as it is decoded:
+    with ijson the file is parsed incrementally, so a large catalog starts
+    being processed before it has been read to the end.
+    """
+    global _URLS_CACHE
+    mtime_ns = os.stat(urls_file).st_mtime_ns
+    if _URLS_CACHE and _URLS_CACHE[0] == urls_file and _URLS_CACHE[1] == mtime_ns:
+        urls_data = _URLS_CACHE[2]
+    elif on_item is not None and IJSON_AVAILABLE:
+        urls_data = []
+        with open(urls_file, 'rb') as f:
+            for item in ijson.items(f, 'item', use_float=True):
+                on_item(len(urls_data), item)
+                urls_data.append(item)
+        _URLS_CACHE = (urls_file, mtime_ns, urls_data)
+        return urls_data
+    else:
+        with open(urls_file, 'rb') as f:
+            raw = f.read()
+        urls_data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+        _URLS_CACHE = (urls_file, mtime_ns, urls_data)
+    
+    if on_item is not None:
+        for index, item in enumerate(urls_data):
+            on_item(index, item)
+    return urls_data
+
+
 def _acquire_lockfile(lock_path: str) -> int:
     """
-    Простой lockfile, чтобы не запускать несколько инстансов watcher одновременно.
+    Lockfile, чтобы не запускать несколько инстансов watcher одновременно.
+    Блокировка - flock: ядро снимает её при смерти процесса (даже SIGKILL),
+    поэтому зависший lockfile после падения не мешает перезапуску.
     Возвращает fd (держим открытым до конца процесса).
+    Если lock занят - FileExistsError.
     """
-    flags = os.O_CREAT | os.O_EXCL | os.O_RDWR
-    fd = os.open(lock_path, flags)
+    if fcntl is None:
+        # Нет flock (не POSIX) - старое поведение через O_EXCL
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_RDWR)
+    else:
+        fd = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            raise FileExistsError(lock_path)
     try:
+        os.ftruncate(fd, 0)
         os.write(fd, str(os.getpid()).encode("utf-8"))
     except Exception:
         pass
     return fd
 
 def _release_lockfile(fd: Optional[int], lock_path: str) -> None:
+    if fcntl is not None:
+        # Файл не удаляем: unlink при живом ожидающем процессе даёт два "владельца"
+        if fd is not None:
+            os.close(fd)
+        return
     try:
         if fd is not None:
             os.close(fd)
@@ -54,6 +138,15 @@ def _release_lockfile(fd: Optional[int], lock_path: str) -> None:
             pass
 
 
+@dataclass
+class CacheEntry:
+    """Page body kept across cycles (see Config.CACHE_TTL_SECONDS)"""
+    fetched_at: float
+    body: str
+    # Computed on first comparison, off the event loop
+    body_hash: Optional[str] = None
+
+
 class APIWatcher:
     """
     Orchestrator for API monitoring.
@@ -91,15 +184,54 @@ class APIWatcher:
         self.change_detector = ChangeDetector(
             repository=self.repository,
             notifiers=self.notifiers,
-            ai_analyzer=self.ai_analyzer
+            ai_analyzer=self.ai_analyzer,
+            save_snapshot=self._save_snapshot,
+            ai_batch_size=int(getattr(self.config, "AI_BATCH_SIZE", 10)),
+            note_pending_snapshot=self._remember_latest_snapshot
         )
         
         # Comparator (still needed for initial snapshot hash calculation in some cases, 
         # but mostly handled by ChangeDetector. Keeping it for now if needed by legacy methods or direct usage)
         self.comparator = SmartComparator()
         
-        # Request cache for deduplication within a single cycle
-        self._request_cache: Dict[str, asyncio.Task] = {}
+        # In-flight deduplication within a single cycle: one future per base URL.
+        # Failed fetches are dropped so a later caller may retry; successful
+        # results stay until the next cycle starts.
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Strong references to background fetch tasks (asyncio keeps only weak ones)
+        self._fetch_tasks: Set[asyncio.Task] = set()
+        
+        # Upstream rate limit for real fetches (cached / deduplicated hits are free)
+        self._rate_limiter = AsyncTokenBucket(
+            rate_per_sec=float(getattr(self.config, "FETCH_RATE_PER_SEC", 5)),
+            burst=int(getattr(self.config, "FETCH_BURST", 10))
+        )
+        
+        # Process-wide cap on simultaneous fetches, shared by every entry point
+        # (overlapping cycles, single process_url calls) instead of per call
+        self._global_semaphore = asyncio.Semaphore(
+            max(1, int(getattr(self.config, "MAX_CONCURRENT", 10)))
+        )
+        
+        # Snapshots collected during a parallel cycle, written in batches of
+        # SNAPSHOT_FLUSH_SIZE as the cycle runs and once more at its end.
+        # None outside a cycle: single process_url calls save immediately.
+        self._pending_snapshots: Optional[List[Dict]] = None
+        self._snapshot_flush_size = max(1, int(getattr(self.config, "SNAPSHOT_FLUSH_SIZE", 50)))
+        
+        # Latest snapshot per URL during a parallel cycle (None outside a cycle):
+        # repeated URLs query the DB once and see snapshots queued earlier in the cycle
+        self._latest_snapshot_cache: Optional[Dict[str, Optional[Snapshot]]] = None
+        
+        # url -> (content_type, body length, first non-space char): the type of a URL
+        # practically never changes, so detect_content_type runs once per URL
+        self._content_type_cache: Dict[str, Tuple[str, int, str]] = {}
+        
+        # Content cache across cycles: fresh bodies are reused without a request.
+        # Filled only when CACHE_TTL_SECONDS > 0; otherwise conditional requests
+        # (ETag / Last-Modified -> 304) and their cached bodies are the fetcher's job.
+        # A cached entry also keeps the body's hash while the body stays the same object.
+        self._content_cache: Dict[str, CacheEntry] = {}
     
     def _create_notifier_manager(self) -> NotifierManager:
         """Creates notifier manager based on config"""
@@ -150,6 +282,62 @@ class APIWatcher:
             )
         return None
     
+    def _save_snapshot(self, **row) -> None:
+        """Saves a snapshot now, or queues it while a parallel cycle is running"""
+        if self._pending_snapshots is not None:
+            self._pending_snapshots.append(row)
+            if len(self._pending_snapshots) >= self._snapshot_flush_size:
+                rows, self._pending_snapshots = self._pending_snapshots, []
+                self._write_snapshots(rows)
+        else:
+            self.repository.save(**row)
+        self._remember_latest_snapshot(**row)
+    
+    def _remember_latest_snapshot(self, **row) -> None:
+        """
+        Makes row the URL's latest snapshot for the rest of the cycle: queued for the
+        batch write, or still waiting for the batched AI analysis
+        """
+        if self._latest_snapshot_cache is not None:
+            # Transient (unsaved) copy
+            structured_data = row.get('structured_data')
+            self._latest_snapshot_cache[row['url']] = Snapshot(
+                **{**row, 'structured_data': json.dumps(structured_data) if structured_data else None}
+            )
+    
+    def _get_latest_snapshot(self, url: str) -> Optional[Snapshot]:
+        """repository.get_latest, cached per URL for the current cycle"""
+        cache = self._latest_snapshot_cache
+        if cache is None:
+            return self.repository.get_latest(url)
+        if url not in cache:
+            cache[url] = self.repository.get_latest(url)
+        return cache[url]
+    
+    def _flush_snapshots(self) -> None:
+        """Writes the snapshots still queued at the end of a cycle"""
+        rows, self._pending_snapshots = self._pending_snapshots, None
+        if rows:
+            self._write_snapshots(rows)
+    
+    def _write_snapshots(self, rows: List[Dict]) -> None:
+        """
+        Writes a batch of snapshots with a single commit. If the batch fails,
+        retries row by row so one bad snapshot does not drop the others.
+        """
+        logger.info(f"💾 Saving {len(rows)} snapshots")
+        try:
+            self.repository.bulk_save(rows)
+            return
+        except Exception as e:
+            logger.error(f"❌ Error saving snapshots, retrying one by one: {e}")
+        
+        for row in rows:
+            try:
+                self.repository.save(**row)
+            except Exception as e:
+                logger.error(f"❌ Error saving snapshot for {row.get('url')}: {e}")
+    
     async def fetch_content(self, url: str) -> Optional[str]:
         """
         Async fetch content with deduplication.
@@ -159,28 +347,74 @@ class APIWatcher:
         # Strip anchor for deduplication (e.g. http://site.com#foo -> http://site.com)
         base_url = url.split('#')[0]
         
-        # Check cache
-        if base_url in self._request_cache:
+        # Body fetched recently (in a previous cycle) is still fresh
+        ttl = int(getattr(self.config, "CACHE_TTL_SECONDS", 0) or 0)
+        entry = self._content_cache.get(base_url)
+        if ttl > 0 and entry is not None and time.monotonic() - entry.fetched_at < ttl:
+            logger.info(f"🔄 Using cached content for {base_url}")
+            return entry.body
+        
+        future = self._inflight.get(base_url)
+        if future is not None:
             logger.info(f"🔄 Using cached request for {base_url}")
-            try:
-                return await self._request_cache[base_url]
-            except Exception as e:
-                logger.error(f"❌ Error awaiting cached task for {base_url}: {e}")
-                return None
-            
-        # Create new fetch task
-        # We use base_url to avoid sending anchors to the provider
-        task = asyncio.create_task(self.fetcher.fetch(base_url))
-        self._request_cache[base_url] = task
+        else:
+            # We use base_url to avoid sending anchors to the provider
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[base_url] = future
+            task = asyncio.create_task(self._fetch_into(base_url, future))
+            self._fetch_tasks.add(task)
+            task.add_done_callback(self._fetch_tasks.discard)
         
         try:
-            return await task
+            # shield: a cancelled caller must not cancel the fetch for the other waiters
+            body = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"❌ Error fetching {base_url}: {e}")
-            # Keep the failed task in cache so other requests for the same URL 
-            # (e.g. different anchors) don't trigger a retry in this cycle.
-            # They will receive the same exception/None result.
             return None
+        
+        if ttl > 0 and body and (entry is None or entry.body is not body):
+            self._content_cache[base_url] = CacheEntry(fetched_at=time.monotonic(), body=body)
+        return body
+    
+    def _body_hash(self, url: str, body: str) -> str:
+        """
+        calculate_hash(body), reused while the body is the one kept in _content_cache
+        (CACHE_TTL_SECONDS > 0); without the cache every fetched body is hashed once
+        """
+        entry = self._content_cache.get(url.split('#')[0])
+        if entry is None or entry.body is not body:
+            return self.comparator.calculate_hash(body)
+        if entry.body_hash is None:
+            entry.body_hash = self.comparator.calculate_hash(body)
+        return entry.body_hash
+    
+    async def _fetch_into(self, base_url: str, future: asyncio.Future) -> None:
+        """Fetches base_url and resolves the shared in-flight future"""
+        try:
+            async with self._global_semaphore:
+                await self._rate_limiter.acquire()
+                body = await self.fetcher.fetch(base_url)
+        except asyncio.CancelledError:
+            future.cancel()
+            self._drop_inflight(base_url, future)
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark as retrieved: waiters log the error themselves
+            future.exception()
+            self._drop_inflight(base_url, future)
+            return
+        
+        future.set_result(body)
+        if not body:
+            self._drop_inflight(base_url, future)
+    
+    def _drop_inflight(self, base_url: str, future: asyncio.Future) -> None:
+        """Forgets a failed fetch so the URL can be retried within the cycle"""
+        if self._inflight.get(base_url) is future:
+            del self._inflight[base_url]
     
     async def process_url(
         self,
@@ -189,6 +423,24 @@ class APIWatcher:
         method_name: Optional[str] = None
     ) -> Dict:
         """Async process URL"""
+        url, new_html, error = await self._fetch_stage(url, api_name, method_name)
+        if error:
+            return error
+        return self._analyze_stage(url, new_html, api_name, method_name)
+    
+    async def _fetch_stage(
+        self,
+        url: str,
+        api_name: Optional[str],
+        method_name: Optional[str]
+    ) -> Tuple[str, Optional[str], Optional[Dict]]:
+        """
+        Pipeline stage 1: fetch and validate content (network-bound).
+        
+        Returns:
+            (url, html, error_result): url may be replaced by a found alternative;
+            error_result is set when there is nothing to analyze
+        """
         logger.info(f"\n{'='*60}")
         logger.info(f"🔍 Processing: {api_name or url}")
         logger.info(f"{'='*60}")
@@ -197,7 +449,7 @@ class APIWatcher:
         new_html = await self.fetch_content(url)
         if not new_html:
             logger.error(f"❌ Failed to fetch content for {url}")
-            return {'url': url, 'has_changes': False, 'error': 'Failed to fetch'}
+            return url, None, {'url': url, 'has_changes': False, 'error': 'Failed to fetch'}
         
         # 2. Validate and fallback
         if not self.content_processor.is_valid_response(new_html, url):
@@ -213,23 +465,42 @@ class APIWatcher:
                     url = new_url
                     new_html = new_html_from_new_url
                 else:
-                    return {'url': url, 'has_changes': False, 'error': 'New URL also failed'}
+                    return url, None, {'url': url, 'has_changes': False, 'error': 'New URL also failed'}
             else:
-                return {'url': url, 'has_changes': False, 'error': 'No alternative found'}
+                return url, None, {'url': url, 'has_changes': False, 'error': 'No alternative found'}
         
-        # 3. Detect content type
-        content_type = self.content_processor.detect_content_type(url, new_html)
-        logger.info(f"📄 Content type: {content_type}")
+        return url, new_html, None
+    
+    def _analyze_stage(
+        self,
+        url: str,
+        new_html: str,
+        api_name: Optional[str],
+        method_name: Optional[str]
+    ) -> Dict:
+        """
+        Pipeline stage 2: classify, compare, analyze and save (CPU / DB / AI-bound, sync)
+        """
+        # 3. Get latest snapshot
+        old_snapshot = self._get_latest_snapshot(url)
+        content_hash = self._body_hash(url, new_html)
+        
+        # Unchanged body (304 or same hash): no type detection, parsing or text extraction
+        if old_snapshot and not self.comparator.compare_hashed(
+            old_snapshot.content_hash, new_html, content_hash
+        ):
+            logger.info(f"✅ Unchanged: {url}")
+            return {'url': url, 'has_changes': False}
         
-        # 4. Get latest snapshot
-        old_snapshot = self.repository.get_latest(url)
+        # 4. Detect content type
+        content_type = self._detect_content_type_cached(url, new_html)
+        logger.info(f"📄 Content type: {content_type}")
         
         if not old_snapshot:
             logger.info(f"📝 First snapshot for {url}")
             text_content = self.comparator.html_to_text(new_html) if content_type == 'html' else new_html
-            content_hash = self.comparator.calculate_hash(new_html)
             
-            self.repository.save(
+            self._save_snapshot(
                 url=url,
                 raw_html=new_html,
                 text_content=text_content,
@@ -244,95 +515,150 @@ class APIWatcher:
         
         # 5. Detect changes
         return self.change_detector.detect_changes(
-            old_snapshot, new_html, content_type, url, api_name, method_name
+            old_snapshot, new_html, content_type, url, api_name, method_name,
+            content_hash=content_hash
         )
     
+    def _detect_content_type_cached(self, url: str, content: str) -> str:
+        """
+        detect_content_type memoized per URL.
+        Re-detects when the body looks different: length changed by more
+        than 50% or it starts with another character (e.g. '{' vs '<').
+        """
+        first_char = content.lstrip()[:1]
+        cached = self._content_type_cache.get(url)
+        if cached:
+            content_type, length, cached_first_char = cached
+            if first_char == cached_first_char and abs(len(content) - length) <= length / 2:
+                return content_type
+        
+        content_type = self.content_processor.detect_content_type(url, content)
+        self._content_type_cache[url] = (content_type, len(content), first_char)
+        return content_type
+    
     async def process_urls_file(self, urls_file: str) -> List[Dict]:
-        """Async process URLs from file"""
-        logger.info(f"📂 Loading URLs from {urls_file}")
-        
-        # Clear request cache for new cycle
-        self._request_cache.clear()
-        
-        try:
-            with open(urls_file, 'r', encoding='utf-8') as f:
-                urls_data = json.load(f)
-        except Exception as e:
-            logger.error(f"❌ Error reading file {urls_file}: {e}")
-            return []
-        
-        results = []
-        for item in urls_data:
-            url = item.get('url')
-            api_name = item.get('api_name')
-            method_name = item.get('method_name')
-            
-            if not url:
-                continue
-            
-            result = await self.process_url(url, api_name, method_name)
-            results.append(result)
-        
-        return results
+        """Async process URLs from file (alias for process_urls_parallel)"""
+        return await self.process_urls_parallel(urls_file)
     
     async def process_urls_parallel(
         self, 
         urls_file: str, 
-        max_concurrent: int = 10,
-        delay_between_requests: float = 0.2
+        max_concurrent: Optional[int] = None
     ) -> List[Dict]:
         """
-        Parallel URL processing with rate limiting
+        Parallel URL processing as a two-stage pipeline.
+        
+        max_concurrent fetch workers download and validate pages; a single
+        analysis worker compares, calls the AI analyzer and saves snapshots in a
+        worker thread. Fetching of the next pages overlaps with analysis of the
+        previous ones, and starts while the URLs file is still being parsed.
+        One analysis worker keeps the shared DB session single-threaded.
+        
+        HTML changes are sent to the AI analyzer in batches of AI_BATCH_SIZE,
+        or after AI_BATCH_WAIT_MS without new pages. Request rate is limited
+        by the token bucket in fetch_content, so all workers start at once
+        without staggering. Actual network concurrency is also bounded by the
+        process-wide semaphore, even when several cycles overlap.
         
         Args:
             urls_file: Path to JSON file with URLs
-            max_concurrent: Maximum concurrent requests (default: 3 to avoid rate limiting)
-            delay_between_requests: Delay in seconds between starting new requests
+            max_concurrent: Number of concurrent fetch workers
+                (defaults to Config.MAX_CONCURRENT)
         """
+        if max_concurrent is None:
+            max_concurrent = int(getattr(self.config, "MAX_CONCURRENT", 10))
         logger.info(f"📂 Loading URLs from {urls_file} (parallel, max={max_concurrent})")
         
         # Clear request cache for new cycle
-        self._request_cache.clear()
-        
-        try:
-            with open(urls_file, 'r', encoding='utf-8') as f:
-                urls_data = json.load(f)
-        except Exception as e:
-            logger.error(f"❌ Error reading file {urls_file}: {e}")
-            return []
-        
-        semaphore = asyncio.Semaphore(max_concurrent)
-        results = []
-        
-        async def process_with_semaphore(item, index):
-            # Add delay to avoid rate limiting
-            if delay_between_requests > 0 and index > 0:
-                await asyncio.sleep(delay_between_requests * (index % max_concurrent))
-            
-            async with semaphore:
-                url = item.get('url')
-                if not url:
-                    return None
+        self._inflight.clear()
+        
+        fetch_queue: asyncio.Queue = asyncio.Queue()
+        # Bounded: fetchers wait instead of piling up pages the analyzer can't keep up with
+        process_queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_concurrent))
+        # index in the file -> result, returned in file order
+        results: Dict[int, Dict] = {}
+        loop = asyncio.get_running_loop()
+        
+        def enqueue(index: int, item: Dict) -> None:
+            # Called from the loader thread
+            if item.get('url'):
+                loop.call_soon_threadsafe(fetch_queue.put_nowait, (index, item))
+        
+        async def fetch_worker():
+            while True:
+                index, item = await fetch_queue.get()
+                url = item['url']
                 try:
-                    return await self.process_url(
-                        url,
-                        item.get('api_name'),
-                        item.get('method_name')
-                    )
+                    fetched = await self._fetch_stage(url, item.get('api_name'), item.get('method_name'))
                 except Exception as e:
                     logger.error(f"❌ Error processing {url}: {e}")
-                    return {'url': url, 'has_changes': False, 'error': str(e)}
+                    fetched = (url, None, {'url': url, 'has_changes': False, 'error': str(e)})
+                try:
+                    await process_queue.put((index, item, fetched))
+                finally:
+                    fetch_queue.task_done()
+        
+        ai_batch_wait = int(getattr(self.config, "AI_BATCH_WAIT_MS", 2000)) / 1000
+        
+        async def process_worker():
+            while True:
+                if self.change_detector.has_pending_ai:
+                    # Partial AI batch: send it if no new page arrives in time
+                    try:
+                        queued = await asyncio.wait_for(process_queue.get(), timeout=ai_batch_wait)
+                    except asyncio.TimeoutError:
+                        await asyncio.to_thread(self.change_detector.flush_ai_batch)
+                        continue
+                else:
+                    queued = await process_queue.get()
+                index, item, (url, new_html, error) = queued
+                try:
+                    if error:
+                        results[index] = error
+                    else:
+                        results[index] = await asyncio.to_thread(
+                            self._analyze_stage, url, new_html,
+                            item.get('api_name'), item.get('method_name')
+                        )
+                except Exception as e:
+                    logger.error(f"❌ Error processing {url}: {e}")
+                    results[index] = {'url': url, 'has_changes': False, 'error': str(e)}
+                finally:
+                    process_queue.task_done()
         
-        tasks = [process_with_semaphore(item, i) for i, item in enumerate(urls_data)]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        workers = [asyncio.create_task(fetch_worker()) for _ in range(max(1, max_concurrent))]
+        workers.append(asyncio.create_task(process_worker()))
         
-        # Filter out None and exceptions
-        return [r for r in results if r is not None and not isinstance(r, Exception)]
-    
-    def send_weekly_digest(self):
-        """Sends weekly digest"""
-        logger.info("📊 Generating weekly digest...")
+        self._pending_snapshots = []
+        self._latest_snapshot_cache = {}
+        self.change_detector.begin_ai_batch()
+        try:
+            try:
+                # stat + read + parse in a worker thread: no blocking disk IO on the loop.
+                # Entries are queued while parsing, so fetching starts right away.
+                await asyncio.to_thread(_load_urls_file, urls_file, enqueue)
+            except Exception as e:
+                logger.error(f"❌ Error reading file {urls_file}: {e}")
+            # Enqueue callbacks were scheduled before the thread finished,
+            # so every parsed entry is in fetch_queue by now
+            await fetch_queue.join()
+            await process_queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            # Remaining AI batch first: it produces snapshots for the flush below
+            try:
+                await asyncio.to_thread(self.change_detector.end_ai_batch)
+            except Exception as e:
+                logger.error(f"❌ AI batch analysis failed: {e}")
+            self._flush_snapshots()
+            self._latest_snapshot_cache = None
         
+        return [results[index] for index in sorted(results)]
+    
+    def _collect_digest_changes(self) -> List[Dict]:
+        """Loads changed snapshots for the digest (blocking DB query)"""
         snapshots = self.repository.get_with_changes(days=self.config.CHECK_INTERVAL_DAYS)
         
         changes = []
@@ -344,12 +670,24 @@ class APIWatcher:
                 'summary': snapshot.ai_summary or 'Changes detected',
                 'created_at': snapshot.created_at.isoformat() if snapshot.created_at else None
             })
+        return changes
+    
+    async def send_weekly_digest(self):
+        """
+        Sends weekly digest.
+        The DB query and the (sync) notifiers run in a worker thread,
+        so the event loop keeps serving fetches meanwhile.
+        """
+        logger.info("📊 Generating weekly digest...")
         
-        self.notifiers.send_digest(changes)
+        # ORM rows are turned into dicts inside the thread: no lazy loads on the loop
+        changes = await asyncio.to_thread(self._collect_digest_changes)
+        await asyncio.to_thread(self.notifiers.send_digest, changes)
     
     async def cleanup(self):
         """Cleanup resources"""
         await self.fetcher.close()
+        await close_shared_session()
         self.repository.close()
 
 
@@ -385,22 +723,21 @@ async def main():
             sleep_seconds = watcher.config.MIN_CHECK_INTERVAL_SECONDS
 
         while True:
-            # Process URLs parallel with rate limiting
-            results = await watcher.process_urls_parallel(
-                Config.URLS_FILE,
-                max_concurrent=10,
-                delay_between_requests=0.2
-            )
+            # Process URLs in parallel (bounded concurrency)
+            results = await watcher.process_urls_parallel(Config.URLS_FILE)
             
-            # Stats
-            total = len(results)
-            changed = sum(1 for r in results if r.get('has_changes'))
+            # Stats (single pass over results)
+            stats = Counter()
+            for r in results:
+                stats['changed'] += bool(r.get('has_changes'))
+                stats['errors'] += 'error' in r
             
             logger.info(f"\n{'='*60}")
             logger.info(f"📊 STATISTICS")
             logger.info(f"{'='*60}")
-            logger.info(f"Total checked: {total}")
-            logger.info(f"Changes detected: {changed}")
+            logger.info(f"Total checked: {len(results)}")
+            logger.info(f"Changes detected: {stats['changed']}")
+            logger.info(f"Errors: {stats['errors']}")
             logger.info(f"{'='*60}\n")
             
             if not Config.DAEMON_MODE:
@@ -415,4 +752,7 @@ async def main():
 
 
 if __name__ == '__main__':
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -4,34 +4,183 @@
 Запускается на http://localhost:8080
 """
 
+import asyncio
+import gzip
+import os
 import sqlite3
 import json
-from datetime import datetime
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
-import html
+import threading
+import time
+import zlib
 
-class SimpleWebHandler(BaseHTTPRequestHandler):
-    """Простой HTTP обработчик"""
+from aiohttp import web
+
+from db_viewer import FTS_MIN_QUERY_LEN
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+DB_PATH = 'api_watcher.db'
+# Максимальный размер страницы /api/snapshots
+MAX_PAGE_SIZE = 200
+# Сколько строк читается из БД и отправляется клиенту за раз
+STREAM_BATCH_SIZE = 64
+# Сколько символов текста отдаётся с деталями снепшота (столько показывает UI)
+PREVIEW_CHARS = 1000
+# Максимум ID в /api/snapshots/bulk: SQLite ограничивает число параметров (999)
+MAX_BULK_IDS = 900
+# Максимальный кусок содержимого за один запрос /api/snapshot/content
+MAX_CONTENT_CHUNK = 100000
+# Поля, которые можно дочитывать через /api/snapshot/content
+CONTENT_FIELDS = {'text': 'text_content', 'raw': 'raw_html'}
+
+# Раз в сколько секунд проверять размер WAL и сколько байт он может занимать
+WAL_CHECKPOINT_INTERVAL = 300
+WAL_TRUNCATE_SIZE = 64 * 1024 * 1024
+
+# Сколько секунд готовый ответ /api/snapshots отдаётся из памяти без запросов к БД
+SNAPSHOTS_CACHE_TTL = 2
+SNAPSHOTS_CACHE_MAX_ENTRIES = 256
+
+# Одно соединение на процесс: обработчики ходят в БД из потоков to_thread,
+# поэтому check_same_thread=False и доступ под блокировкой. sqlite3 кэширует
+# подготовленные выражения на соединении, так что повторные запросы не парсятся
+_conn = None
+_conn_lock = threading.Lock()
+# Есть ли полнотекстовый индекс snapshots_fts (выясняется при подключении;
+# создаётся миграцией python db_viewer.py index, дашборд схему не меняет)
+_fts_available = False
+# Готовые ответы /api/snapshots: (limit, before_id, q, changes) -> (expires, etag, body)
+_snapshots_cache = {}
+
+
+def _get_conn():
+    """Возвращает общее соединение (вызывать под _conn_lock)"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        # Строки по именам колонок: dict(row) вместо ручной раскладки по индексам
+        _conn.row_factory = sqlite3.Row
+        # busy_timeout: не падать с "database is locked", пока watcher пишет
+        _conn.execute("PRAGMA busy_timeout=5000")
+        _conn.execute("PRAGMA cache_size=-20000")
+        _conn.execute("PRAGMA mmap_size=268435456")
+        _enable_wal(_conn)
+        _detect_fts(_conn)
+    return _conn
+
+
+def _enable_wal(conn):
+    """
+    WAL: чтение не блокируется записью watcher'а (и наоборот). Режим хранится
+    в самом файле БД; watcher включает его и у себя (storage/database.py)
+    """
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    except sqlite3.OperationalError:
+        # БД только для чтения или занята - остаёмся в текущем режиме
+        pass
+
+
+def _checkpoint_wal():
+    """Переносит WAL в БД и обрезает файл, если он разросся"""
+    try:
+        wal_size = os.path.getsize(DB_PATH + '-wal')
+    except OSError:
+        return
+    if wal_size > WAL_TRUNCATE_SIZE:
+        with _conn_lock:
+            _get_conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+async def _wal_checkpoint_task(app):
+    """Фоновая задача приложения: периодический checkpoint WAL"""
+    async def loop():
+        while True:
+            await asyncio.sleep(WAL_CHECKPOINT_INTERVAL)
+            try:
+                await asyncio.to_thread(_checkpoint_wal)
+            except sqlite3.Error:
+                # Writer держит БД - попробуем в следующий раз
+                pass
     
-    def do_GET(self):
-        """Обработка GET запросов"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        query = parse_qs(parsed_path.query)
-        
-        if path == '/':
-            self.serve_dashboard()
-        elif path == '/api/snapshots':
-            self.serve_snapshots_api(query)
-        elif path == '/api/snapshot':
-            self.serve_snapshot_details(query)
+    task = asyncio.create_task(loop())
+    yield
+    task.cancel()
+
+
+def _detect_fts(conn):
+    """Проверяет (только чтением), есть ли snapshots_fts и работает ли он в этом SQLite"""
+    global _fts_available
+    try:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'snapshots_fts'").fetchone():
+            conn.execute("SELECT rowid FROM snapshots_fts LIMIT 0").fetchall()
+            _fts_available = True
+            return
+    except sqlite3.OperationalError:
+        # SQLite собран без FTS5 (или без trigram): поиск останется на LIKE
+        pass
+    _fts_available = False
+
+
+def _filter_clause(q=None, changes=None):
+    """
+    Условие WHERE для фильтров дашборда (без ведущего AND).
+    q ищется подстрокой в url/api_name/method_name: через trigram-индекс,
+    а если его нет или запрос короче трёх символов - через LIKE
+    """
+    clauses, params = [], []
+    if q:
+        if _fts_available and len(q) >= FTS_MIN_QUERY_LEN:
+            # Запрос - одна фраза в кавычках: спецсимволы FTS5 не интерпретируются
+            clauses.append("id IN (SELECT rowid FROM snapshots_fts WHERE snapshots_fts MATCH ?)")
+            params.append('"' + q.replace('"', '""') + '"')
         else:
-            self.send_error(404)
-    
-    def serve_dashboard(self):
-        """Главная страница"""
-        html_content = """
+            clauses.append("(url LIKE ? OR api_name LIKE ? OR method_name LIKE ?)")
+            params.extend([f'%{q}%'] * 3)
+    if changes is not None:
+        clauses.append("has_changes = ?")
+        params.append(1 if changes else 0)
+    return ' AND '.join(clauses) or '1', params
+
+
+def _make_response(request, body, content_type, status=200, gzipped=None, headers=None):
+    """
+    Ответ с телом body (bytes), сжатым gzip, если клиент его принимает.
+    Уровень 1: почти тот же выигрыш на JSON/HTML, но заметно быстрее.
+    gzipped - заранее сжатое тело, если оно есть
+    """
+    headers = dict(headers or {}, Vary='Accept-Encoding')
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = gzipped if gzipped is not None else gzip.compress(body, compresslevel=1)
+        headers['Content-Encoding'] = 'gzip'
+    return web.Response(
+        body=body,
+        status=status,
+        headers=headers,
+        content_type=content_type,
+        charset='utf-8'
+    )
+
+
+def _json_dumps(data):
+    """JSON в UTF-8 байтах: orjson (Rust) если установлен, сразу пишет bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def _json_response(request, data, status=200, headers=None):
+    body = _json_dumps(data)
+    return _make_response(request, body, 'application/json', status=status, headers=headers)
+
+
+# Страница статична: кодируется и сжимается один раз при импорте
+_DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html lang="ru">
 <head>
@@ -78,6 +227,7 @@ class SimpleWebHandler(BaseHTTPRequestHandler):
         <div id="snapshots-container">
             <div class="loading">Загрузка снепшотов...</div>
         </div>
+        <div id="load-more-sentinel"></div>
     </div>
     
     <!-- Модальное окно -->
@@ -90,25 +240,100 @@ class SimpleWebHandler(BaseHTTPRequestHandler):
     
     <script>
         let allSnapshots = [];
+        let nextCursor = null;
+        let loadingMore = false;
+        let filterTimer = null;
+        let loadSeq = 0;
+        const CACHE_KEY = 'apiw_snapshots';
+        
+        // Фильтры применяет сервер: ?q=&changes=
+        function filterParams() {
+            const params = new URLSearchParams();
+            const search = document.getElementById('search').value.trim();
+            const changesFilter = document.getElementById('filter-changes').value;
+            if (search) params.set('q', search);
+            if (changesFilter) params.set('changes', changesFilter);
+            return params;
+        }
+        
+        // Статистика и список из ответа /api/snapshots
+        function renderData(data) {
+            allSnapshots = data.snapshots || [];
+            nextCursor = data.next_cursor || null;
+            
+            // Обновляем статистику
+            document.getElementById('stats').innerHTML = `
+                📊 Всего URL: ${data.total_urls || 0} | 
+                📸 Снепшотов: ${data.total_snapshots || 0} | 
+                🔄 С изменениями: ${data.snapshots_with_changes || 0}
+            `;
+            
+            displaySnapshots(allSnapshots);
+        }
         
         // Загрузка снепшотов
         async function loadSnapshots() {
+            const seq = ++loadSeq;
+            const params = filterParams();
             try {
-                const response = await fetch('/api/snapshots');
+                const response = await fetch('/api/snapshots?' + params);
                 const data = await response.json();
-                allSnapshots = data.snapshots || [];
-                
-                // Обновляем статистику
-                document.getElementById('stats').innerHTML = `
-                    📊 Всего URL: ${data.total_urls || 0} | 
-                    📸 Снепшотов: ${data.total_snapshots || 0} | 
-                    🔄 С изменениями: ${data.snapshots_with_changes || 0}
-                `;
-                
+                // Пока шёл запрос, фильтр успели поменять - ответ устарел
+                if (seq !== loadSeq) return;
+                renderData(data);
+                if (params.toString()) return;
+                try {
+                    localStorage.setItem(CACHE_KEY, JSON.stringify(data));
+                } catch (e) {
+                    // Переполнено или запрещено - просто работаем без кэша
+                }
+            } catch (error) {
+                // Если показан кэш, оставляем его на экране
+                if (allSnapshots.length === 0) {
+                    document.getElementById('snapshots-container').innerHTML = 
+                        '<div class="loading">❌ Ошибка загрузки: ' + error.message + '</div>';
+                }
+            }
+        }
+        
+        // Следующая страница (бесконечная прокрутка)
+        async function loadMore() {
+            if (!nextCursor || loadingMore) {
+                return;
+            }
+            loadingMore = true;
+            const seq = loadSeq;
+            const params = filterParams();
+            params.set('before_id', nextCursor);
+            try {
+                const response = await fetch('/api/snapshots?' + params);
+                const data = await response.json();
+                if (seq !== loadSeq) return;
+                allSnapshots = allSnapshots.concat(data.snapshots || []);
+                nextCursor = data.next_cursor || null;
                 displaySnapshots(allSnapshots);
             } catch (error) {
-                document.getElementById('snapshots-container').innerHTML = 
-                    '<div class="loading">❌ Ошибка загрузки: ' + error.message + '</div>';
+                // Попробуем снова при следующей прокрутке
+            } finally {
+                loadingMore = false;
+            }
+        }
+        
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadMore();
+            }
+        }).observe(document.getElementById('load-more-sentinel'));
+        
+        // stale-while-revalidate: сразу показываем прошлый ответ, затем свежий
+        function renderCached() {
+            try {
+                const cached = JSON.parse(localStorage.getItem(CACHE_KEY) || 'null');
+                if (cached) {
+                    renderData(cached);
+                }
+            } catch (e) {
+                localStorage.removeItem(CACHE_KEY);
             }
         }
         
@@ -145,27 +370,38 @@ class SimpleWebHandler(BaseHTTPRequestHandler):
             container.innerHTML = html;
         }
         
-        // Фильтрация снепшотов
+        // Фильтрация снепшотов: запрос к серверу, пока пользователь печатает - не чаще раза в 250 мс
         function filterSnapshots() {
-            const search = document.getElementById('search').value.toLowerCase();
-            const changesFilter = document.getElementById('filter-changes').value;
-            
-            let filtered = allSnapshots.filter(snapshot => {
-                // Фильтр по тексту
-                const matchesSearch = !search || 
-                    (snapshot.url && snapshot.url.toLowerCase().includes(search)) ||
-                    (snapshot.api_name && snapshot.api_name.toLowerCase().includes(search)) ||
-                    (snapshot.method_name && snapshot.method_name.toLowerCase().includes(search));
-                
-                // Фильтр по изменениям
-                const matchesChanges = !changesFilter || 
-                    (changesFilter === 'true' && snapshot.has_changes) ||
-                    (changesFilter === 'false' && !snapshot.has_changes);
-                
-                return matchesSearch && matchesChanges;
+            clearTimeout(filterTimer);
+            filterTimer = setTimeout(loadSnapshots, 250);
+        }
+        
+        // Запросы деталей, сделанные в одной задаче, уходят одним /api/snapshots/bulk
+        let pendingDetails = null;
+        
+        function fetchSnapshotDetails(id) {
+            if (!pendingDetails) {
+                const batch = pendingDetails = new Map();
+                queueMicrotask(async () => {
+                    pendingDetails = null;
+                    try {
+                        const response = await fetch(`/api/snapshots/bulk?ids=${[...batch.keys()].join(',')}`);
+                        const data = await response.json();
+                        if (data.error) throw new Error(data.error);
+                        const byId = new Map(data.snapshots.map(s => [s.id, s]));
+                        for (const [key, waiters] of batch) {
+                            const snapshot = byId.get(key);
+                            waiters.forEach(w => snapshot ? w.resolve(snapshot) : w.reject(new Error('Снепшот не найден')));
+                        }
+                    } catch (error) {
+                        for (const waiters of batch.values()) waiters.forEach(w => w.reject(error));
+                    }
+                });
+            }
+            return new Promise((resolve, reject) => {
+                if (!pendingDetails.has(id)) pendingDetails.set(id, []);
+                pendingDetails.get(id).push({resolve, reject});
             });
-            
-            displaySnapshots(filtered);
         }
         
         // Показать детали снепшота
@@ -174,8 +410,7 @@ class SimpleWebHandler(BaseHTTPRequestHandler):
             document.getElementById('modal-body').innerHTML = '<div class="loading">Загрузка деталей...</div>';
             
             try {
-                const response = await fetch(`/api/snapshot?id=${id}`);
-                const data = await response.json();
+                const data = await fetchSnapshotDetails(id);
                 
                 let html = `
                     <h2>${data.api_name || 'Снепшот'}</h2>
@@ -191,7 +426,10 @@ class SimpleWebHandler(BaseHTTPRequestHandler):
                 
                 if (data.text_content) {
                     const preview = data.text_content.substring(0, 1000);
-                    html += `<h3>Содержимое (первые 1000 символов):</h3><pre style="background: #f5f5f5; padding: 10px; border-radius: 3px; overflow-x: auto;">${preview}${data.text_content.length > 1000 ? '...' : ''}</pre>`;
+                    html += `<h3>Содержимое (первые 1000 символов):</h3><pre id="snapshot-text" style="background: #f5f5f5; padding: 10px; border-radius: 3px; overflow-x: auto;">${preview}${data.text_length > 1000 ? '...' : ''}</pre>`;
+                    if (data.text_length > 1000) {
+                        html += `<button onclick="loadFullText(${data.id})">Показать полностью (${data.text_length} символов)</button>`;
+                    }
                 }
                 
                 document.getElementById('modal-body').innerHTML = html;
@@ -200,147 +438,363 @@ class SimpleWebHandler(BaseHTTPRequestHandler):
             }
         }
         
+        // Полный текст снепшота - только по запросу, кусками, пока сервер
+        // возвращает заголовок X-Next-Offset
+        async function loadFullText(id) {
+            const pre = document.getElementById('snapshot-text');
+            try {
+                const chunks = [];
+                let offset = 0;
+                while (offset !== null) {
+                    const response = await fetch(`/api/snapshot/content?id=${id}&field=text&offset=${offset}`);
+                    if (!response.ok) {
+                        throw new Error((await response.json()).error || response.statusText);
+                    }
+                    chunks.push(await response.text());
+                    const next = response.headers.get('X-Next-Offset');
+                    offset = next === null ? null : Number(next);
+                }
+                pre.textContent = chunks.join('');
+            } catch (error) {
+                pre.insertAdjacentText('afterend', '❌ ' + error.message);
+            }
+        }
+        
         // Закрыть модальное окно
         function closeModal() {
             document.getElementById('modal').style.display = 'none';
         }
         
         // Загружаем данные при старте
+        renderCached();
         loadSnapshots();
     </script>
 </body>
 </html>
-        """
+""".encode('utf-8')
+_DASHBOARD_HTML_GZ = gzip.compress(_DASHBOARD_HTML, 9)
+
+
+async def serve_dashboard(request):
+    """Главная страница"""
+    return _make_response(
+        request,
+        _DASHBOARD_HTML,
+        'text/html',
+        gzipped=_DASHBOARD_HTML_GZ,
+        headers={'Cache-Control': 'public, max-age=300, stale-while-revalidate=60'}
+    )
+
+
+def _load_snapshots_head(limit, before_id=None, if_none_match=None, q=None, changes=None):
+    """
+    Версия и статистика для страницы снепшотов (блокирующий запрос к SQLite)
+    
+    Keyset-пагинация по id: страница - это limit снепшотов с id < before_id,
+    без OFFSET, поэтому стоимость не растёт с номером страницы. Статистика
+    считается только для первой страницы и не зависит от фильтров q/changes.
+    
+    Returns:
+        (etag, head); head = None, если у клиента уже актуальная версия
+    """
+    with _conn_lock:
+        cursor = _get_conn().cursor()
+        
+        # Версия данных: снепшоты только добавляются, поэтому количества и
+        # времени последнего достаточно (плюс параметры, которые меняют ответ)
+        cursor.execute("SELECT COUNT(*), COALESCE(MAX(created_at), '') FROM snapshots")
+        count, last_created = cursor.fetchone()
+        filters = zlib.crc32(repr((q, changes)).encode('utf-8'))
+        etag = 'W/"%d-%s-%d-%s-%x"' % (count, last_created, limit, before_id or '', filters)
+        if if_none_match == etag:
+            return etag, None
         
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
+        if before_id is not None:
+            return etag, {}
+        
+        # Статистика: каждый подзапрос читает только свой покрывающий индекс,
+        # а не строки таблицы с тяжёлыми raw_html/text_content
+        cursor.execute("""
+            SELECT (SELECT COUNT(*) FROM snapshots),
+                   (SELECT COUNT(DISTINCT url) FROM snapshots),
+                   (SELECT COUNT(*) FROM snapshots WHERE has_changes = 1)
+        """)
+        total_snapshots, total_urls, snapshots_with_changes = cursor.fetchone()
     
-    def serve_snapshots_api(self, query):
-        """API для получения снепшотов"""
-        try:
-            conn = sqlite3.connect('api_watcher.db')
-            cursor = conn.cursor()
-            
-            # Статистика
-            cursor.execute("SELECT COUNT(*) FROM snapshots")
-            total_snapshots = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(DISTINCT url) FROM snapshots")
-            total_urls = cursor.fetchone()[0]
-            
-            cursor.execute("SELECT COUNT(*) FROM snapshots WHERE has_changes = 1")
-            snapshots_with_changes = cursor.fetchone()[0]
-            
-            # Последние снепшоты
-            limit = int(query.get('limit', ['50'])[0])
-            cursor.execute("""
-                SELECT id, url, api_name, method_name, content_type, created_at, has_changes, ai_summary
-                FROM snapshots 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            """, (limit,))
-            
-            snapshots = []
-            for row in cursor.fetchall():
-                snapshots.append({
-                    'id': row[0],
-                    'url': row[1],
-                    'api_name': row[2],
-                    'method_name': row[3],
-                    'content_type': row[4],
-                    'created_at': row[5],
-                    'has_changes': bool(row[6]),
-                    'ai_summary': row[7]
-                })
-            
-            response_data = {
-                'total_snapshots': total_snapshots,
-                'total_urls': total_urls,
-                'snapshots_with_changes': snapshots_with_changes,
-                'snapshots': snapshots
-            }
-            
-            conn.close()
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(json.dumps(response_data, ensure_ascii=False).encode('utf-8'))
-            
-        except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.end_headers()
-            error_response = {'error': str(e)}
-            self.wfile.write(json.dumps(error_response, ensure_ascii=False).encode('utf-8'))
+    return etag, {
+        'total_snapshots': total_snapshots,
+        'total_urls': total_urls,
+        'snapshots_with_changes': snapshots_with_changes
+    }
+
+
+def _iter_snapshot_rows(before_id, limit, q=None, changes=None):
+    """
+    Снепшоты с id < before_id, подходящие под фильтры, от новых к старым,
+    пачками по STREAM_BATCH_SIZE: запрос выполняется один раз, строки
+    дочитываются fetchmany, в памяти - только текущая пачка.
+    next() вызывать под _conn_lock (см. _next_batch)
+    """
+    cursor = _get_conn().cursor()
+    where, params = _filter_clause(q, changes)
+    # Снепшоты добавляются по порядку, так что id DESC - это от новых к старым
+    cursor.execute(f"""
+        SELECT id, url, api_name, method_name, content_type, created_at, has_changes, ai_summary
+        FROM snapshots 
+        WHERE id < ? AND {where}
+        ORDER BY id DESC 
+        LIMIT ?
+    """, (before_id if before_id is not None else 2 ** 63 - 1, *params, limit))
+    try:
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                return
+            yield [_row_to_dict(row) for row in rows]
+    finally:
+        cursor.close()
+
+
+def _next_batch(batches):
+    """Следующая пачка строк или None (блокирующее чтение SQLite)"""
+    with _conn_lock:
+        return next(batches, None)
+
+
+def _close_batches(batches):
+    """Закрывает курсор, если ответ оборвался на середине"""
+    with _conn_lock:
+        batches.close()
+
+
+def _row_to_dict(row):
+    """sqlite3.Row -> dict для JSON (has_changes хранится как 0/1)"""
+    snapshot = dict(row)
+    snapshot['has_changes'] = bool(snapshot['has_changes'])
+    return snapshot
+
+
+def _load_snapshots_details(snapshot_ids):
+    """
+    Детали нескольких снепшотов одним запросом (блокирующий запрос к SQLite).
+    Тяжёлые поля не читаются целиком: только начало текста и длины,
+    остальное - через /api/snapshot/content
+    """
+    placeholders = ','.join('?' * len(snapshot_ids))
+    with _conn_lock:
+        cursor = _get_conn().cursor()
+        cursor.execute(f"""
+            SELECT id, url, api_name, method_name, content_type,
+                   substr(text_content, 1, ?) AS text_content,
+                   COALESCE(length(text_content), 0) AS text_length,
+                   COALESCE(length(raw_html), 0) AS raw_html_length,
+                   created_at, has_changes, ai_summary, content_hash
+            FROM snapshots 
+            WHERE id IN ({placeholders})
+        """, (PREVIEW_CHARS, *snapshot_ids))
+        rows = cursor.fetchall()
     
-    def serve_snapshot_details(self, query):
-        """API для получения деталей снепшота"""
-        try:
-            snapshot_id = query.get('id', [None])[0]
-            if not snapshot_id:
-                raise ValueError("ID снепшота не указан")
-            
-            conn = sqlite3.connect('api_watcher.db')
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, url, api_name, method_name, content_type, raw_html, text_content, 
-                       created_at, has_changes, ai_summary, content_hash
-                FROM snapshots 
-                WHERE id = ?
-            """, (snapshot_id,))
-            
-            row = cursor.fetchone()
-            if not row:
-                raise ValueError("Снепшот не найден")
-            
-            snapshot = {
-                'id': row[0],
-                'url': row[1],
-                'api_name': row[2],
-                'method_name': row[3],
-                'content_type': row[4],
-                'raw_html': row[5],
-                'text_content': row[6],
-                'created_at': row[7],
-                'has_changes': bool(row[8]),
-                'ai_summary': row[9],
-                'content_hash': row[10]
-            }
-            
-            conn.close()
-            
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.end_headers()
-            self.wfile.write(json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
-            
-        except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json; charset=utf-8')
-            self.end_headers()
-            error_response = {'error': str(e)}
-            self.wfile.write(json.dumps(error_response, ensure_ascii=False).encode('utf-8'))
+    return [_row_to_dict(row) for row in rows]
+
+
+def _load_snapshot_details(snapshot_id):
+    """Детали одного снепшота"""
+    snapshots = _load_snapshots_details([snapshot_id])
+    if not snapshots:
+        raise ValueError("Снепшот не найден")
+    return snapshots[0]
+
+
+def _load_snapshot_content(snapshot_id, column, offset, length):
+    """Кусок текста или HTML снепшота (offset и length - в символах)"""
+    with _conn_lock:
+        cursor = _get_conn().cursor()
+        # column берётся только из CONTENT_FIELDS
+        cursor.execute(
+            f"SELECT substr({column}, ?, ?) FROM snapshots WHERE id = ?",
+            (offset + 1, length, snapshot_id)
+        )
+        row = cursor.fetchone()
+    
+    if not row:
+        raise ValueError("Снепшот не найден")
+    return row[0] or ''
+
+
+async def serve_snapshots_api(request):
+    """
+    API для получения снепшотов: ?limit=&before_id=&q=&changes=true|false.
+    Ответ пишется по частям (chunked): строки читаются из БД пачками по
+    STREAM_BATCH_SIZE и сразу отправляются, целиком список в памяти не собирается.
+    Повторные запросы в течение SNAPSHOTS_CACHE_TTL отдаются из памяти целиком
+    """
+    try:
+        limit = min(max(int(request.query.get('limit', '50')), 1), MAX_PAGE_SIZE)
+        before_id = request.query.get('before_id')
+        before_id = int(before_id) if before_id else None
+        q = request.query.get('q', '').strip() or None
+        changes = {'true': True, 'false': False}.get(request.query.get('changes', ''))
+        
+        # Клиенты, опрашивающие одновременно, получают один и тот же ответ
+        cache_key = (limit, before_id, q, changes)
+        cached = _snapshots_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            _, etag, body = cached
+            headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers=dict(headers, Vary='Accept-Encoding'))
+            return _make_response(request, body, 'application/json', headers=headers)
+        
+        # SQLite в отдельном потоке: остальные запросы не ждут диск
+        etag, head = await asyncio.to_thread(
+            _load_snapshots_head, limit, before_id, request.headers.get('If-None-Match'), q, changes
+        )
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    # no-cache: браузер всегда переспрашивает, но с If-None-Match
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if head is None:
+        return web.Response(status=304, headers=headers)
+    
+    response = web.StreamResponse(headers=headers)
+    response.content_type = 'application/json'
+    response.charset = 'utf-8'
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.enable_compression(web.ContentCoding.gzip)
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    
+    # Отправленные куски сохраняются для кэша
+    parts = []
+    
+    async def write(part):
+        parts.append(part)
+        await response.write(part)
+    
+    # {"total_snapshots": ..., "snapshots": [ ... ], "next_cursor": ...}
+    prefix = _json_dumps(head)[:-1]
+    await write((prefix + b', ' if head else prefix) + b'"snapshots": [')
+    
+    sent = 0
+    last_id = before_id
+    batches = _iter_snapshot_rows(before_id, limit, q, changes)
+    try:
+        while True:
+            # Блокировка БД берётся только на чтение пачки и не держится,
+            # пока медленный клиент читает ответ
+            rows = await asyncio.to_thread(_next_batch, batches)
+            if rows is None:
+                break
+            chunk = b', '.join(_json_dumps(row) for row in rows)
+            await write((b', ' if sent else b'') + chunk)
+            sent += len(rows)
+            last_id = rows[-1]['id']
+    finally:
+        await asyncio.to_thread(_close_batches, batches)
+    
+    # Курсор следующей страницы; null - дальше снепшотов нет
+    next_cursor = last_id if sent == limit else None
+    await write(b'], "next_cursor": ' + _json_dumps(next_cursor) + b'}')
+    await response.write_eof()
+    
+    now = time.monotonic()
+    if len(_snapshots_cache) >= SNAPSHOTS_CACHE_MAX_ENTRIES:
+        for key in [key for key, entry in _snapshots_cache.items() if entry[0] <= now]:
+            del _snapshots_cache[key]
+        if len(_snapshots_cache) >= SNAPSHOTS_CACHE_MAX_ENTRIES:
+            _snapshots_cache.clear()
+    _snapshots_cache[cache_key] = (now + SNAPSHOTS_CACHE_TTL, etag, b''.join(parts))
+    return response
+
+
+async def serve_snapshot_details(request):
+    """API для получения деталей снепшота"""
+    try:
+        snapshot_id = request.query.get('id')
+        if not snapshot_id:
+            raise ValueError("ID снепшота не указан")
+        
+        snapshot = await asyncio.to_thread(_load_snapshot_details, snapshot_id)
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    return _json_response(request, snapshot)
+
+
+async def serve_snapshots_bulk(request):
+    """Детали нескольких снепшотов: ?ids=1,2,3 (один запрос к БД вместо N)"""
+    try:
+        ids = request.query.get('ids', '')
+        snapshot_ids = list(dict.fromkeys(int(i) for i in ids.split(',') if i.strip()))
+        if not snapshot_ids:
+            raise ValueError("ID снепшотов не указаны")
+        if len(snapshot_ids) > MAX_BULK_IDS:
+            raise ValueError(f"Не больше {MAX_BULK_IDS} ID за запрос")
+        
+        snapshots = await asyncio.to_thread(_load_snapshots_details, snapshot_ids)
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    return _json_response(request, {'snapshots': snapshots})
+
+
+async def serve_snapshot_content(request):
+    """
+    Часть содержимого снепшота: ?id=&field=text|raw&offset=&length=
+    Если кусок заполнен целиком, заголовок X-Next-Offset указывает, откуда читать дальше
+    """
+    try:
+        snapshot_id = request.query.get('id')
+        if not snapshot_id:
+            raise ValueError("ID снепшота не указан")
+        column = CONTENT_FIELDS.get(request.query.get('field', 'text'))
+        if column is None:
+            raise ValueError("Неизвестное поле")
+        offset = max(int(request.query.get('offset', '0')), 0)
+        length = min(max(int(request.query.get('length', str(MAX_CONTENT_CHUNK))), 0), MAX_CONTENT_CHUNK)
+        
+        content = await asyncio.to_thread(_load_snapshot_content, snapshot_id, column, offset, length)
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    headers = {'X-Next-Offset': str(offset + length)} if length and len(content) == length else None
+    return _make_response(request, content.encode('utf-8'), 'text/plain', headers=headers)
+
+
+async def _close_conn(app):
+    global _conn
+    with _conn_lock:
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+
+
+def create_app():
+    """Асинхронное приложение: запросы обслуживаются конкурентно"""
+    app = web.Application()
+    app.router.add_get('/', serve_dashboard)
+    app.router.add_get('/api/snapshots', serve_snapshots_api)
+    app.router.add_get('/api/snapshot', serve_snapshot_details)
+    app.router.add_get('/api/snapshots/bulk', serve_snapshots_bulk)
+    app.router.add_get('/api/snapshot/content', serve_snapshot_content)
+    app.cleanup_ctx.append(_wal_checkpoint_task)
+    app.on_cleanup.append(_close_conn)
+    return app
+
 
 def main():
     """Запуск веб-сервера"""
     port = 8080
-    server_address = ('', port)
     
     print(f"🌐 Запуск веб-интерфейса API Watcher...")
     print(f"📍 Адрес: http://localhost:{port}")
-    print(f"🔍 База данных: api_watcher.db")
+    print(f"🔍 База данных: {DB_PATH}")
     print(f"⏹️  Для остановки нажмите Ctrl+C")
     
-    try:
-        httpd = HTTPServer(server_address, SimpleWebHandler)
-        httpd.serve_forever()
-    except KeyboardInterrupt:
-        print(f"\n🛑 Сервер остановлен")
-        httpd.server_close()
+    # run_app сам обрабатывает Ctrl+C и закрывает сервер
+    web.run_app(create_app(), port=port, print=None)
+    print(f"\n🛑 Сервер остановлен")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
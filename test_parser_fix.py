@@ -3,8 +3,14 @@
 Test script to verify the OpenAPI parser error handling improvements
 """
 
+import argparse
+import glob
+import io
+import logging
+import shelve
 import sys
 import os
+import time
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'api_watcher'))
 
 from api_watcher.parsers.openapi_parser import OpenAPIParser
@@ -12,13 +18,49 @@ from api_watcher.services.content_processor import ContentProcessor
 from api_watcher.notifier.base import NotifierManager
 from api_watcher.notifier.adapters import ConsoleAdapter
 
+# Вывод копится в буфере и печатается одной записью в конце (см. main)
+log = logging.getLogger('test_parser_fix')
+
+# Ответы httpbin кэшируются на диске: повторные прогоны не зависят от сети
+HTTP_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.test_http_cache')
+HTTP_CACHE_TTL = 24 * 60 * 60
+
+
+class CachedGet:
+    """Замена session.get: ответы (requests.Response) хранятся в shelve по URL"""
+    
+    def __init__(self, session, path=HTTP_CACHE_FILE, ttl=HTTP_CACHE_TTL):
+        self._get = session.get
+        self._path = path
+        self._ttl = ttl
+    
+    def __call__(self, url, **kwargs):
+        with shelve.open(self._path) as cache:
+            entry = cache.get(url)
+        if entry and time.time() - entry[0] < self._ttl:
+            return entry[1]
+        
+        # Ошибки сети не кэшируются - пробросятся как обычно
+        response = self._get(url, **kwargs)
+        with shelve.open(self._path) as cache:
+            cache[url] = (time.time(), response)
+        return response
+
+
+def clear_http_cache():
+    # shelve может создать несколько файлов (.db, .dir, .dat, .bak)
+    for path in glob.glob(HTTP_CACHE_FILE + '*'):
+        os.remove(path)
+
+
 def test_openapi_parser_error_handling():
     """Test OpenAPI parser with various error scenarios"""
-    print("\n" + "="*60)
-    print("🧪 TESTING OPENAPI PARSER ERROR HANDLING")
-    print("="*60)
+    log.info("\n" + "="*60)
+    log.info("🧪 TESTING OPENAPI PARSER ERROR HANDLING")
+    log.info("="*60)
     
     parser = OpenAPIParser()
+    parser.session.get = CachedGet(parser.session)
     
     # Test cases that should trigger better error messages
     test_cases = [
@@ -40,29 +82,29 @@ def test_openapi_parser_error_handling():
     ]
     
     for test_case in test_cases:
-        print(f"\n🔍 Testing: {test_case['name']}")
-        print(f"URL: {test_case['url']}")
+        log.info(f"\n🔍 Testing: {test_case['name']}")
+        log.info(f"URL: {test_case['url']}")
         
         try:
             result = parser.parse(test_case['url'])
-            print(f"❌ Expected error but got result: {type(result)}")
+            log.error(f"❌ Expected error but got result: {type(result)}")
         except Exception as e:
             error_msg = str(e)
-            print(f"✅ Got expected error: {error_msg}")
+            log.info(f"✅ Got expected error: {error_msg}")
             
             # Check if error message contains expected text
             if any(keyword in error_msg.lower() for keyword in test_case['expected_error'].lower().split()):
-                print(f"✅ Error message contains expected keywords")
+                log.info(f"✅ Error message contains expected keywords")
             else:
-                print(f"⚠️ Error message doesn't contain expected keywords: {test_case['expected_error']}")
+                log.warning(f"⚠️ Error message doesn't contain expected keywords: {test_case['expected_error']}")
     
-    print("\n" + "="*60)
+    log.info("\n" + "="*60)
 
 def test_content_processor():
     """Test content processor improvements"""
-    print("\n" + "="*60)
-    print("🧪 TESTING CONTENT PROCESSOR")
-    print("="*60)
+    log.info("\n" + "="*60)
+    log.info("🧪 TESTING CONTENT PROCESSOR")
+    log.info("="*60)
     
     notifier_manager = NotifierManager()
     notifier_manager.register(ConsoleAdapter())
@@ -78,29 +120,59 @@ def test_content_processor():
     ]
     
     for content, description in test_contents:
-        print(f"\n🔍 Testing: {description}")
+        log.info(f"\n🔍 Testing: {description}")
         content_type = processor.detect_content_type('https://example.com/test', content)
-        print(f"Detected type: {content_type}")
+        log.info(f"Detected type: {content_type}")
         
         # Test validation
         is_valid, reason = processor.is_valid_response(content, 'https://example.com/test', return_details=True)
-        print(f"Valid: {is_valid}")
+        log.info(f"Valid: {is_valid}")
         if reason:
-            print(f"Reason: {reason}")
+            log.info(f"Reason: {reason}")
     
-    print("\n" + "="*60)
+    log.info("\n" + "="*60)
 
-if __name__ == '__main__':
-    print("\n🚀 API WATCHER - PARSER ERROR HANDLING TEST")
+def main():
+    """
+    Запуск проверок; -q - только ошибки и предупреждения, -v - плюс логи модулей,
+    --refresh - заново скачать ответы httpbin
+    """
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument('-q', '--quiet', action='store_true', help='show only problems')
+    arg_parser.add_argument('-v', '--verbose', action='store_true', help='also show module logs')
+    arg_parser.add_argument('--refresh', action='store_true', help='drop cached HTTP responses')
+    args = arg_parser.parse_args()
+    
+    if args.refresh:
+        clear_http_cache()
+    
+    buffer = io.StringIO()
+    handler = logging.StreamHandler(buffer)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    log.addHandler(handler)
+    log.propagate = False
+    log.setLevel(logging.WARNING if args.quiet else logging.INFO)
+    if args.verbose:
+        logging.basicConfig(level=logging.DEBUG, handlers=[handler])
+    
+    log.info("\n🚀 API WATCHER - PARSER ERROR HANDLING TEST")
     
+    exit_code = 0
     try:
         test_content_processor()
         test_openapi_parser_error_handling()
         
-        print("\n🎉 All tests completed!")
+        log.info("\n🎉 All tests completed!")
         
     except Exception as e:
-        print(f"\n❌ Test failed: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
\ No newline at end of file
+        log.exception(f"\n❌ Test failed: {e}")
+        exit_code = 1
+    finally:
+        sys.stdout.write(buffer.getvalue())
+        sys.stdout.flush()
+    
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
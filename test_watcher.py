@@ -3,9 +3,12 @@
 Тестовый скрипт для проверки работоспособности API Watcher
 """
 
+import io
 import sys
 import os
+import threading
 import traceback
+from concurrent.futures import ThreadPoolExecutor
 
 # Добавляем путь к проекту
 sys.path.insert(0, '/opt/api-tracker')
@@ -141,6 +144,38 @@ def test_watcher_creation():
         traceback.print_exc()
         return False
 
+class _ThreadLocalStdout:
+    """stdout, который в потоках с буфером пишет в этот буфер"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        return getattr(self._local, 'buffer', self._stream).write(text)
+    
+    def flush(self):
+        self._stream.flush()
+
+
+def _run_test(test):
+    """Запускает тест, собирая его вывод; возвращает (успех, вывод)"""
+    buffer = io.StringIO()
+    captured = isinstance(sys.stdout, _ThreadLocalStdout)
+    if captured:
+        sys.stdout._local.buffer = buffer
+    try:
+        ok = bool(test())
+    except Exception as e:
+        print(f"❌ Неожиданная ошибка в тесте {test.__name__}: {e}")
+        traceback.print_exc(file=sys.stdout)
+        ok = False
+    finally:
+        if captured:
+            del sys.stdout._local.buffer
+    return ok, buffer.getvalue()
+
+
 def main():
     """Основная функция тестирования"""
     print("=== API Watcher Diagnostic Test ===")
@@ -148,23 +183,30 @@ def main():
     print(f"Рабочая директория: {os.getcwd()}")
     print(f"Python path: {sys.path[:3]}...")
     
-    tests = [
-        test_imports,
+    # Независимые проверки (в основном ожидание диска и открытие БД) идут
+    # параллельно; test_imports - первым, он прогревает импорты для остальных
+    parallel_tests = [
         test_config,
         test_database,
         test_watcher_creation
     ]
+    total = 1 + len(parallel_tests)
     
-    passed = 0
-    total = len(tests)
+    passed = 1 if _run_test(test_imports)[0] else 0
     
-    for test in tests:
-        try:
-            if test():
-                passed += 1
-        except Exception as e:
-            print(f"❌ Неожиданная ошибка в тесте {test.__name__}: {e}")
-            traceback.print_exc()
+    # Вывод каждого теста собирается отдельно и печатается по порядку
+    real_stdout = sys.stdout
+    sys.stdout = _ThreadLocalStdout(real_stdout)
+    try:
+        with ThreadPoolExecutor(max_workers=len(parallel_tests)) as executor:
+            results = list(executor.map(_run_test, parallel_tests))
+    finally:
+        sys.stdout = real_stdout
+    
+    for ok, output in results:
+        print(output, end='')
+        if ok:
+            passed += 1
     
     print(f"\n=== Результат: {passed}/{total} тестов пройдено ===")
     
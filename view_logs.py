@@ -3,41 +3,155 @@
 Скрипт для удобного просмотра логов API Watcher
 """
 
+import mmap
 import os
+import shutil
 import sys
 import json
+import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import Iterator, List, Dict, Optional, Pattern, Tuple, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Парсер JSON-строк лога: orjson (в 2-5 раз быстрее json) если установлен;
+# его JSONDecodeError - подкласс json.JSONDecodeError
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Поиск идёт окнами по столько байт: в памяти - одно окно, а не весь лог
+SEARCH_WINDOW = 4 * 1024 * 1024
+# Таблица приведения ASCII к нижнему регистру для bytes.translate: строится один раз
+_LOWER = bytes.maketrans(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', b'abcdefghijklmnopqrstuvwxyz')
+
+# Иконки уровней и служебные поля записи (остальные поля выводятся списком)
+LEVEL_ICONS = {
+    'DEBUG': '🔍',
+    'INFO': '✅',
+    'WARNING': '⚠️',
+    'ERROR': '❌',
+    'CRITICAL': '🚨'
+}
+META_KEYS = frozenset({'timestamp', 'time', 'level', 'message', 'msg', 'logger', 'name'})
+
+# Системный tail (нет, например, на Windows - тогда tail_lines)
+TAIL_BIN = shutil.which('tail')
+
+# Блок, которым хвост файла читается с конца
+TAIL_CHUNK = 64 * 1024
+# Кусок файла для подсчёта строк
+COUNT_CHUNK = 1024 * 1024
+
+
+def _count_newlines(mm, start: int, end: int) -> int:
+    """Число переводов строки в mm[start:end]; срез копирует байты, поэтому по кускам COUNT_CHUNK"""
+    count = 0
+    for chunk_start in range(start, end, COUNT_CHUNK):
+        count += mm[chunk_start:min(chunk_start + COUNT_CHUNK, end)].count(b'\n')
+    return count
+
+
+def line_stats(path: str) -> Tuple[int, Optional[str]]:
+    """
+    Количество строк и последняя строка за одно открытие и один mmap.
+    Строки считаются bytes.count по кускам - цикл memchr на C, без
+    построчного декодирования UTF-8; последняя строка ищется rfind с конца
+    
+    Returns:
+        (line_count, last_line); last_line = None для пустого файла
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0, None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            line_count = _count_newlines(mm, 0, size)
+            
+            end = size
+            if mm[size - 1:size] == b'\n':
+                end -= 1
+            else:
+                # Последняя строка без перевода строки тоже считается (как при итерации по файлу)
+                line_count += 1
+            last_line = mm[mm.rfind(b'\n', 0, end) + 1:end].decode('utf-8', 'replace')
+    return line_count, last_line
+
+
+def tail_lines(path: str, n: int) -> List[str]:
+    """
+    Последние n строк файла: блоки читаются с конца, пока не наберётся n
+    переводов строки, - объём чтения зависит от n, а не от размера лога
+    """
+    if n <= 0:
+        return []
+    # Без буфера: чтения и так блоками TAIL_CHUNK, а после каждого seek
+    # буфер BufferedReader сбрасывался бы и только добавлял копирование
+    with open(path, 'rb', buffering=0) as f:
+        position = os.fstat(f.fileno()).st_size
+        chunks = []
+        newlines = 0
+        # n строк - это n+1 перевод строки (последний - в конце файла)
+        while position > 0 and newlines <= n:
+            step = min(TAIL_CHUNK, position)
+            position -= step
+            f.seek(position)
+            chunk = f.read(step)
+            newlines += chunk.count(b'\n')
+            chunks.append(chunk)
+    # Только по \n, как при чтении файла построчно
+    lines = b''.join(reversed(chunks)).decode('utf-8', 'replace').split('\n')
+    if lines[-1] == '':
+        lines.pop()
+    return lines[-n:]
+
+def _scan_dir(dir_path: str, names: Tuple[str, ...]) -> Dict[str, str]:
+    """
+    Какие из файлов names есть в dir_path: один readdir на каталог
+    вместо stat на каждый кандидат
+    
+    Returns:
+        {имя: путь} найденных файлов
+    """
+    found = {}
+    try:
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.name in names:
+                    found[entry.name] = entry.path
+    except OSError:
+        pass
+    return found
 
 def get_log_files() -> Dict[str, str]:
     """Получает пути к файлам логов"""
     log_files = {}
     
-    # Основные логи приложения
-    app_logs = [
-        '/opt/api-tracker/api_watcher.log',
-        '/opt/api-tracker/api_watcher/api_watcher.log',
-        'api_watcher.log'
-    ]
-    
-    for log_path in app_logs:
-        if os.path.exists(log_path):
-            log_files['app'] = log_path
-            break
+    # Основные логи приложения (по приоритету)
+    app_log = _scan_dir('/opt/api-tracker', ('api_watcher.log',)).get('api_watcher.log')
+    if app_log is None:
+        for log_path in ('/opt/api-tracker/api_watcher/api_watcher.log', 'api_watcher.log'):
+            if os.path.exists(log_path):
+                app_log = log_path
+                break
+    if app_log is not None:
+        log_files['app'] = app_log
     
     # Логи systemd
-    systemd_logs = [
-        '/var/log/api-watcher/watcher.log',
-        '/var/log/api-watcher/watcher.error.log'
-    ]
-    
-    for log_path in systemd_logs:
-        if os.path.exists(log_path):
-            if 'error' in log_path:
-                log_files['systemd_error'] = log_path
-            else:
-                log_files['systemd'] = log_path
+    systemd_logs = {
+        'watcher.log': 'systemd',
+        'watcher.error.log': 'systemd_error',
+    }
+    found = _scan_dir('/var/log/api-watcher', tuple(systemd_logs))
+    for name, log_type in systemd_logs.items():
+        if name in found:
+            log_files[log_type] = found[name]
     
     return log_files
 
@@ -75,14 +189,16 @@ def view_file_logs(log_files: Dict[str, str], lines: int = 50, follow: bool = Fa
             if follow:
                 # Для режима follow используем tail -f
                 subprocess.run(['tail', '-f', log_path])
+            elif TAIL_BIN:
+                # Последние N строк: tail читает файл с конца и пишет прямо в
+                # терминал, без построчного декодирования в Python
+                sys.stdout.flush()
+                result = subprocess.run([TAIL_BIN, '-n', str(lines), log_path])
+                if result.returncode != 0:
+                    print(f"❌ Ошибка чтения файла: tail завершился с кодом {result.returncode}")
             else:
-                # Читаем последние N строк
-                with open(log_path, 'r', encoding='utf-8') as f:
-                    all_lines = f.readlines()
-                    recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
-                    
-                    for line in recent_lines:
-                        print(line.rstrip())
+                # Читаем последние N строк и выводим одной записью
+                sys.stdout.write(''.join(line.rstrip() + '\n' for line in tail_lines(log_path, lines)))
                         
         except FileNotFoundError:
             print(f"❌ Файл не найден: {log_path}")
@@ -99,25 +215,39 @@ def parse_structured_logs(log_files: Dict[str, str], filter_level: Optional[str]
             
         print(f"\n--- {log_type.upper()} ---")
         
+        # Вывод по файлу собирается в список и пишется одним вызовом
+        out = []
+        level_filter = filter_level.upper() if filter_level else None
         try:
-            with open(log_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()[-100:]  # Последние 100 строк
-                
+            lines = tail_lines(log_path, 100)  # Последние 100 строк
+            
             parsed_logs = []
             
             for line in lines:
                 line = line.strip()
                 if not line:
                     continue
+                
+                # JSON-запись начинается с { или [: текстовые строки не гоняем
+                # через парсер и исключение
+                if line[0] not in '{[':
+                    if not filter_level:
+                        out.append(f"[TEXT] {line}")
+                    continue
+                
+                # Запись нужного уровня содержит его имя (в каком-то регистре):
+                # строки без него отбрасываются поиском подстроки, без разбора JSON
+                if level_filter and level_filter not in line.upper():
+                    continue
                     
                 try:
                     # Пытаемся парсить как JSON
-                    log_entry = json.loads(line)
+                    log_entry = _json_loads(line)
                     
                     # Фильтруем по уровню если нужно
-                    if filter_level:
+                    if level_filter:
                         entry_level = log_entry.get('level', '').upper()
-                        if entry_level != filter_level.upper():
+                        if entry_level != level_filter:
                             continue
                     
                     parsed_logs.append(log_entry)
@@ -125,7 +255,7 @@ def parse_structured_logs(log_files: Dict[str, str], filter_level: Optional[str]
                 except json.JSONDecodeError:
                     # Если не JSON, показываем как есть
                     if not filter_level:  # Показываем только если нет фильтра
-                        print(f"[TEXT] {line}")
+                        out.append(f"[TEXT] {line}")
             
             # Показываем структурированные логи
             for entry in parsed_logs[-20:]:  # Последние 20
@@ -134,33 +264,141 @@ def parse_structured_logs(log_files: Dict[str, str], filter_level: Optional[str]
                 message = entry.get('message', entry.get('msg', ''))
                 logger = entry.get('logger', entry.get('name', ''))
                 
-                # Цветовая схема для уровней
-                level_colors = {
-                    'DEBUG': '🔍',
-                    'INFO': '✅',
-                    'WARNING': '⚠️',
-                    'ERROR': '❌',
-                    'CRITICAL': '🚨'
-                }
-                
-                icon = level_colors.get(level, '📝')
+                icon = LEVEL_ICONS.get(level, '📝')
                 
-                print(f"{icon} [{timestamp}] {level} {logger}")
-                print(f"   {message}")
+                out.append(f"{icon} [{timestamp}] {level} {logger}")
+                out.append(f"   {message}")
                 
                 # Дополнительные поля
-                for key, value in entry.items():
-                    if key not in ['timestamp', 'time', 'level', 'message', 'msg', 'logger', 'name']:
-                        print(f"   {key}: {value}")
+                out.extend(f"   {key}: {value}" for key, value in entry.items() if key not in META_KEYS)
                 
-                print()
+                out.append('')
                 
         except Exception as e:
-            print(f"❌ Ошибка парсинга {log_path}: {e}")
+            out.append(f"❌ Ошибка парсинга {log_path}: {e}")
+        
+        if out:
+            sys.stdout.write('\n'.join(out) + '\n')
+
+def _search_needle(search_term: str) -> Tuple[Union[bytes, Pattern[bytes]], bool]:
+    """
+    Что искать в байтах лога (готовится один раз на весь поиск).
+    ASCII-запрос ищется в окнах, приведённых к нижнему регистру через _LOWER.
+    Не-ASCII (кириллица) так не свернуть, а re.I на bytes сворачивает только
+    ASCII, поэтому каждый символ запроса - группа его вариантов регистра в UTF-8:
+    находится и "оШибка", и "ОшИбКа", как при grep -i
+    
+    Returns:
+        (needle, fold) - bytes или скомпилированный шаблон; fold: приводить ли
+        окна к нижнему регистру
+    """
+    if search_term.isascii():
+        return search_term.encode('ascii').translate(_LOWER), True
+    parts = []
+    for char in search_term:
+        variants = dict.fromkeys(v for v in (char, char.lower(), char.upper()) if len(v) == 1)
+        parts.append(b'(?:' + b'|'.join(re.escape(v.encode('utf-8')) for v in variants) + b')')
+    return re.compile(b''.join(parts)), False
+
+
+def _find_matches(mm, needle: Union[bytes, Pattern[bytes]], fold: bool) -> Iterator[int]:
+    """Смещения совпадений needle в mm, по возрастанию"""
+    if isinstance(needle, bytes):
+        overlap = len(needle) - 1
+    else:
+        # Исходник шаблона содержит байты каждого варианта - он не короче совпадения
+        overlap = len(needle.pattern)
+    size = len(mm)
+    
+    for start in range(0, size, SEARCH_WINDOW):
+        # Окна перекрываются на длину запроса, чтобы не потерять совпадение на
+        # границе; засчитываются только совпадения, начавшиеся в своём окне
+        limit = min(start + SEARCH_WINDOW, size) - start
+        window = mm[start:start + SEARCH_WINDOW + overlap]
+        if fold:
+            window = window.translate(_LOWER)
+        if isinstance(needle, bytes):
+            pos = window.find(needle)
+            while pos != -1 and pos < limit:
+                yield start + pos
+                pos = window.find(needle, pos + 1)
+        else:
+            match = needle.search(window)
+            while match and match.start() < limit:
+                yield start + match.start()
+                match = needle.search(window, match.start() + 1)
+
+
+def _search_file(path: str, needle: Union[bytes, Pattern[bytes]], fold: bool, lines_context: int) -> Iterator[str]:
+    """
+    Поиск в одном файле через mmap, вывод как у grep -n -i -C: строки с
+    совпадением - "N:текст", контекст - "N-текст". Группы строк отдаются
+    по мере нахождения, по одному блоку текста на группу (разделитель "--"
+    между группами добавляет вызывающий), - весь вывод в памяти не копится
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            size = len(mm)
+            
+            def render(group) -> str:
+                first_line, start, end, match_lines = group
+                return '\n'.join(
+                    f"{number}{':' if number in match_lines else '-'}{line.decode('utf-8', 'replace')}"
+                    for number, line in enumerate(mm[start:end].split(b'\n'), first_line)
+                )
+            
+            # [номер первой строки, начало, конец, номера строк с совпадением]
+            group = None
+            line_no = 1
+            counted_to = 0
+            line_end = -1
+            for offset in _find_matches(mm, needle, fold):
+                if offset <= line_end:
+                    # Ещё одно совпадение в уже найденной строке
+                    continue
+                line_start = mm.rfind(b'\n', 0, offset) + 1
+                line_no += _count_newlines(mm, counted_to, line_start)
+                counted_to = line_start
+                line_end = mm.find(b'\n', offset)
+                if line_end == -1:
+                    line_end = size
+                
+                # Начало контекста - не больше lines_context вызовов rfind
+                context_start = line_start
+                context_lines = 0
+                for _ in range(lines_context):
+                    if context_start == 0:
+                        break
+                    context_start = mm.rfind(b'\n', 0, context_start - 1) + 1
+                    context_lines += 1
+                context_end = line_end
+                for _ in range(lines_context):
+                    if context_end + 1 >= size:
+                        break
+                    next_end = mm.find(b'\n', context_end + 1)
+                    context_end = size if next_end == -1 else next_end
+                
+                if group and context_start <= group[2] + 1:
+                    group[2] = max(group[2], context_end)
+                    group[3].add(line_no)
+                else:
+                    if group:
+                        yield render(group)
+                    first_line = line_no - context_lines
+                    group = [first_line, context_start, context_end, {line_no}]
+            
+            if group:
+                yield render(group)
+
 
 def search_logs(log_files: Dict[str, str], search_term: str, lines_context: int = 3):
     """Поиск в логах"""
     print(f"=== Поиск '{search_term}' в логах ===")
+    needle, fold = _search_needle(search_term)
     
     for log_type, log_path in log_files.items():
         if not os.path.exists(log_path):
@@ -169,51 +407,63 @@ def search_logs(log_files: Dict[str, str], search_term: str, lines_context: int
         print(f"\n--- {log_type.upper()}: {log_path} ---")
         
         try:
-            # Используем grep для поиска
-            cmd = ['grep', '-n', '-i', '-C', str(lines_context), search_term, log_path]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            # mmap вместо grep: без дочернего процесса, файл читается окнами,
+            # группы совпадений выводятся сразу, как только найдены
+            found = False
+            for block in _search_file(log_path, needle, fold, lines_context):
+                sys.stdout.write(f"--\n{block}\n" if found else f"{block}\n")
+                found = True
             
-            if result.returncode == 0:
-                print(result.stdout)
-            else:
+            if not found:
                 print("Совпадений не найдено")
                 
         except Exception as e:
             print(f"❌ Ошибка поиска: {e}")
 
+def _log_stats_block(log_type: str, log_path: str) -> Optional[str]:
+    """Блок статистики одного лога; None, если файла нет"""
+    # Один stat на файл: и существование, и размер, и время изменения
+    try:
+        st = os.stat(log_path)
+    except FileNotFoundError:
+        return None
+    
+    try:
+        # Размер файла
+        size = st.st_size
+        
+        # Время последнего изменения
+        mtime = datetime.fromtimestamp(st.st_mtime)
+        
+        # Количество строк и последняя запись - за один проход
+        line_count, last_line = line_stats(log_path)
+        
+        out = [
+            f"\n{log_type.upper()}: {log_path}",
+            f"  Размер: {size:,} байт ({size/1024/1024:.1f} MB)",
+            f"  Строк: {line_count:,}",
+            f"  Изменен: {mtime.strftime('%Y-%m-%d %H:%M:%S')}",
+        ]
+        
+        # Анализ последних записей для определения активности
+        if last_line is not None:
+            out.append(f"  Последняя запись: {last_line.strip()[:100]}...")
+        return '\n'.join(out)
+        
+    except Exception as e:
+        return f"❌ Ошибка анализа {log_path}: {e}"
+
 def show_log_stats(log_files: Dict[str, str]):
     """Показывает статистику логов"""
     print("=== Статистика логов ===")
     
-    for log_type, log_path in log_files.items():
-        if not os.path.exists(log_path):
-            continue
-            
-        try:
-            # Размер файла
-            size = os.path.getsize(log_path)
-            
-            # Время последнего изменения
-            mtime = datetime.fromtimestamp(os.path.getmtime(log_path))
-            
-            # Количество строк
-            with open(log_path, 'r', encoding='utf-8') as f:
-                line_count = sum(1 for _ in f)
-            
-            print(f"\n{log_type.upper()}: {log_path}")
-            print(f"  Размер: {size:,} байт ({size/1024/1024:.1f} MB)")
-            print(f"  Строк: {line_count:,}")
-            print(f"  Изменен: {mtime.strftime('%Y-%m-%d %H:%M:%S')}")
-            
-            # Анализ последних записей для определения активности
-            with open(log_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                if lines:
-                    last_line = lines[-1].strip()
-                    print(f"  Последняя запись: {last_line[:100]}...")
-            
-        except Exception as e:
-            print(f"❌ Ошибка анализа {log_path}: {e}")
+    # Логи анализируются параллельно (могут лежать на разных дисках),
+    # а выводятся в порядке log_files
+    with ThreadPoolExecutor(max_workers=max(1, len(log_files))) as executor:
+        blocks = executor.map(_log_stats_block, log_files.keys(), log_files.values())
+        for block in blocks:
+            if block is not None:
+                print(block)
 
 def main():
     """Основная функция"""
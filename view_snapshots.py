@@ -5,13 +5,147 @@
 
 import sys
 import os
+import re
 import json
 from datetime import datetime, timedelta
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Добавляем путь к проекту
 sys.path.insert(0, '/opt/api-tracker')
 
+# Поля файлового снэпшота, которые показываются в списке
+SNAPSHOT_FIELDS = ('metadata', 'url')
+
+# Сколько файлов снэпшотов читается одновременно
+SNAPSHOT_READ_WORKERS = 8
+
+# Сколько байт с начала файла читается для поиска полей без полного разбора
+PEEK_SIZE = 4096
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def _peek_fields(head: str) -> Optional[Dict[str, Any]]:
+    """
+    Поля SNAPSHOT_FIELDS из начала JSON-объекта: пары ключ-значение верхнего
+    уровня разбираются по одной, пока не найдены все поля.
+    
+    Returns:
+        Найденные поля или None, если начала файла не хватило
+    """
+    fields = {}
+    try:
+        pos = _WHITESPACE.match(head, 0).end()
+        if head[pos:pos + 1] != '{':
+            return None
+        pos = _WHITESPACE.match(head, pos + 1).end()
+        if head[pos:pos + 1] == '}':
+            return fields
+        while len(fields) < len(SNAPSHOT_FIELDS):
+            key, pos = _JSON_DECODER.raw_decode(head, pos)
+            pos = _WHITESPACE.match(head, pos).end()
+            if not isinstance(key, str) or head[pos:pos + 1] != ':':
+                return None
+            pos = _WHITESPACE.match(head, pos + 1).end()
+            value, pos = _JSON_DECODER.raw_decode(head, pos)
+            pos = _WHITESPACE.match(head, pos).end()
+            # Значение должно быть закрыто разделителем: иначе число могло обрезаться
+            separator = head[pos:pos + 1]
+            if separator not in (',', '}'):
+                return None
+            if key in SNAPSHOT_FIELDS:
+                fields[key] = value
+            if separator == '}':
+                break
+            pos = _WHITESPACE.match(head, pos + 1).end()
+    except ValueError:
+        return None
+    return fields
+
+def load_snapshot_fields(file_path: str) -> Dict[str, Any]:
+    """
+    Только metadata и url из JSON снэпшота. С ijson файл разбирается потоково
+    и чтение останавливается, как только оба поля найдены (мегабайты raw_html
+    не разбираются). Без него сначала разбираются первые PEEK_SIZE байт -
+    metadata и url пишутся в начало снэпшота; целиком (orjson, если
+    установлен) файл читается, только если их там не оказалось
+    """
+    with open(file_path, 'rb') as f:
+        if IJSON_AVAILABLE:
+            fields = {}
+            for key, value in ijson.kvitems(f, '', use_float=True):
+                if key in SNAPSHOT_FIELDS:
+                    fields[key] = value
+                    if len(fields) == len(SNAPSHOT_FIELDS):
+                        break
+            return fields
+        raw = f.read(PEEK_SIZE)
+        if len(raw) == PEEK_SIZE:
+            fields = _peek_fields(raw.decode('utf-8', 'ignore'))
+            if fields is not None:
+                return fields
+            raw += f.read()
+    data = orjson.loads(raw) if ORJSON_AVAILABLE else json.loads(raw)
+    return {key: data[key] for key in SNAPSHOT_FIELDS if key in data}
+
+def iter_json_files(root: str) -> Iterator[os.DirEntry]:
+    """
+    JSON-файлы в дереве root. os.scandir вместо os.walk: тип записи известен
+    из readdir, а stat() кэшируется в DirEntry
+    """
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith('.json'):
+                    yield entry
+
+def format_snapshot_file(i: int, item: Tuple[str, str, os.stat_result]) -> str:
+    """Блок вывода для одного файлового снэпшота (item - путь, имя файла и stat)"""
+    file_path, name, st = item
+    out = []
+    try:
+        data = load_snapshot_fields(file_path)
+        
+        out.append(f"\n{i}. {name}")
+        
+        # Метаданные
+        if 'metadata' in data:
+            meta = data['metadata']
+            out += [
+                f"   API: {meta.get('api_name', 'Не указано')}",
+                f"   Метод: {meta.get('method_name', 'Не указано')}",
+                f"   Дата: {meta.get('snapshot_date', 'Не указано')}",
+                f"   Время: {meta.get('snapshot_time', 'Не указано')}",
+            ]
+        
+        # URL
+        if 'url' in data:
+            out.append(f"   URL: {data['url']}")
+        
+        # Размер и время изменения файла
+        out.append(f"   Размер: {st.st_size:,} байт")
+        out.append(f"   Изменен: {datetime.fromtimestamp(st.st_mtime):%Y-%m-%d %H:%M:%S}")
+        
+    except Exception as e:
+        out.append(f"   ❌ Ошибка чтения файла: {e}")
+    return '\n'.join(out) + '\n'
+
 def view_database_snapshots():
     """Просмотр снэпшотов из базы данных"""
     try:
@@ -23,31 +157,37 @@ def view_database_snapshots():
         
         db = DatabaseManager(Config.DATABASE_URL)
         
-        # Получаем все URL
-        urls = db.get_all_urls()
+        # Все URL с последними снэпшотами - одним запросом, а не тремя на каждый URL
+        urls = db.get_urls_with_history(limit=5)
         print(f"\nОтслеживается URL: {len(urls)}")
         
-        for i, url in enumerate(urls, 1):
-            print(f"\n{i}. {url}")
+        write = sys.stdout.write
+        for i, (url, history) in enumerate(urls, 1):
+            # Блок URL собирается в список и выводится одним вызовом write
+            out = [f"\n{i}. {url}"]
             
             # Последний снэпшот
-            latest = db.get_latest_snapshot(url)
+            latest = history[0] if history else None
             if latest:
-                print(f"   Последний снэпшот: {latest.created_at}")
-                print(f"   API: {latest.api_name or 'Не указано'}")
-                print(f"   Метод: {latest.method_name or 'Не указано'}")
-                print(f"   Тип: {latest.content_type}")
-                print(f"   Есть изменения: {'Да' if latest.has_changes else 'Нет'}")
-                if latest.ai_summary:
-                    print(f"   AI сводка: {latest.ai_summary[:100]}...")
+                ai_summary = latest.ai_summary
+                out += [
+                    f"   Последний снэпшот: {latest.created_at}",
+                    f"   API: {latest.api_name or 'Не указано'}",
+                    f"   Метод: {latest.method_name or 'Не указано'}",
+                    f"   Тип: {latest.content_type}",
+                    f"   Есть изменения: {'Да' if latest.has_changes else 'Нет'}",
+                ]
+                if ai_summary:
+                    out.append(f"   AI сводка: {ai_summary[:100]}...")
             
             # История
-            history = db.get_snapshot_history(url, limit=5)
             if len(history) > 1:
-                print(f"   История ({len(history)} записей):")
+                out.append(f"   История ({len(history)} записей):")
                 for snap in history[:3]:
                     status = "🔄 Изменения" if snap.has_changes else "✅ Без изменений"
-                    print(f"     - {snap.created_at.strftime('%Y-%m-%d %H:%M')} {status}")
+                    out.append(f"     - {snap.created_at:%Y-%m-%d %H:%M} {status}")
+            
+            write('\n'.join(out) + '\n')
         
         # Недавние изменения
         print(f"\n=== Изменения за последние 7 дней ===")
@@ -55,11 +195,15 @@ def view_database_snapshots():
         
         if changes:
             for change in changes[:10]:
-                print(f"\n🔄 {change.created_at.strftime('%Y-%m-%d %H:%M')}")
-                print(f"   URL: {change.url}")
-                print(f"   API: {change.api_name or 'Не указано'}")
-                if change.ai_summary:
-                    print(f"   Изменения: {change.ai_summary}")
+                ai_summary = change.ai_summary
+                out = [
+                    f"\n🔄 {change.created_at:%Y-%m-%d %H:%M}",
+                    f"   URL: {change.url}",
+                    f"   API: {change.api_name or 'Не указано'}",
+                ]
+                if ai_summary:
+                    out.append(f"   Изменения: {ai_summary}")
+                write('\n'.join(out) + '\n')
         else:
             print("Изменений не найдено")
         
@@ -84,12 +228,11 @@ def view_file_snapshots():
         print(f"=== Файловые снэпшоты ===")
         print(f"Директория: {os.path.abspath(snapshots_dir)}")
         
-        # Получаем все JSON файлы
-        json_files = []
-        for root, dirs, files in os.walk(snapshots_dir):
-            for file in files:
-                if file.endswith('.json'):
-                    json_files.append(os.path.join(root, file))
+        # Получаем все JSON файлы: путь и имя уже есть в DirEntry, stat нужен
+        # для сортировки и вывода
+        json_files = [
+            (entry.path, entry.name, entry.stat()) for entry in iter_json_files(snapshots_dir)
+        ]
         
         if not json_files:
             print("Файловых снэпшотов не найдено")
@@ -98,37 +241,15 @@ def view_file_snapshots():
         print(f"\nНайдено файлов: {len(json_files)}")
         
         # Сортируем по времени изменения
-        json_files.sort(key=lambda x: os.path.getmtime(x), reverse=True)
-        
-        for i, file_path in enumerate(json_files[:10], 1):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                print(f"\n{i}. {os.path.basename(file_path)}")
-                
-                # Метаданные
-                if 'metadata' in data:
-                    meta = data['metadata']
-                    print(f"   API: {meta.get('api_name', 'Не указано')}")
-                    print(f"   Метод: {meta.get('method_name', 'Не указано')}")
-                    print(f"   Дата: {meta.get('snapshot_date', 'Не указано')}")
-                    print(f"   Время: {meta.get('snapshot_time', 'Не указано')}")
-                
-                # URL
-                if 'url' in data:
-                    print(f"   URL: {data['url']}")
-                
-                # Размер файла
-                size = os.path.getsize(file_path)
-                print(f"   Размер: {size:,} байт")
-                
-                # Время изменения файла
-                mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                print(f"   Изменен: {mtime.strftime('%Y-%m-%d %H:%M:%S')}")
-                
-            except Exception as e:
-                print(f"   ❌ Ошибка чтения файла: {e}")
+        json_files.sort(key=lambda item: item[2].st_mtime, reverse=True)
+        
+        # Файлы читаются параллельно (ожидание диска перекрывается), а
+        # выводятся в порядке сортировки
+        recent = json_files[:10]
+        with ThreadPoolExecutor(max_workers=SNAPSHOT_READ_WORKERS) as executor:
+            blocks = executor.map(format_snapshot_file, range(1, len(recent) + 1), recent)
+            for block in blocks:
+                sys.stdout.write(block)
         
         return True
         
@@ -146,34 +267,44 @@ def export_snapshot_details(url_filter: Optional[str] = None):
         
         if url_filter:
             print(f"=== Детали для URL: {url_filter} ===")
-            snapshots = db.get_snapshot_history(url_filter, limit=20)
+            snapshots = db.get_snapshot_summaries(url_filter, limit=20)
         else:
             print("=== Все снэпшоты с изменениями ===")
-            snapshots = db.get_snapshots_with_changes(days=30)
+            snapshots = db.get_snapshot_summaries(days=30)
         
         if not snapshots:
             print("Снэпшоты не найдены")
             return
         
+        write = sys.stdout.write
         for i, snap in enumerate(snapshots, 1):
-            print(f"\n--- Снэпшот {i} ---")
-            print(f"ID: {snap.id}")
-            print(f"URL: {snap.url}")
-            print(f"API: {snap.api_name or 'Не указано'}")
-            print(f"Метод: {snap.method_name or 'Не указано'}")
-            print(f"Тип: {snap.content_type}")
-            print(f"Дата: {snap.created_at}")
-            print(f"Изменения: {'Да' if snap.has_changes else 'Нет'}")
-            print(f"Хеш: {snap.content_hash}")
+            ai_summary = snap.ai_summary
+            text_len = snap.text_len
+            html_len = snap.html_len
+            # Запись снэпшота выводится одним вызовом write
+            out = [
+                f"\n--- Снэпшот {i} ---",
+                f"ID: {snap.id}",
+                f"URL: {snap.url}",
+                f"API: {snap.api_name or 'Не указано'}",
+                f"Метод: {snap.method_name or 'Не указано'}",
+                f"Тип: {snap.content_type}",
+                f"Дата: {snap.created_at}",
+                f"Изменения: {'Да' if snap.has_changes else 'Нет'}",
+                f"Хеш: {snap.content_hash}",
+            ]
+            
+            if ai_summary:
+                out.append(f"AI сводка: {ai_summary}")
             
-            if snap.ai_summary:
-                print(f"AI сводка: {snap.ai_summary}")
+            # Длины посчитаны в БД, тела снэпшотов не загружаются
+            if text_len:
+                out.append(f"Размер текста: {text_len:,} символов")
             
-            if snap.text_content:
-                print(f"Размер текста: {len(snap.text_content):,} символов")
+            if html_len:
+                out.append(f"Размер HTML: {html_len:,} символов")
             
-            if snap.raw_html:
-                print(f"Размер HTML: {len(snap.raw_html):,} символов")
+            write('\n'.join(out) + '\n')
         
         db.close()
         
@@ -4,44 +4,123 @@
 Запускается на http://localhost:8080
 """
 
+import asyncio
+import functools
+import gzip
+import hashlib
+import operator
 import sys
 import os
 import json
 import sqlite3
+import tempfile
+import threading
+import zlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from urllib.parse import urlparse, parse_qs
-import html
+
+from aiohttp import web
+
+from view_logs import tail_lines
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
 
 # Добавляем путь к проекту
 sys.path.insert(0, '/opt/api-tracker')
 
-class APIWatcherWebHandler(BaseHTTPRequestHandler):
-    """HTTP обработчик для веб-интерфейса"""
-    
-    def do_GET(self):
-        """Обработка GET запросов"""
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-        query = parse_qs(parsed_path.query)
-        
-        if path == '/':
-            self.serve_dashboard()
-        elif path == '/api/snapshots':
-            self.serve_snapshots_api(query)
-        elif path == '/api/logs':
-            self.serve_logs_api(query)
-        elif path == '/api/snapshot-details':
-            self.serve_snapshot_details(query)
-        elif path == '/static/style.css':
-            self.serve_css()
-        else:
-            self.send_error(404)
-    
-    def serve_dashboard(self):
-        """Главная страница"""
-        html_content = """
+# Импорт один раз при запуске, а не в каждом запросе
+from api_watcher.config import Config
+from api_watcher.storage.database import DatabaseManager
+
+# Парсер JSON-строк лога: orjson если установлен; его JSONDecodeError -
+# подкласс json.JSONDecodeError
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Источники логов по приоритету: читается первый существующий
+LOG_FILES = [
+    '/var/log/api-watcher/watcher.log',
+    '/opt/api-tracker/api_watcher.log',
+    'api_watcher.log'
+]
+
+
+# Сколько снэпшотов кодируется и отправляется одним куском ответа
+STREAM_BATCH_SIZE = 16
+
+# JSON-ответы меньше этого размера не сжимаются: выигрыш меньше затрат
+JSON_COMPRESS_MIN_SIZE = 1024
+
+
+def _accepted_encoding(request):
+    """Лучшее сжатие из Accept-Encoding клиента: 'br', 'gzip' или None"""
+    accept_encoding = request.headers.get('Accept-Encoding', '')
+    if BROTLI_AVAILABLE and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def _precompress(body):
+    """Варианты статичного тела по Content-Encoding (None - без сжатия)"""
+    variants = {None: body, 'gzip': gzip.compress(body, compresslevel=9)}
+    if BROTLI_AVAILABLE:
+        variants['br'] = brotli.compress(body, quality=11)
+    return variants
+
+
+def _json_default(value):
+    """datetime для stdlib json - в том же ISO-формате, что пишет orjson"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_dumps(data):
+    """
+    JSON ответа в UTF-8 байтах: orjson (Rust) если установлен, сразу пишет bytes.
+    datetime сериализуются как isoformat() - orjson делает это сам, без
+    промежуточных строк
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, default=_json_default).encode('utf-8')
+
+
+def _json_response(request, data, status=200, headers=None):
+    return _json_body_response(request, _json_dumps(data), status=status, headers=headers)
+
+
+def _json_body_response(request, body, status=200, headers=None):
+    """
+    Ответ с готовым JSON (bytes); заметный по размеру сжимается gzip на лету
+    (уровень 1: почти тот же выигрыш на JSON, но заметно быстрее)
+    """
+    headers = dict(headers or {}, Vary='Accept-Encoding')
+    if len(body) > JSON_COMPRESS_MIN_SIZE and 'gzip' in request.headers.get('Accept-Encoding', ''):
+        body = gzip.compress(body, compresslevel=1)
+        headers['Content-Encoding'] = 'gzip'
+    return web.Response(
+        body=body,
+        status=status,
+        headers=headers,
+        content_type='application/json',
+        charset='utf-8'
+    )
+
+
+# Страница и стили статичны: кодируются в UTF-8, хэшируются и сжимаются
+# один раз при импорте
+_DASHBOARD_HTML = """
 <!DOCTYPE html>
 <html lang="ru">
 <head>
@@ -112,6 +191,9 @@ class APIWatcherWebHandler(BaseHTTPRequestHandler):
     </div>
     
     <script>
+        // Иконки уровней лога
+        const LOG_ICONS = {error: '❌', warning: '⚠️', info: '✅', debug: '🔍'};
+        
         // Переключение вкладок
         function showTab(tabName) {
             document.querySelectorAll('.tab-content').forEach(tab => tab.classList.remove('active'));
@@ -125,40 +207,57 @@ class APIWatcherWebHandler(BaseHTTPRequestHandler):
             else if (tabName === 'changes') refreshChanges();
         }
         
+        // Элемент с классом и текстом: данные вставляются через textContent,
+        // а не в HTML-строку - без разбора HTML и без XSS из полей снэпшотов
+        function el(tag, className, text) {
+            const node = document.createElement(tag);
+            if (className) node.className = className;
+            if (text !== undefined) node.textContent = text;
+            return node;
+        }
+        
+        // Строка "подпись: значение" для окна деталей
+        function detailRow(label, value) {
+            const row = el('div');
+            row.append(el('strong', '', label), ' ', value);
+            return row;
+        }
+        
         // Загрузка снэпшотов
         async function refreshSnapshots() {
             const response = await fetch('/api/snapshots');
             const data = await response.json();
             
-            let html = '<div class="snapshots-grid">';
+            const grid = el('div', 'snapshots-grid');
             
             data.snapshots.forEach(snapshot => {
-                const hasChanges = snapshot.has_changes ? 'has-changes' : '';
-                html += `
-                    <div class="snapshot-card ${hasChanges}" onclick="showSnapshotDetails(${snapshot.id})">
-                        <div class="snapshot-header">
-                            <h3>${snapshot.api_name || 'Без названия'}</h3>
-                            <span class="snapshot-date">${new Date(snapshot.created_at).toLocaleString('ru')}</span>
-                        </div>
-                        <div class="snapshot-url">${snapshot.url}</div>
-                        <div class="snapshot-method">${snapshot.method_name || 'Не указан'}</div>
-                        <div class="snapshot-status">
-                            ${snapshot.has_changes ? '🔄 Есть изменения' : '✅ Без изменений'}
-                        </div>
-                        ${snapshot.ai_summary ? `<div class="ai-summary">${snapshot.ai_summary.substring(0, 100)}...</div>` : ''}
-                    </div>
-                `;
+                const card = el('div', snapshot.has_changes ? 'snapshot-card has-changes' : 'snapshot-card');
+                card.onclick = () => showSnapshotDetails(snapshot.id);
+                
+                const header = el('div', 'snapshot-header');
+                header.append(
+                    el('h3', '', snapshot.api_name || 'Без названия'),
+                    el('span', 'snapshot-date', new Date(snapshot.created_at).toLocaleString('ru'))
+                );
+                card.append(
+                    header,
+                    el('div', 'snapshot-url', snapshot.url),
+                    el('div', 'snapshot-method', snapshot.method_name || 'Не указан'),
+                    el('div', 'snapshot-status', snapshot.has_changes ? '🔄 Есть изменения' : '✅ Без изменений')
+                );
+                if (snapshot.ai_summary) {
+                    card.append(el('div', 'ai-summary', `${snapshot.ai_summary.substring(0, 100)}...`));
+                }
+                grid.append(card);
             });
             
-            html += '</div>';
-            document.getElementById('snapshots-list').innerHTML = html;
+            document.getElementById('snapshots-list').replaceChildren(grid);
             
             // Обновляем статистику
-            document.getElementById('stats').innerHTML = `
-                📊 Всего URL: ${data.total_urls} | 
-                📸 Снэпшотов: ${data.total_snapshots} | 
-                🔄 С изменениями: ${data.snapshots_with_changes}
-            `;
+            document.getElementById('stats').textContent =
+                `📊 Всего URL: ${data.total_urls} | ` +
+                `📸 Снэпшотов: ${data.total_snapshots} | ` +
+                `🔄 С изменениями: ${data.snapshots_with_changes}`;
         }
         
         // Загрузка логов
@@ -169,31 +268,26 @@ class APIWatcherWebHandler(BaseHTTPRequestHandler):
             const response = await fetch(`/api/logs?level=${level}&lines=${lines}`);
             const data = await response.json();
             
-            let html = '<div class="logs-list">';
+            const list = el('div', 'logs-list');
             
+            // level и text сервер уже нормализовал: LEVEL в верхнем регистре,
+            // text - message, msg или сырая строка
             data.logs.forEach(log => {
-                const levelClass = log.level ? log.level.toLowerCase() : 'info';
-                const icon = {
-                    'error': '❌',
-                    'warning': '⚠️',
-                    'info': '✅',
-                    'debug': '🔍'
-                }[levelClass] || '📝';
+                const levelClass = log.level.toLowerCase();
+                const icon = LOG_ICONS[levelClass] || '📝';
                 
-                html += `
-                    <div class="log-entry ${levelClass}">
-                        <div class="log-header">
-                            <span class="log-icon">${icon}</span>
-                            <span class="log-level">${log.level || 'INFO'}</span>
-                            <span class="log-time">${log.timestamp || log.time || 'Unknown'}</span>
-                        </div>
-                        <div class="log-message">${log.message || log.msg || log.raw || ''}</div>
-                    </div>
-                `;
+                const entry = el('div', `log-entry ${levelClass}`);
+                const header = el('div', 'log-header');
+                header.append(
+                    el('span', 'log-icon', icon),
+                    el('span', 'log-level', log.level),
+                    el('span', 'log-time', log.timestamp || log.time || 'Unknown')
+                );
+                entry.append(header, el('div', 'log-message', log.text));
+                list.append(entry);
             });
             
-            html += '</div>';
-            document.getElementById('logs-list').innerHTML = html;
+            document.getElementById('logs-list').replaceChildren(list);
         }
         
         // Загрузка изменений
@@ -203,64 +297,77 @@ class APIWatcherWebHandler(BaseHTTPRequestHandler):
             const response = await fetch(`/api/snapshots?changes_only=true&days=${period}`);
             const data = await response.json();
             
-            let html = '<div class="changes-list">';
+            const list = el('div', 'changes-list');
             
             if (data.snapshots.length === 0) {
-                html += '<div class="no-changes">Изменений не найдено за выбранный период</div>';
+                list.append(el('div', 'no-changes', 'Изменений не найдено за выбранный период'));
             } else {
                 data.snapshots.forEach(snapshot => {
-                    html += `
-                        <div class="change-card" onclick="showSnapshotDetails(${snapshot.id})">
-                            <div class="change-header">
-                                <h3>${snapshot.api_name || 'Без названия'}</h3>
-                                <span class="change-date">${new Date(snapshot.created_at).toLocaleString('ru')}</span>
-                            </div>
-                            <div class="change-url">${snapshot.url}</div>
-                            ${snapshot.ai_summary ? `<div class="ai-summary">${snapshot.ai_summary}</div>` : ''}
-                        </div>
-                    `;
+                    const card = el('div', 'change-card');
+                    card.onclick = () => showSnapshotDetails(snapshot.id);
+                    
+                    const header = el('div', 'change-header');
+                    header.append(
+                        el('h3', '', snapshot.api_name || 'Без названия'),
+                        el('span', 'change-date', new Date(snapshot.created_at).toLocaleString('ru'))
+                    );
+                    card.append(header, el('div', 'change-url', snapshot.url));
+                    if (snapshot.ai_summary) {
+                        card.append(el('div', 'ai-summary', snapshot.ai_summary));
+                    }
+                    list.append(card);
                 });
             }
             
-            html += '</div>';
-            document.getElementById('changes-list').innerHTML = html;
+            document.getElementById('changes-list').replaceChildren(list);
         }
         
         // Показать детали снэпшота
         async function showSnapshotDetails(snapshotId) {
+            const body = document.getElementById('modal-body');
             document.getElementById('modal').style.display = 'block';
-            document.getElementById('modal-body').innerHTML = 'Загрузка...';
+            body.textContent = 'Загрузка...';
             
             const response = await fetch(`/api/snapshot-details?id=${snapshotId}`);
             const data = await response.json();
             
-            let html = `
-                <h2>Детали снэпшота #${data.id}</h2>
-                <div class="detail-grid">
-                    <div><strong>URL:</strong> <a href="${data.url}" target="_blank">${data.url}</a></div>
-                    <div><strong>API:</strong> ${data.api_name || 'Не указано'}</div>
-                    <div><strong>Метод:</strong> ${data.method_name || 'Не указан'}</div>
-                    <div><strong>Тип:</strong> ${data.content_type}</div>
-                    <div><strong>Дата:</strong> ${new Date(data.created_at).toLocaleString('ru')}</div>
-                    <div><strong>Изменения:</strong> ${data.has_changes ? 'Да' : 'Нет'}</div>
-                    <div><strong>Хеш:</strong> ${data.content_hash}</div>
-                </div>
-            `;
+            const fragment = document.createDocumentFragment();
+            fragment.append(el('h2', '', `Детали снэпшота #${data.id}`));
+            
+            // Ссылка только на http(s): javascript:-URL из БД не станет кликабельным
+            const link = el('a', '', data.url);
+            if (/^https?:\/\//i.test(data.url || '')) link.href = data.url;
+            link.target = '_blank';
+            
+            const grid = el('div', 'detail-grid');
+            grid.append(
+                detailRow('URL:', link),
+                detailRow('API:', data.api_name || 'Не указано'),
+                detailRow('Метод:', data.method_name || 'Не указан'),
+                detailRow('Тип:', data.content_type),
+                detailRow('Дата:', new Date(data.created_at).toLocaleString('ru')),
+                detailRow('Изменения:', data.has_changes ? 'Да' : 'Нет'),
+                detailRow('Хеш:', data.content_hash)
+            );
+            fragment.append(grid);
             
             if (data.ai_summary) {
-                html += `<div class="ai-summary-full"><h3>AI Анализ изменений:</h3><p>${data.ai_summary}</p></div>`;
+                const summary = el('div', 'ai-summary-full');
+                summary.append(el('h3', '', 'AI Анализ изменений:'), el('p', '', data.ai_summary));
+                fragment.append(summary);
             }
             
             if (data.text_content) {
-                html += `
-                    <div class="content-section">
-                        <h3>Текстовое содержимое (${data.text_content.length} символов):</h3>
-                        <pre class="content-preview">${data.text_content.substring(0, 2000)}${data.text_content.length > 2000 ? '...' : ''}</pre>
-                    </div>
-                `;
+                const content = el('div', 'content-section');
+                content.append(
+                    el('h3', '', `Текстовое содержимое (${data.text_length} символов):`),
+                    el('pre', 'content-preview',
+                       data.text_content + (data.text_length > data.text_content.length ? '...' : ''))
+                );
+                fragment.append(content);
             }
             
-            document.getElementById('modal-body').innerHTML = html;
+            body.replaceChildren(fragment);
         }
         
         // Закрыть модальное окно
@@ -298,16 +405,9 @@ class APIWatcherWebHandler(BaseHTTPRequestHandler):
     </script>
 </body>
 </html>
-        """
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/html; charset=utf-8')
-        self.end_headers()
-        self.wfile.write(html_content.encode('utf-8'))
-    
-    def serve_css(self):
-        """CSS стили"""
-        css_content = """
+""".encode('utf-8')
+
+_CSS = """
         * { margin: 0; padding: 0; box-sizing: border-box; }
         
         body {
@@ -587,176 +687,410 @@ class APIWatcherWebHandler(BaseHTTPRequestHandler):
             max-height: 300px;
             overflow-y: auto;
         }
-        """
-        
-        self.send_response(200)
-        self.send_header('Content-type', 'text/css')
-        self.end_headers()
-        self.wfile.write(css_content.encode('utf-8'))
+""".encode('utf-8')
+_CSS_VARIANTS = _precompress(_CSS)
+# Версия стилей в ссылке из страницы: новый CSS - новый URL, поэтому
+# браузер может кэшировать его без повторных запросов
+_CSS_VERSION = hashlib.sha1(_CSS).hexdigest()[:10]
+# По URL с версией стили не меняются - кэшируются на год
+CSS_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Путь к файлу стилей, из которого их отдаёт sendfile
+CSS_PATH_KEY = web.AppKey('css_path', str)
+
+_DASHBOARD_HTML = _DASHBOARD_HTML.replace(
+    b'href="/static/style.css"',
+    f'href="/static/style.css?v={_CSS_VERSION}"'.encode('ascii')
+)
+_DASHBOARD_ETAG = f'"{hashlib.md5(_DASHBOARD_HTML).hexdigest()}"'
+_DASHBOARD_VARIANTS = _precompress(_DASHBOARD_HTML)
+
+
+def _static_response(request, variants, etag, content_type, headers=None):
+    """
+    Заранее сжатое тело в кодировке, которую принимает клиент;
+    304 без тела, если у клиента та же версия
+    """
+    headers = dict(headers or {}, ETag=etag, Vary='Accept-Encoding')
+    if request.headers.get('If-None-Match') == etag:
+        return web.Response(status=304, headers=headers)
+    encoding = _accepted_encoding(request)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return web.Response(
+        body=variants[encoding],
+        headers=headers,
+        content_type=content_type,
+        charset='utf-8'
+    )
+
+
+async def serve_dashboard(request):
+    """Главная страница"""
+    return _static_response(request, _DASHBOARD_VARIANTS, _DASHBOARD_ETAG, 'text/html')
+
+
+async def serve_css(request):
+    """
+    CSS стили: отдаются из файла через sendfile (ядро копирует файл прямо в
+    сокет). Сжатые варианты лежат рядом (.gz/.br) - FileResponse выбирает их
+    по Accept-Encoding сам, как и ETag/304
+    """
+    return web.FileResponse(
+        request.app[CSS_PATH_KEY],
+        headers={'Cache-Control': CSS_CACHE_CONTROL}
+    )
+
+
+async def _css_file(app):
+    """Пишет стили и их сжатые варианты во временный каталог на время работы"""
+    with tempfile.TemporaryDirectory(prefix='api-watcher-web-') as static_dir:
+        css_path = os.path.join(static_dir, 'style.css')
+        for encoding, suffix in ((None, ''), ('gzip', '.gz'), ('br', '.br')):
+            if encoding in _CSS_VARIANTS:
+                with open(css_path + suffix, 'wb') as f:
+                    f.write(_CSS_VARIANTS[encoding])
+        app[CSS_PATH_KEY] = css_path
+        yield
+
+
+# Поля снэпшота в списке /api/snapshots (в этом порядке - и в JSON)
+SNAPSHOT_LIST_FIELDS = (
+    'id', 'url', 'api_name', 'method_name', 'content_type', 'created_at',
+    'has_changes', 'ai_summary', 'content_hash'
+)
+_get_snapshot_list_fields = operator.attrgetter(*SNAPSHOT_LIST_FIELDS)
+
+# БД открывается один раз на процесс, а не на каждый запрос: DatabaseManager
+# (движок с пулом соединений) и соединение sqlite3 для сырых запросов.
+# Обработчики ходят в БД из потоков to_thread, поэтому доступ под блокировкой
+_db = None
+_sqlite = None
+_db_lock = threading.Lock()
+
+
+def _get_db():
+    """Возвращает общий DatabaseManager (вызывать под _db_lock)"""
+    global _db
+    if _db is None:
+        _db = DatabaseManager(Config.DATABASE_URL)
+    return _db
+
+
+def _get_sqlite():
+    """Возвращает общее соединение sqlite3 (вызывать под _db_lock)"""
+    global _sqlite
+    if _sqlite is None:
+        _sqlite = sqlite3.connect(
+            Config.DATABASE_URL.replace('sqlite:///', ''),
+            check_same_thread=False,
+            isolation_level=None
+        )
+        # busy_timeout: не падать с "database is locked", пока watcher пишет
+        _sqlite.execute("PRAGMA busy_timeout=5000")
+        _sqlite.execute("PRAGMA cache_size=-20000")
+        try:
+            # WAL: чтение не блокируется записью watcher'а
+            _sqlite.execute("PRAGMA journal_mode=WAL")
+            _sqlite.execute("PRAGMA synchronous=NORMAL")
+        except sqlite3.OperationalError:
+            # БД только для чтения или занята - остаёмся в текущем режиме
+            pass
+    return _sqlite
+
+
+def _table_version():
+    """
+    Версия таблицы снэпшотов (вызывать под _db_lock): меняется вместе с
+    MAX(id), MIN(id) и MAX(created_at). Каждое значение - отдельный подзапрос:
+    так SQLite берёт его с края индекса (id - rowid, created_at проиндексирован),
+    без прохода по таблице, как было бы с COUNT(*). Вставка меняет MAX(id),
+    очистка старых снэпшотов - MIN(id)
+    """
+    max_id, min_id, max_created = _get_sqlite().execute(
+        "SELECT (SELECT MAX(id) FROM snapshots), (SELECT MIN(id) FROM snapshots),"
+        " (SELECT MAX(created_at) FROM snapshots)"
+    ).fetchone()
+    return f"{max_id}-{min_id}-{zlib.crc32(str(max_created).encode()):08x}"
+
+
+def _snapshots_etag(changes_only, days, version):
+    """
+    ETag списка снэпшотов (вызывать под _db_lock): версия таблицы, а для
+    выборки изменений - ещё и число снэпшотов в окне в days дней (старые
+    снэпшоты выходят из окна без изменения таблицы)
+    """
+    if changes_only:
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        in_window = _get_sqlite().execute(
+            "SELECT COUNT(*) FROM snapshots WHERE has_changes = 1 AND created_at >= ?",
+            (cutoff.strftime('%Y-%m-%d %H:%M:%S.%f'),)
+        ).fetchone()[0]
+        return f'W/"{version}-changes-{days}-{in_window}"'
+    return f'W/"{version}"'
+
+
+# Статистика по последним снэпшотам URL зависит только от содержимого таблицы:
+# (версия таблицы, (total_urls, latest_with_changes)), считается раз на версию
+_latest_stats = (None, None)
+
+
+def _get_latest_stats(db, version):
+    """Статистика последних снэпшотов для версии таблицы (вызывать под _db_lock)"""
+    global _latest_stats
+    cached_version, stats = _latest_stats
+    if cached_version != version:
+        stats = db.get_latest_snapshots_stats()
+        _latest_stats = (version, stats)
+    return stats
+
+
+def _load_snapshots(changes_only, days, if_none_match=None):
+    """
+    Последние снэпшоты и статистика (блокирующие запросы к БД)
     
-    def serve_snapshots_api(self, query):
-        """API для получения снэпшотов"""
+    Returns:
+        (etag, данные); данные None, если у клиента уже актуальная версия
+    """
+    with _db_lock:
+        version = _table_version()
+        etag = _snapshots_etag(changes_only, days, version)
+        if etag == if_none_match:
+            return etag, None
+        
+        db = _get_db()
         try:
-            from api_watcher.config import Config
-            from api_watcher.storage.database import DatabaseManager
-            
-            db = DatabaseManager(Config.DATABASE_URL)
-            
-            changes_only = query.get('changes_only', ['false'])[0].lower() == 'true'
-            days = int(query.get('days', ['7'])[0])
+            # Статистика по последним снэпшотам URL - одним агрегирующим запросом,
+            # и только когда таблица изменилась (общая для обеих выборок)
+            total_urls, latest_with_changes = _get_latest_stats(db, version)
             
             if changes_only:
                 snapshots = db.get_snapshots_with_changes(days=days)
+                total_snapshots = len(snapshots)
+                snapshots_with_changes = len([s for s in snapshots if s.has_changes])
             else:
-                # Получаем последние снэпшоты для каждого URL
-                urls = db.get_all_urls()
-                snapshots = []
-                for url in urls:
-                    latest = db.get_latest_snapshot(url)
-                    if latest:
-                        snapshots.append(latest)
-                
-                # Сортируем по дате
-                snapshots.sort(key=lambda x: x.created_at, reverse=True)
-            
-            # Статистика
-            total_urls = len(db.get_all_urls())
-            total_snapshots = len(snapshots)
-            snapshots_with_changes = len([s for s in snapshots if s.has_changes])
-            
-            # Преобразуем в JSON
-            snapshots_data = []
-            for snapshot in snapshots[:50]:  # Ограничиваем 50 записями
-                snapshots_data.append({
-                    'id': snapshot.id,
-                    'url': snapshot.url,
-                    'api_name': snapshot.api_name,
-                    'method_name': snapshot.method_name,
-                    'content_type': snapshot.content_type,
-                    'created_at': snapshot.created_at.isoformat(),
-                    'has_changes': snapshot.has_changes,
-                    'ai_summary': snapshot.ai_summary,
-                    'content_hash': snapshot.content_hash
-                })
-            
-            response_data = {
-                'snapshots': snapshots_data,
-                'total_urls': total_urls,
-                'total_snapshots': total_snapshots,
-                'snapshots_with_changes': snapshots_with_changes
-            }
+                # Последние снэпшоты всех URL одним запросом, уже отсортированные по дате
+                snapshots = db.get_latest_snapshots_per_url(limit=50)
+                total_snapshots = total_urls
+                snapshots_with_changes = latest_with_changes
             
+            # Преобразуем в JSON: все поля снэпшота достаются одним вызовом attrgetter,
+            # created_at остаётся datetime - его форматирует _json_dumps
+            snapshots_data = [
+                dict(zip(SNAPSHOT_LIST_FIELDS, _get_snapshot_list_fields(snapshot)))
+                for snapshot in snapshots[:50]  # Ограничиваем 50 записями
+            ]
+        finally:
+            # Сессия отдаёт соединение в пул и завершает транзакцию чтения:
+            # следующий запрос увидит свежие данные
             db.close()
-            
-            self.send_json_response(response_data)
-            
-        except Exception as e:
-            self.send_json_response({'error': str(e)}, status=500)
     
-    def serve_logs_api(self, query):
-        """API для получения логов"""
-        try:
-            level_filter = query.get('level', [''])[0]
-            lines_count = int(query.get('lines', ['50'])[0])
-            
-            logs = []
-            
-            # Пытаемся читать из разных источников логов
-            log_files = [
-                '/var/log/api-watcher/watcher.log',
-                '/opt/api-tracker/api_watcher.log',
-                'api_watcher.log'
-            ]
-            
-            for log_file in log_files:
-                if os.path.exists(log_file):
+    return etag, {
+        'snapshots': snapshots_data,
+        'total_urls': total_urls,
+        'total_snapshots': total_snapshots,
+        'snapshots_with_changes': snapshots_with_changes
+    }
+
+
+def _read_logs(level_filter, lines_count):
+    """Последние записи лога (блокирующее чтение файла)"""
+    logs = []
+    level_filter = level_filter.upper()
+    # Время для текстовых строк - одно на запрос
+    now = datetime.now().isoformat()
+    
+    # Пытаемся читать из разных источников логов
+    for log_file in LOG_FILES:
+        if os.path.exists(log_file):
+            try:
+                # Файл читается с конца блоками, пока не наберётся lines_count
+                # строк, - не целиком на каждый запрос
+                lines = tail_lines(log_file, lines_count)
+                
+                for line in lines:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    
+                    # JSON-запись - объект и начинается с {: текстовые строки
+                    # (в т.ч. "[INFO] ...") не гоняем через парсер и исключение
+                    if line[0] != '{':
+                        if not level_filter:
+                            logs.append({'raw': line, 'text': line, 'level': 'INFO', 'timestamp': now})
+                        continue
+                    
+                    # Запись нужного уровня содержит его имя (в каком-то регистре):
+                    # остальные отбрасываются поиском подстроки, без разбора JSON
+                    if level_filter and level_filter not in line.upper():
+                        continue
+                    
                     try:
-                        with open(log_file, 'r', encoding='utf-8') as f:
-                            lines = f.readlines()[-lines_count:]
-                            
-                        for line in lines:
-                            line = line.strip()
-                            if not line:
-                                continue
-                            
-                            try:
-                                # Пытаемся парсить как JSON
-                                log_entry = json.loads(line)
-                                
-                                # Фильтруем по уровню
-                                if level_filter:
-                                    entry_level = log_entry.get('level', '').upper()
-                                    if entry_level != level_filter.upper():
-                                        continue
-                                
-                                logs.append(log_entry)
-                                
-                            except json.JSONDecodeError:
-                                # Если не JSON, добавляем как текст
-                                if not level_filter:
-                                    logs.append({
-                                        'raw': line,
-                                        'level': 'INFO',
-                                        'timestamp': datetime.now().isoformat()
-                                    })
+                        # Пытаемся парсить как JSON
+                        log_entry = _json_loads(line)
                         
-                        break  # Используем первый найденный файл
+                        # Фильтруем по уровню
+                        level = log_entry.get('level') or ''
+                        if level_filter and level.upper() != level_filter:
+                            continue
                         
-                    except Exception as e:
-                        continue
-            
-            self.send_json_response({'logs': logs[-lines_count:]})
-            
-        except Exception as e:
-            self.send_json_response({'error': str(e)}, status=500)
+                        # Поля для дашборда нормализуются здесь, один раз на запись
+                        log_entry['level'] = (level or 'INFO').upper()
+                        log_entry['text'] = (
+                            log_entry.get('message') or log_entry.get('msg') or log_entry.get('raw') or ''
+                        )
+                        logs.append(log_entry)
+                        
+                    except json.JSONDecodeError:
+                        # Если не JSON, добавляем как текст
+                        if not level_filter:
+                            logs.append({'raw': line, 'text': line, 'level': 'INFO', 'timestamp': now})
+                
+                break  # Используем первый найденный файл
+                
+            except Exception:
+                continue
     
-    def serve_snapshot_details(self, query):
-        """API для получения деталей снэпшота"""
-        try:
-            snapshot_id = int(query.get('id', ['0'])[0])
-            
-            from api_watcher.config import Config
-            from api_watcher.storage.database import DatabaseManager
-            
-            db = DatabaseManager(Config.DATABASE_URL)
-            
-            # Получаем снэпшот по ID
-            snapshot = db.session.query(db.session.query(db.session.bind.execute(
-                "SELECT * FROM snapshots WHERE id = ?", (snapshot_id,)
-            )).fetchone())
-            
-            # Простой способ получения снэпшота
-            conn = sqlite3.connect(Config.DATABASE_URL.replace('sqlite:///', ''))
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM snapshots WHERE id = ?", (snapshot_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                self.send_json_response({'error': 'Snapshot not found'}, status=404)
-                return
-            
-            # Получаем названия колонок
-            cursor.execute("PRAGMA table_info(snapshots)")
-            columns = [col[1] for col in cursor.fetchall()]
-            
-            # Создаем словарь
-            snapshot_data = dict(zip(columns, row))
-            
-            conn.close()
-            
-            self.send_json_response(snapshot_data)
-            
-        except Exception as e:
-            self.send_json_response({'error': str(e)}, status=500)
+    return logs[-lines_count:]
+
+
+# Поля снэпшота, которые показывает окно деталей (raw_html и structured_data не нужны)
+SNAPSHOT_DETAIL_COLUMNS = (
+    'id', 'url', 'api_name', 'method_name', 'content_type', 'created_at',
+    'has_changes', 'ai_summary', 'content_hash'
+)
+# Сколько символов текста отдаёт окно деталей (столько же показывает модальное окно)
+SNAPSHOT_DETAIL_PREVIEW_CHARS = 2000
+# Сколько ответов с деталями снэпшотов держать в памяти: текст в них обрезан
+# до превью, поэтому размер кэша ограничен и по байтам
+SNAPSHOT_DETAILS_CACHE_SIZE = 512
+# Запросы одни и те же: sqlite3 держит их подготовленными в кэше соединения
+_SNAPSHOT_HASH_SQL = "SELECT content_hash FROM snapshots WHERE id = ?"
+_SNAPSHOT_DETAIL_SQL = (
+    f"SELECT {', '.join(SNAPSHOT_DETAIL_COLUMNS)}, "
+    f"substr(text_content, 1, {SNAPSHOT_DETAIL_PREVIEW_CHARS}), length(text_content) "
+    f"FROM snapshots WHERE id = ?"
+)
+
+
+@functools.lru_cache(maxsize=SNAPSHOT_DETAILS_CACHE_SIZE)
+def _build_snapshot_details(snapshot_id, content_hash):
+    """
+    Готовый JSON деталей снэпшота: метаданные, превью текста и его полная длина.
+    Ключ включает content_hash, так что переписанная строка не отдаётся из кэша
+    """
+    with _db_lock:
+        row = _get_sqlite().execute(_SNAPSHOT_DETAIL_SQL, (snapshot_id,)).fetchone()
     
-    def send_json_response(self, data, status=200):
-        """Отправка JSON ответа"""
-        self.send_response(status)
-        self.send_header('Content-type', 'application/json; charset=utf-8')
-        self.end_headers()
-        
-        json_data = json.dumps(data, ensure_ascii=False, indent=2)
-        self.wfile.write(json_data.encode('utf-8'))
+    if not row:
+        raise KeyError(snapshot_id)
+    details = dict(zip(SNAPSHOT_DETAIL_COLUMNS, row))
+    details['text_content'], details['text_length'] = row[-2], row[-1] or 0
+    return _json_dumps(details)
+
+
+def _load_snapshot_details(snapshot_id):
+    """
+    JSON деталей снэпшота (блокирующий запрос к БД): хеш содержимого
+    читается по первичному ключу, остальное берётся из кэша
+    
+    Raises:
+        KeyError: снэпшота нет (исключения не кэшируются - он может появиться)
+    """
+    with _db_lock:
+        row = _get_sqlite().execute(_SNAPSHOT_HASH_SQL, (snapshot_id,)).fetchone()
+    
+    if not row:
+        raise KeyError(snapshot_id)
+    return _build_snapshot_details(snapshot_id, row[0])
+
+
+async def serve_snapshots_api(request):
+    """API для получения снэпшотов"""
+    try:
+        changes_only = request.query.get('changes_only', 'false').lower() == 'true'
+        days = int(request.query.get('days', '7'))
+        # БД в отдельном потоке: остальные запросы не ждут диск
+        etag, response_data = await asyncio.to_thread(
+            _load_snapshots, changes_only, days, request.headers.get('If-None-Match')
+        )
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    # no-cache: браузер каждый раз переспрашивает с If-None-Match, и
+    # автообновление без новых снэпшотов получает пустой 304
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if response_data is None:
+        return web.Response(status=304, headers=headers)
+    
+    # Ответ пишется по частям (chunked): снэпшоты кодируются пачками по
+    # STREAM_BATCH_SIZE и сразу отправляются, весь JSON в памяти не собирается
+    response = web.StreamResponse(headers=headers)
+    response.content_type = 'application/json'
+    response.charset = 'utf-8'
+    if 'gzip' in request.headers.get('Accept-Encoding', ''):
+        response.enable_compression(web.ContentCoding.gzip)
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    
+    # {"snapshots": [ ... ], "total_urls": ..., ...}
+    snapshots = response_data.pop('snapshots')
+    await response.write(b'{"snapshots": [')
+    for start in range(0, len(snapshots), STREAM_BATCH_SIZE):
+        chunk = b', '.join(_json_dumps(snapshot) for snapshot in snapshots[start:start + STREAM_BATCH_SIZE])
+        await response.write((b', ' if start else b'') + chunk)
+    await response.write(b'], ' + _json_dumps(response_data)[1:])
+    await response.write_eof()
+    return response
+
+
+async def serve_logs_api(request):
+    """API для получения логов"""
+    try:
+        level_filter = request.query.get('level', '')
+        lines_count = int(request.query.get('lines', '50'))
+        logs = await asyncio.to_thread(_read_logs, level_filter, lines_count)
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    return _json_response(request, {'logs': logs})
+
+
+async def serve_snapshot_details(request):
+    """API для получения деталей снэпшота"""
+    try:
+        snapshot_id = int(request.query.get('id', '0'))
+        body = await asyncio.to_thread(_load_snapshot_details, snapshot_id)
+    except KeyError:
+        return _json_response(request, {'error': 'Snapshot not found'}, status=404)
+    except Exception as e:
+        return _json_response(request, {'error': str(e)}, status=500)
+    
+    return _json_body_response(request, body)
+
+
+async def _close_db(app):
+    global _db, _sqlite
+    with _db_lock:
+        if _db is not None:
+            _db.close()
+            _db = None
+        if _sqlite is not None:
+            _sqlite.close()
+            _sqlite = None
+
+
+def create_app():
+    """Асинхронное приложение: запросы обслуживаются конкурентно"""
+    app = web.Application()
+    app.router.add_get('/', serve_dashboard)
+    app.router.add_get('/api/snapshots', serve_snapshots_api)
+    app.router.add_get('/api/logs', serve_logs_api)
+    app.router.add_get('/api/snapshot-details', serve_snapshot_details)
+    app.router.add_get('/static/style.css', serve_css)
+    app.cleanup_ctx.append(_css_file)
+    app.on_cleanup.append(_close_db)
+    return app
+
 
 def main():
     """Запуск веб-сервера"""
@@ -767,11 +1101,14 @@ def main():
     print(f"Откройте в браузере: http://localhost:{port}")
     print("Для остановки нажмите Ctrl+C")
     
-    try:
-        server = HTTPServer(('', port), APIWatcherWebHandler)
-        server.serve_forever()
-    except KeyboardInterrupt:
-        print("\nСервер остановлен")
+    # БД открывается до старта: ошибка конфигурации видна сразу, а не в первом запросе
+    with _db_lock:
+        _get_db()
+        _get_sqlite()
+    
+    # run_app сам обрабатывает Ctrl+C и закрывает сервер
+    web.run_app(create_app(), port=port, print=None)
+    print("\nСервер остановлен")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()